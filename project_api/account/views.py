@@ -26,6 +26,7 @@ from account.permissions import IsAdminUser, IsDepartmentAdminUser, IsDepartment
 from django.db.models import Q
 from rest_framework.decorators import api_view, permission_classes
 from mentor_mentee.models import MentorMenteeRelationship, Session, Participant
+from mentor_mentee.caching import ACTIVITY_NAMESPACE, versioned_response
 from django.db.models import Avg
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
@@ -656,6 +657,7 @@ class DepartmentListPublicView(APIView):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@versioned_response(ACTIVITY_NAMESPACE)
 def get_public_stats(request):
     """
     Public endpoint that provides general site statistics for the homepage
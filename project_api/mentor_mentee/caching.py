@@ -0,0 +1,114 @@
+"""
+Small helpers for versioned cache keys.
+
+A version counter is kept per namespace; bumping it makes every key built
+from the old version unreachable, so callers never have to delete keys.
+
+The counters live in CacheVersion rows and are bumped with an atomic F()
+update, so concurrent bumps from different workers each get a version of
+their own. Readers take the version from the cache, where each bump
+publishes it, and only fall back to the row when it was evicted.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+# Data behind the leaderboard and the public stats: participants, points,
+# sessions, quizzes, relationships, badges and application feedback
+ACTIVITY_NAMESPACE = 'activity'
+
+# Matching features of approved mentors (see incremental_matching)
+MENTOR_FEATURES_NAMESPACE = 'mentor_features'
+
+
+def _version_key(namespace):
+    return f'cache_version:{namespace}'
+
+
+def _stored_version(namespace):
+    from .models import CacheVersion  # models.py imports this module
+    return CacheVersion.objects.filter(namespace=namespace).values_list('version', flat=True).first() or 1
+
+
+def get_version(namespace):
+    """Current version number for a namespace (starts at 1)."""
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        version = _stored_version(namespace)
+        # add(): a bump published meanwhile wins
+        cache.add(_version_key(namespace), version, None)
+    return version
+
+
+def bump_version(namespace):
+    """Invalidate everything cached under the namespace's current version."""
+    from .models import CacheVersion
+    with transaction.atomic():
+        # Carry on from a counter kept in the cache before the row existed
+        CacheVersion.objects.get_or_create(
+            namespace=namespace, defaults={'version': cache.get(_version_key(namespace)) or 1}
+        )
+        CacheVersion.objects.filter(namespace=namespace).update(version=F('version') + 1)
+        # The update holds the row lock, so this reads our own increment
+        version = CacheVersion.objects.filter(namespace=namespace).values_list('version', flat=True).get()
+    # Versions are never handed out twice, so a slower bump publishing an
+    # older number still leads to keys nothing was cached under yet
+    cache.set(_version_key(namespace), version, None)
+    return version
+
+
+def bump_version_on_commit(namespace):
+    """
+    bump_version() once the current transaction commits (right away outside
+    one), so a concurrent read can't cache the old data under the new version.
+    """
+    transaction.on_commit(lambda: bump_version(namespace))
+
+
+def versioned_key(namespace, *parts):
+    """Cache key that changes whenever bump_version(namespace) is called."""
+    return ':'.join([namespace, f'v{get_version(namespace)}', *[str(part) for part in parts]])
+
+
+def versioned_response(namespace, timeout=300):
+    """
+    Cache a GET API view's 200 responses under the namespace's version and
+    the query parameters. Responses carry an ETag of the payload, and a
+    request whose If-None-Match matches it gets an empty 304.
+    Goes below @api_view so the view receives the DRF request.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            params = sorted((key, sorted(values)) for key, values in request.query_params.lists())
+            params_hash = hashlib.sha256(json.dumps([args, kwargs, params]).encode()).hexdigest()[:16]
+            key = versioned_key(namespace, view.__name__, params_hash)
+
+            cached = cache.get(key)
+            if cached is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                payload = json.dumps(response.data, sort_keys=True, default=str)
+                cached = {'data': response.data, 'etag': hashlib.sha256(payload.encode()).hexdigest()[:32]}
+                cache.set(key, cached, timeout)
+
+            etag = quote_etag(cached['etag'])
+            if_none_match = request.headers.get('If-None-Match')
+            # Weak comparison, like Django's conditional GET handling
+            if if_none_match and any(tag in ('*', etag) for tag in
+                                     [t.removeprefix('W/') for t in parse_etags(if_none_match)]):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = Response(cached['data'], status=status.HTTP_200_OK)
+            response['ETag'] = etag
+            return response
+        return wrapper
+    return decorator
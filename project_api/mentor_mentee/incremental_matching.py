@@ -0,0 +1,159 @@
+"""
+Incremental matching: place one participant without re-running the whole
+cohort through match_participants.
+
+A newly approved (or re-activated) mentee is scored against the mentors that
+still have capacity; a mentor with free capacity is scored against the
+unmatched mentees. Mentor features are cached in the shared cache between
+calls and rebuilt once a write touching a mentor commits: Participant.save(),
+badge claims, relationship changes and archiving bump
+MENTOR_FEATURES_NAMESPACE.
+"""
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+
+from .caching import MENTOR_FEATURES_NAMESPACE, versioned_key
+from .matching import (
+    MAX_MENTEES_PER_MENTOR, MatchingEngine, attach_historical_data, build_match_entry, load_match_records,
+    load_token_names,
+)
+from .models import MentorMenteeRelationship, Participant
+from .relationships import changing_relationships
+
+# Safety net for writes that bypass both Participant.save() and an explicit
+# bump of MENTOR_FEATURES_NAMESPACE
+MENTOR_FEATURES_TIMEOUT = 10 * 60
+
+
+def _in_scope(queryset, department):
+    return queryset.filter(department=department) if department else queryset
+
+
+def participant_features(queryset):
+    """Engine input records for a queryset, with historical data attached."""
+    features = load_match_records(queryset)
+    attach_historical_data(features)
+    return features
+
+
+def cached_mentor_features(department=None):
+    """Features of every approved, active mentor in scope, cached per version."""
+    cache_key = versioned_key(MENTOR_FEATURES_NAMESPACE, department.id if department else 'all')
+    features = cache.get(cache_key)
+    if features is None:
+        mentors = Participant.objects.filter(approval_status='approved', status='active', mentoring_preferences='mentor')
+        features = participant_features(_in_scope(mentors, department))
+        cache.set(cache_key, features, MENTOR_FEATURES_TIMEOUT)
+    return features
+
+
+def mentor_loads(registration_nos):
+    """Current number of mentees per mentor (one query)."""
+    return dict(
+        Participant.objects.filter(registration_no__in=registration_nos, mentee_count__gt=0)
+        .values_list('registration_no', 'mentee_count')
+    )
+
+
+def unmatched_mentees(department=None, exclude=()):
+    """Approved, active mentees who are not part of any relationship yet."""
+    mentees = Participant.objects.filter(
+        approval_status='approved',
+        status='active',
+        mentoring_preferences='mentee',
+        current_mentor__isnull=True,
+        mentee_count=0,
+    ).exclude(registration_no__in=exclude)
+    return _in_scope(mentees, department)
+
+
+def _create_relationship(mentor_reg_no, mentee_reg_no):
+    """Create an automatic relationship unless the mentor filled up meanwhile."""
+    # Both rows are locked, so the denormalized columns can't change underneath
+    locked = Participant.objects.select_for_update().in_bulk([mentor_reg_no, mentee_reg_no])
+    mentor, mentee = locked.get(mentor_reg_no), locked.get(mentee_reg_no)
+    if mentor is None or mentee is None:
+        return False
+    if mentor.mentee_count >= MAX_MENTEES_PER_MENTOR:
+        return False
+    if mentee.current_mentor_id:
+        return False
+    with changing_relationships([mentor_reg_no, mentee_reg_no]):
+        MentorMenteeRelationship.objects.create(
+            mentor=mentor,
+            mentee=mentee,
+            manually_created=False,
+        )
+    return True
+
+
+def place_mentee(registration_no, department=None, exclude_mentors=()):
+    """
+    Assign an unmatched mentee to the best-scoring mentor with spare capacity.
+    Returns the list of created match entries (empty or one entry).
+    """
+    mentee = participant_features(unmatched_mentees(department).filter(registration_no=registration_no))
+    if not mentee:
+        return []
+
+    mentors = [m for m in cached_mentor_features(department) if m['registration_no'] not in exclude_mentors]
+    loads = mentor_loads([m['registration_no'] for m in mentors])
+    mentors = [m for m in mentors if loads.get(m['registration_no'], 0) < MAX_MENTEES_PER_MENTOR]
+    if not mentors:
+        return []
+
+    engine = MatchingEngine(mentors, mentee, token_names=load_token_names(mentors + mentee))
+    scores = engine.score_block(0, 1)[0]
+    # Best mentors first; the first one that still has room when locked wins
+    with transaction.atomic():
+        for mentor_idx in np.argsort(-scores, kind='stable'):
+            if scores[mentor_idx] <= 0:
+                break
+            if _create_relationship(mentors[mentor_idx]['registration_no'], registration_no):
+                return [build_match_entry(mentors[mentor_idx], mentee[0])]
+    return []
+
+
+def fill_mentor(registration_no, department=None, exclude_mentees=()):
+    """
+    Give a mentor with spare capacity the best-scoring unmatched mentees.
+    Returns the list of created match entries.
+    """
+    mentor = [m for m in cached_mentor_features(department) if m['registration_no'] == registration_no]
+    if not mentor:
+        return []
+    free = MAX_MENTEES_PER_MENTOR - mentor_loads([registration_no]).get(registration_no, 0)
+    if free <= 0:
+        return []
+
+    mentees = participant_features(unmatched_mentees(department, exclude=exclude_mentees))
+    if not mentees:
+        return []
+
+    engine = MatchingEngine(mentor, mentees, token_names=load_token_names(mentor + mentees))
+    scores = engine.score_matrix()[:, 0]
+    created = []
+    with transaction.atomic():
+        for mentee_idx in np.argsort(-scores, kind='stable'):
+            if len(created) >= free or scores[mentee_idx] <= 0:
+                break
+            if _create_relationship(registration_no, mentees[mentee_idx]['registration_no']):
+                created.append(build_match_entry(mentor[0], mentees[mentee_idx]))
+    return created
+
+
+def incremental_match(participant, department=None, exclude=()):
+    """
+    Place a single participant: mentees get a mentor, mentors get mentees.
+    `exclude` lists registration numbers that must not be paired with them.
+    """
+    if participant.approval_status != 'approved' or participant.status != 'active':
+        return []
+    if department and participant.department_id != department.id:
+        return []
+    if participant.mentoring_preferences == 'mentee':
+        return place_mentee(participant.registration_no, department, exclude_mentors=exclude)
+    if participant.mentoring_preferences == 'mentor':
+        return fill_mentor(participant.registration_no, department, exclude_mentees=exclude)
+    return []
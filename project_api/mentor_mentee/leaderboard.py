@@ -0,0 +1,656 @@
+"""
+Leaderboard points.
+
+Full recomputation: each score component is a correlated Subquery aggregate
+annotated on the Participant queryset, so every participant is scored with
+one SELECT plus a bulk_update.
+
+Incremental updates: the views report sessions, quizzes, relationships and
+badges as they change, and the affected participants' leaderboard_points are
+adjusted by the matching delta with an atomic F() update. The
+reconcile_leaderboard command compares both.
+
+Ranking: the leaderboard is ordered by (leaderboard_points DESC,
+registration_no), which the participant_leaderboard_idx index covers. Pages
+are read with a keyset cursor, and ranks are counted with range scans on
+the same index instead of loading the whole list.
+
+Leaderboard entries: the per-participant statistics shown by get_leaderboard
+are materialized in LeaderboardEntry and refreshed for the participants a
+write touches, or for everyone with refresh_leaderboard_entries().
+
+Department snapshots: each department's leaderboard is stored as rows in
+DepartmentLeaderboardSnapshot. Writes only mark the departments they touch
+stale, and Participant.save() only does so when a field the board shows
+changed; a stale snapshot is recomputed when it is next read, and
+refresh_department_snapshots() rebuilds any set of departments with one
+SELECT grouped by department. A stale department is always rebuilt whole
+(one range scan on participant_dept_lb_idx) rather than patched row by row,
+which would need every write to record which participants it changed.
+"""
+import base64
+from bisect import bisect_right
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import connection
+from django.db.models import (
+    Avg, Case, Count, F, FloatField, IntegerField, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce, Greatest, Length
+from django.utils import timezone
+
+from .caching import ACTIVITY_NAMESPACE, MENTOR_FEATURES_NAMESPACE, bump_version_on_commit
+from .models import (
+    Badge, Department, DepartmentLeaderboardSnapshot, LeaderboardEntry, MentorMenteeRelationship, Participant,
+    ParticipantBadge, QuizResult, Session, SkillToken,
+)
+
+# Points per activity
+SESSION_CREATED_POINTS = 20
+SESSION_ATTENDED_POINTS = 10
+QUIZ_ASSIGNED_POINTS = 5
+MENTEE_POINTS = 40
+BADGE_POINTS = 20
+SUPER_MENTOR_POINTS = 100
+
+# Claimed badges that make a participant a super mentor
+SUPER_MENTOR_BADGES = 5
+
+# Leaderboard order; ties on points are broken by registration number
+LEADERBOARD_ORDER = ('-leaderboard_points', 'registration_no')
+
+# Most skill tokens a leaderboard search is expanded to
+SEARCH_TOKEN_LIMIT = 20
+
+
+def _total(queryset, outer_field, aggregate, output_field=None):
+    """Per-participant aggregate over `queryset` as a Subquery, 0 when there are no rows."""
+    output_field = output_field or IntegerField()
+    rows = queryset.filter(**{outer_field: OuterRef('pk')}).order_by().values(outer_field)
+    return Coalesce(
+        Subquery(rows.annotate(total=aggregate).values('total')[:1], output_field=output_field),
+        Value(0, output_field=output_field),
+    )
+
+
+def mark_departments_stale(registration_nos=None):
+    """Mark the department snapshots of the given participants (default: all) stale."""
+    if registration_nos is None:
+        DepartmentLeaderboardSnapshot.mark_stale()
+    else:
+        DepartmentLeaderboardSnapshot.mark_stale(
+            Participant.objects.filter(registration_no__in=registration_nos).values('department_id')
+        )
+
+
+def score_components():
+    """Annotation expressions for every raw count/sum the leaderboard score is built from."""
+    completed = QuizResult.objects.filter(status='completed')
+    return {
+        'sessions_created': _total(Session.objects.all(), 'mentor', Count('pk')),
+        'sessions_attended': _total(Session.participants.through.objects.all(), 'participant', Count('pk')),
+        # Counted from the relationships rather than read from Participant.mentee_count,
+        # so a full recomputation doesn't inherit drift in the denormalized column
+        'mentees_total': _total(MentorMenteeRelationship.objects.all(), 'mentor', Count('pk')),
+        'assigned_quiz_count': _total(QuizResult.objects.all(), 'mentor', Count('pk')),
+        'assigned_quiz_points': _total(completed, 'mentor', Sum('score')),
+        'own_quiz_points': _total(completed, 'participant', Sum('score')),
+        # One row per relationship, so a mentee listed twice counts twice
+        'mentee_quiz_points': _total(completed, 'participant__mentor_relationship__mentor', Sum('score')),
+    }
+
+
+def with_score_components(participants):
+    """Annotate all score_components() on a Participant queryset."""
+    return participants.annotate(**score_components())
+
+
+def badge_points(badges_earned, is_super_mentor):
+    """Bonus for claimed badges and super mentor status."""
+    points = badges_earned * BADGE_POINTS if badges_earned > 0 else 0
+    if is_super_mentor:
+        points += SUPER_MENTOR_POINTS
+    return points
+
+
+def relationship_points(mentee_count, own_quiz_points, mentee_quiz_points):
+    """
+    The part of the score that depends on relationships: mentors earn points
+    per mentee and for their mentees' quizzes, everyone else for their own quizzes.
+    """
+    if mentee_count > 0:
+        return mentee_count * MENTEE_POINTS + mentee_quiz_points
+    return own_quiz_points
+
+
+def score_breakdown(participant):
+    """Score components for a participant annotated by with_score_components()."""
+    is_mentor = participant.mentees_total > 0
+    sessions_score = (participant.sessions_created * SESSION_CREATED_POINTS
+                      + participant.sessions_attended * SESSION_ATTENDED_POINTS)
+    quiz_assignment_score = participant.assigned_quiz_count * QUIZ_ASSIGNED_POINTS + participant.assigned_quiz_points
+    if is_mentor:
+        mentee_score = participant.mentees_total * MENTEE_POINTS
+        quiz_score = participant.mentee_quiz_points
+    else:
+        mentee_score = 0
+        quiz_score = participant.own_quiz_points
+
+    total_score = sessions_score + quiz_score + mentee_score + quiz_assignment_score
+    total_score += badge_points(participant.badges_earned, participant.is_super_mentor)
+
+    return {
+        'registration_no': participant.registration_no,
+        'name': participant.name,
+        'role': 'mentor' if is_mentor else 'mentee',
+        'sessions_score': sessions_score,
+        'quiz_score': quiz_score,
+        'mentee_score': mentee_score,
+        'quiz_assignment_score': quiz_assignment_score,
+        'total_score': total_score,
+        'badges_earned': participant.badges_earned,
+        'is_super_mentor': participant.is_super_mentor,
+        'assigned_quizzes': participant.assigned_quiz_count
+    }
+
+
+def award_point_badges(points_by_participant):
+    """
+    Create unclaimed ParticipantBadge rows for every badge whose threshold a
+    participant's points reach. The catalog and the badges already held are
+    read once and the new rows inserted with one bulk_create, whatever the
+    number of participants. Returns {registration_no: [badge names]}.
+    """
+    if not points_by_participant:
+        return {}
+    badges = list(Badge.objects.order_by('points_required', 'id'))
+    if not badges:
+        return {}
+    thresholds = [badge.points_required for badge in badges]
+    held = set(
+        ParticipantBadge.objects.filter(participant_id__in=points_by_participant.keys())
+        .values_list('participant_id', 'badge_id')
+    )
+
+    awarded = {}
+    new_rows = []
+    for registration_no, points in points_by_participant.items():
+        # Eligible badges are the prefix of the sorted catalog up to the points
+        for badge in badges[:bisect_right(thresholds, points)]:
+            if (registration_no, badge.id) not in held:
+                new_rows.append(ParticipantBadge(participant_id=registration_no, badge=badge, is_claimed=False))
+                awarded.setdefault(registration_no, []).append(badge.name)
+    ParticipantBadge.objects.bulk_create(new_rows, ignore_conflicts=True)
+    return awarded
+
+
+def recalculate_leaderboard(participants=None, batch_size=1000):
+    """
+    Recompute leaderboard_points for the given participants (default: all
+    approved, active ones), save them with bulk_update and award badges.
+    Returns the per-participant breakdown, highest score first.
+    """
+    if participants is None:
+        participants = Participant.objects.filter(approval_status='approved', status='active')
+    participants = list(with_score_components(participants.only(
+        'registration_no', 'name', 'badges_earned', 'is_super_mentor', 'leaderboard_points'
+    )))
+
+    results = []
+    for participant in participants:
+        breakdown = score_breakdown(participant)
+        participant.leaderboard_points = breakdown['total_score']
+        results.append(breakdown)
+    Participant.objects.bulk_update(participants, ['leaderboard_points'], batch_size=batch_size)
+    bump_version_on_commit(ACTIVITY_NAMESPACE)
+    mark_departments_stale([p.registration_no for p in participants])
+
+    awarded = award_point_badges({r['registration_no']: r['total_score'] for r in results})
+    for result in results:
+        if result['registration_no'] in awarded:
+            result['newly_awarded_badges'] = awarded[result['registration_no']]
+
+    # Sort by total score (highest first)
+    results.sort(key=lambda r: r['total_score'], reverse=True)
+    return results
+
+
+def sync_points(scores, chunk_size=500):
+    """
+    Store {registration_no: points} for the participants that exist: one
+    in_bulk() lookup, bulk_update in chunks of chunk_size and one badge
+    awarding pass. Call inside a transaction.
+    Returns (updated participants, newly awarded badges, unknown registration numbers).
+    """
+    participants = Participant.objects.only(
+        'registration_no', 'name', 'leaderboard_points', 'badges_earned', 'is_super_mentor'
+    ).in_bulk(list(scores))
+    unknown = [registration_no for registration_no in scores if registration_no not in participants]
+    # Keep the order the scores came in
+    updated = [participants[registration_no] for registration_no in scores if registration_no in participants]
+
+    for participant in updated:
+        participant.leaderboard_points = scores[participant.registration_no]
+    Participant.objects.bulk_update(updated, ['leaderboard_points'], batch_size=chunk_size)
+    bump_version_on_commit(ACTIVITY_NAMESPACE)
+    mark_departments_stale([p.registration_no for p in updated])
+
+    awarded = award_point_badges({p.registration_no: p.leaderboard_points for p in updated})
+    return updated, awarded, unknown
+
+
+def adjust_points(deltas, sign=1):
+    """
+    Add {registration_no: delta} (times sign) to leaderboard_points in one
+    UPDATE. F() keeps concurrent adjustments from overwriting each other.
+    """
+    deltas = {registration_no: delta * sign for registration_no, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    Participant.objects.filter(registration_no__in=deltas.keys()).update(
+        leaderboard_points=F('leaderboard_points') + Case(
+            *[When(registration_no=registration_no, then=Value(delta)) for registration_no, delta in deltas.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    )
+    bump_version_on_commit(ACTIVITY_NAMESPACE)
+    mark_departments_stale(deltas.keys())
+
+
+def change_claimed_badges(registration_nos, delta):
+    """
+    Add delta (1 for a claim, -1 for a removal) to the participants'
+    badges_earned, never below 0, with one UPDATE. The same statement
+    promotes to super mentor on reaching SUPER_MENTOR_BADGES (or demotes
+    below it when removing) and moves leaderboard_points by the change in
+    badge points. Everything is computed from the row being updated, so
+    concurrent claims can't lose an increment. Call inside a transaction.
+    Returns {registration_no: (badges_earned, is_super_mentor)} as stored.
+    """
+    registration_nos = set(registration_nos)
+    if not registration_nos or not delta:
+        return {}
+    # Rows whose super mentor status flips: those crossing the threshold,
+    # i.e. with SUPER_MENTOR_BADGES - delta badges or more before a claim
+    if delta > 0:
+        flips = Q(badges_earned__gte=SUPER_MENTOR_BADGES - delta, is_super_mentor=False)
+    else:
+        flips = Q(badges_earned__lt=SUPER_MENTOR_BADGES - delta, is_super_mentor=True)
+    badges_earned = Greatest(F('badges_earned') + delta, Value(0))
+    Participant.objects.filter(registration_no__in=registration_nos).update(
+        badges_earned=badges_earned,
+        is_super_mentor=Case(When(flips, then=Value(delta > 0)), default=F('is_super_mentor')),
+        leaderboard_points=F('leaderboard_points') + (badges_earned - F('badges_earned')) * BADGE_POINTS + Case(
+            When(flips, then=Value(SUPER_MENTOR_POINTS if delta > 0 else -SUPER_MENTOR_POINTS)),
+            default=Value(0),
+            output_field=IntegerField(),
+        ),
+    )
+    bump_version_on_commit(ACTIVITY_NAMESPACE)
+    # Badges and super mentor status are matching features
+    bump_version_on_commit(MENTOR_FEATURES_NAMESPACE)
+    mark_departments_stale(registration_nos)
+    rows = Participant.objects.filter(registration_no__in=registration_nos).values_list(
+        'registration_no', 'badges_earned', 'is_super_mentor'
+    )
+    return {registration_no: (badges, is_super_mentor) for registration_no, badges, is_super_mentor in rows}
+
+
+def session_deltas(session):
+    """Points a session is worth to its creator and each participant."""
+    deltas = Counter({session.mentor_id: SESSION_CREATED_POINTS})
+    for registration_no in session.participants.values_list('registration_no', flat=True):
+        deltas[registration_no] += SESSION_ATTENDED_POINTS
+    return deltas
+
+
+def quiz_completion_deltas(quiz):
+    """Points a completed quiz is worth to its assigner, its taker and the taker's mentors."""
+    deltas = Counter()
+    if quiz.mentor_id:
+        deltas[quiz.mentor_id] += quiz.score
+    # Own quiz points only count while the participant has no mentees
+    if not MentorMenteeRelationship.objects.filter(mentor_id=quiz.participant_id).exists():
+        deltas[quiz.participant_id] += quiz.score
+    for mentor_id in MentorMenteeRelationship.objects.filter(mentee_id=quiz.participant_id).values_list('mentor_id', flat=True):
+        deltas[mentor_id] += quiz.score
+    return deltas
+
+
+def quiz_deltas(quiz):
+    """Everything a quiz is currently worth (assignment points plus completion)."""
+    deltas = Counter()
+    if quiz.mentor_id:
+        deltas[quiz.mentor_id] += QUIZ_ASSIGNED_POINTS
+    if quiz.status == 'completed':
+        deltas.update(quiz_completion_deltas(quiz))
+    return deltas
+
+
+def _relationship_points_for(registration_nos):
+    components = score_components()
+    rows = Participant.objects.filter(registration_no__in=registration_nos).annotate(
+        mentees_total=components['mentees_total'],
+        own_quiz_points=components['own_quiz_points'],
+        mentee_quiz_points=components['mentee_quiz_points'],
+    ).values_list('registration_no', 'mentees_total', 'own_quiz_points', 'mentee_quiz_points')
+    return {registration_no: relationship_points(*points) for registration_no, *points in rows}
+
+
+@contextmanager
+def tracking_relationship_points(mentor_registration_nos):
+    """
+    Wrap relationship changes for the given mentors: their relationship
+    points are read before and after and the difference applied.
+    """
+    mentor_registration_nos = {r for r in mentor_registration_nos if r}
+    before = _relationship_points_for(mentor_registration_nos) if mentor_registration_nos else {}
+    yield
+    if mentor_registration_nos:
+        after = _relationship_points_for(mentor_registration_nos)
+        adjust_points({r: after.get(r, 0) - before.get(r, 0) for r in after})
+
+
+ENTRY_FIELDS = [
+    'role', 'mentor_registration_no', 'mentor_name', 'mentees_count', 'sessions_attended', 'tasks_completed',
+    'average_score', 'assigned_quizzes', 'completed_assigned_quizzes', 'average_assigned_score', 'refreshed_at',
+]
+
+
+def entry_components():
+    """Annotation expressions for the LeaderboardEntry statistics."""
+    completed = QuizResult.objects.filter(status='completed')
+    attendance = Session.participants.through.objects.all()
+    return {
+        # Relationship data comes from the denormalized Participant columns
+        'entry_mentees_count': F('mentee_count'),
+        'entry_mentor_registration_no': F('current_mentor_id'),
+        'entry_mentor_name': F('current_mentor__name'),
+        # Sessions created plus sessions attended, without counting a mentor listed in their own session twice
+        'sessions_created': _total(Session.objects.all(), 'mentor', Count('pk')),
+        'sessions_joined': _total(attendance, 'participant', Count('pk')),
+        'sessions_own': _total(attendance.filter(session__mentor=F('participant')), 'participant', Count('pk')),
+        'entry_tasks_completed': _total(completed, 'participant', Count('pk')),
+        'entry_average_score': _total(completed, 'participant', Avg('percentage'), FloatField()),
+        'entry_assigned_quizzes': _total(QuizResult.objects.all(), 'mentor', Count('pk')),
+        'entry_completed_assigned_quizzes': _total(completed, 'mentor', Count('pk')),
+        'entry_average_assigned_score': _total(completed, 'mentor', Avg('percentage'), FloatField()),
+    }
+
+
+def refresh_leaderboard_entries(registration_nos=None, batch_size=1000, invalidate=True):
+    """
+    Recompute the LeaderboardEntry rows for the given participants (default:
+    everyone) with one SELECT and upsert them. Returns the number refreshed.
+    Pass invalidate=False when the entries only catch up with data that
+    cached responses and snapshots already reflect.
+    """
+    participants = Participant.objects.all()
+    if registration_nos is not None:
+        registration_nos = {r for r in registration_nos if r}
+        if not registration_nos:
+            return 0
+        participants = participants.filter(registration_no__in=registration_nos)
+
+    components = entry_components()
+    entries = []
+    for row in participants.annotate(**components).values('registration_no', *components):
+        mentees_count = row['entry_mentees_count']
+        mentor_registration_no = row['entry_mentor_registration_no']
+        entries.append(LeaderboardEntry(
+            participant_id=row['registration_no'],
+            role='mentor' if mentees_count else 'mentee' if mentor_registration_no else 'unknown',
+            mentor_registration_no=mentor_registration_no,
+            mentor_name=row['entry_mentor_name'] or '',
+            mentees_count=mentees_count,
+            sessions_attended=row['sessions_created'] + row['sessions_joined'] - row['sessions_own'],
+            tasks_completed=row['entry_tasks_completed'],
+            average_score=row['entry_average_score'],
+            assigned_quizzes=row['entry_assigned_quizzes'],
+            completed_assigned_quizzes=row['entry_completed_assigned_quizzes'],
+            average_assigned_score=row['entry_average_assigned_score'],
+        ))
+    LeaderboardEntry.objects.bulk_create(
+        entries, batch_size=batch_size,
+        update_conflicts=True, unique_fields=['participant'], update_fields=ENTRY_FIELDS,
+    )
+    if invalidate:
+        bump_version_on_commit(ACTIVITY_NAMESPACE)
+        mark_departments_stale(registration_nos)
+    return len(entries)
+
+
+def attach_missing_entries(participants):
+    """
+    Give participants loaded with select_related('leaderboard_entry') that
+    have no entry yet (e.g. before the first bulk refresh) a fresh one.
+    """
+    missing = [p.registration_no for p in participants if not hasattr(p, 'leaderboard_entry')]
+    if missing:
+        # Built on a read: the data is unchanged, so nothing is invalidated
+        refresh_leaderboard_entries(missing, invalidate=False)
+        entries = LeaderboardEntry.objects.in_bulk(missing)
+        for participant in participants:
+            if participant.registration_no in entries:
+                participant.leaderboard_entry = entries[participant.registration_no]
+
+
+def calculate_feedback_level(average_score):
+    """Calculate feedback level based on average score"""
+    if average_score >= 90:
+        return "Excellent"
+    if average_score >= 80:
+        return "Very Good"
+    if average_score >= 70:
+        return "Good"
+    if average_score >= 60:
+        return "Satisfactory"
+    return "Needs Improvement"
+
+
+def leaderboard_row(participant):
+    """Leaderboard JSON for a participant loaded with its leaderboard_entry"""
+    entry = participant.leaderboard_entry
+    return {
+        'id': participant.registration_no,
+        'name': participant.name,
+        'role': entry.role,
+        'mentorName': entry.mentor_name or 'Not assigned',
+        'mentorId': entry.mentor_registration_no,
+        'menteesCount': entry.mentees_count,
+        'branch': participant.branch,
+        'semester': participant.semester,
+        'techStack': participant.tech_stack,
+        'score': participant.leaderboard_points,
+        'sessionsAttended': entry.sessions_attended,
+        'tasksCompleted': entry.tasks_completed,
+        'averageScore': round(entry.average_score, 2),
+        'feedbackGiven': calculate_feedback_level(entry.average_score),
+        'badges_earned': participant.badges_earned,
+        'is_super_mentor': participant.is_super_mentor,
+        # New fields for assigned quizzes
+        'assignedQuizzes': entry.assigned_quizzes,
+        'completedAssignedQuizzes': entry.completed_assigned_quizzes,
+        'averageAssignedScore': round(entry.average_assigned_score, 2)
+    }
+
+
+def encode_cursor(points, registration_no):
+    """Opaque keyset cursor pointing just after the participant with these points and registration number."""
+    return base64.urlsafe_b64encode(f'{points}:{registration_no}'.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(leaderboard_points, registration_no) from encode_cursor(); ValueError if malformed."""
+    try:
+        points, registration_no = base64.urlsafe_b64decode(cursor.encode()).decode().split(':', 1)
+        return int(points), registration_no
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
+
+
+def leaderboard_page(participants, cursor=None, limit=50):
+    """
+    One page of `participants` in leaderboard order, starting after `cursor`.
+    The keyset filter is an index range scan, however deep the page.
+    Returns (participants, next_cursor); next_cursor is None on the last page.
+    """
+    participants = participants.order_by(*LEADERBOARD_ORDER)
+    if cursor:
+        points, registration_no = decode_cursor(cursor)
+        participants = participants.filter(
+            Q(leaderboard_points__lt=points) | Q(leaderboard_points=points, registration_no__gt=registration_no)
+        )
+    page = list(participants[:limit + 1])
+    next_cursor = None
+    if len(page) > limit:
+        next_cursor = encode_cursor(page[limit - 1].leaderboard_points, page[limit - 1].registration_no)
+    return page[:limit], next_cursor
+
+
+def _rank_of(participants, points):
+    """RANK() of a score within `participants`: 1 + how many score higher (ties share a rank)."""
+    return participants.filter(leaderboard_points__gt=points).count() + 1
+
+
+def rank_with_neighbours(participants, registration_no, window=5):
+    """
+    Rank and position (1-based place in leaderboard order) of
+    `registration_no` within `participants`, plus up to `window` entries
+    above and below it. Every query is a range scan on the leaderboard index
+    bounded by the participant's rank or `window`; the full list is never
+    loaded. Returns (current, nearby) or (None, []) if the participant is not
+    in `participants`.
+    """
+    fields = ('registration_no', 'name', 'leaderboard_points')
+    current = participants.filter(registration_no=registration_no).values(*fields).first()
+    if current is None:
+        return None, []
+    points = current['leaderboard_points']
+    current['rank'] = _rank_of(participants, points)
+    current['position'] = current['rank'] + participants.filter(
+        leaderboard_points=points, registration_no__lt=registration_no
+    ).count()
+    current['total'] = participants.count()
+
+    above = list(participants.filter(
+        Q(leaderboard_points__gt=points) | Q(leaderboard_points=points, registration_no__lt=registration_no)
+    ).order_by('leaderboard_points', '-registration_no').values(*fields)[:window])[::-1]
+    below = list(participants.filter(
+        Q(leaderboard_points__lt=points) | Q(leaderboard_points=points, registration_no__gt=registration_no)
+    ).order_by(*LEADERBOARD_ORDER).values(*fields)[:window])
+    nearby = above + [{field: current[field] for field in fields}] + below
+
+    # Positions are consecutive; only the first entry's rank needs a count,
+    # after that a rank is the position where the score last changed
+    for offset, entry in enumerate(nearby):
+        entry['position'] = current['position'] - len(above) + offset
+        if offset == 0:
+            entry['rank'] = _rank_of(participants, entry['leaderboard_points'])
+        elif entry['leaderboard_points'] == nearby[offset - 1]['leaderboard_points']:
+            entry['rank'] = nearby[offset - 1]['rank']
+        else:
+            entry['rank'] = entry['position']
+    return current, nearby
+
+
+def leaderboard_participants():
+    """Approved, active participants with what leaderboard_row() reads, in leaderboard order."""
+    return Participant.objects.filter(
+        approval_status='approved',
+        status='active'
+    ).select_related('leaderboard_entry').only(
+        'registration_no', 'name', 'branch', 'semester', 'tech_stack', 'leaderboard_points',
+        'badges_earned', 'is_super_mentor', 'department_id', 'leaderboard_entry'
+    ).order_by(*LEADERBOARD_ORDER)
+
+
+def search_filter(search):
+    """
+    Q for participants whose name contains `search` or whose tech stack or
+    interests hold one of the SkillTokens containing it, shortest names
+    first and at most SEARCH_TOKEN_LIMIT of them. Backends without JSON
+    containment (SQLite) match the tech_stack and areas_of_interest text
+    instead.
+    """
+    query = Q(name__icontains=search)
+    if not connection.features.supports_json_field_contains:
+        return query | Q(tech_stack__icontains=search) | Q(areas_of_interest__icontains=search)
+    token_ids = SkillToken.objects.filter(
+        name__icontains=search.strip().lower()
+    ).order_by(Length('name'), 'name').values_list('id', flat=True)[:SEARCH_TOKEN_LIMIT]
+    for token_id in token_ids:
+        query |= Q(tech_stack_tokens__contains=[token_id]) | Q(interest_tokens__contains=[token_id])
+    return query
+
+
+def refresh_department_snapshots(department_ids=None, batch_size=100):
+    """
+    Recompute the leaderboard snapshots of the given departments (default:
+    all) from one SELECT ordered by department and leaderboard order, and
+    upsert them. Returns the number of snapshots written.
+    """
+    departments = Department.objects.all()
+    if department_ids is not None:
+        departments = departments.filter(id__in=department_ids)
+    department_ids = list(departments.values_list('id', flat=True))
+    if not department_ids:
+        return 0
+
+    # Versions read before the data: a write landing during the pass bumps
+    # the version again, so the snapshot stays stale instead of losing it
+    versions = dict(DepartmentLeaderboardSnapshot.objects.filter(
+        department_id__in=department_ids
+    ).values_list('department_id', 'version'))
+
+    participants = list(leaderboard_participants().filter(department_id__in=department_ids).order_by(
+        'department_id', *LEADERBOARD_ORDER
+    ))
+    # Missing entries are built without invalidating anything, so the
+    # snapshot computed from them is not marked stale straight away
+    attach_missing_entries(participants)
+    rows = {department_id: [] for department_id in department_ids}
+    for participant in participants:
+        rows[participant.department_id].append(leaderboard_row(participant))
+
+    computed_at = timezone.now()
+    snapshots = [
+        DepartmentLeaderboardSnapshot(
+            department_id=department_id,
+            rows=department_rows,
+            participant_count=len(department_rows),
+            version=versions.get(department_id, 0),
+            computed_version=versions.get(department_id, 0),
+            computed_at=computed_at,
+        )
+        for department_id, department_rows in rows.items()
+    ]
+    DepartmentLeaderboardSnapshot.objects.bulk_create(
+        snapshots, batch_size=batch_size, update_conflicts=True, unique_fields=['department'],
+        update_fields=['rows', 'participant_count', 'computed_version', 'computed_at'],
+    )
+    return len(snapshots)
+
+
+def department_snapshot(department_id):
+    """
+    The department's leaderboard snapshot, recomputed first if it is missing
+    or stale. None if the department does not exist.
+    """
+    snapshot = DepartmentLeaderboardSnapshot.objects.filter(department_id=department_id).first()
+    if snapshot is None or snapshot.is_stale:
+        if not refresh_department_snapshots([department_id]):
+            return None
+        snapshot = DepartmentLeaderboardSnapshot.objects.get(department_id=department_id)
+    return snapshot
+
+
+def snapshot_page(rows, cursor=None, limit=50):
+    """leaderboard_page() over snapshot rows, which are already in leaderboard order."""
+    if cursor:
+        points, registration_no = decode_cursor(cursor)
+        rows = [row for row in rows if (-row['score'], row['id']) > (-points, registration_no)]
+    next_cursor = encode_cursor(rows[limit - 1]['score'], rows[limit - 1]['id']) if len(rows) > limit else None
+    return rows[:limit], next_cursor
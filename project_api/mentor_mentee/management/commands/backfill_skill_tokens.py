@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from mentor_mentee.caching import MENTOR_FEATURES_NAMESPACE, bump_version_on_commit
+from mentor_mentee.models import Participant, SkillToken
+
+class Command(BaseCommand):
+    help = 'Computes the normalized skill token ids for existing participants'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Participants processed per batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        participants = Participant.objects.only('registration_no', *Participant.SKILL_SOURCE_FIELDS).order_by('registration_no')
+        total = participants.count()
+        self.stdout.write(f"Backfilling skill tokens for {total} participants")
+
+        updated = 0
+        batch = []
+        for participant in participants.iterator(chunk_size=batch_size):
+            batch.append(participant)
+            if len(batch) >= batch_size:
+                updated += self.backfill(batch)
+                batch = []
+        if batch:
+            updated += self.backfill(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated {updated} participants, vocabulary has {SkillToken.objects.count()} tokens"
+        ))
+
+    def backfill(self, batch):
+        # Resolve every name in the batch with one lookup instead of one per participant
+        names = set()
+        for participant in batch:
+            tech, interests, preferences = participant.skill_names()
+            names.update(tech + interests + [p for p in preferences if p])
+
+        with transaction.atomic():
+            token_ids = SkillToken.ids_for(names)
+            for participant in batch:
+                participant.refresh_skill_tokens(token_ids)
+            Participant.objects.bulk_update(batch, Participant.SKILL_TOKEN_FIELDS)
+            bump_version_on_commit(MENTOR_FEATURES_NAMESPACE)
+        return len(batch)
@@ -0,0 +1,70 @@
+import random
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from mentor_mentee.matching import MatchingEngine, SkillIndex, attach_historical_data, load_match_records, load_token_names
+from mentor_mentee.models import Participant
+from mentor_mentee.management.commands.generate_test_data import generate_participants
+
+class Command(BaseCommand):
+    help = 'Benchmarks greedy matching with the inverted skill index against the full mentor scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--synthetic', type=int, default=0, help='Use N generated participants instead of the database')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for --synthetic')
+        parser.add_argument('--by-department', action='store_true', help='Match each department (or branch) separately')
+
+    def handle(self, *args, **options):
+        if options['synthetic']:
+            random.seed(options['seed'])
+            students = generate_participants(options['synthetic'])
+            for student in students:
+                student['department_id'] = student['branch']
+                student['historical_data'] = None
+        else:
+            students = load_match_records(Participant.objects.filter(approval_status='approved', status='active'))
+            attach_historical_data(students)
+
+        if options['by_department']:
+            cohorts = defaultdict(list)
+            for student in students:
+                cohorts[student.get('department_id')].append(student)
+            cohorts = list(cohorts.values())
+        else:
+            cohorts = [students]
+
+        token_names = load_token_names(students)
+        totals = defaultdict(float)
+        for cohort in cohorts:
+            mentors = [s for s in cohort if s['mentoring_preferences'] == 'mentor']
+            mentees = [s for s in cohort if s['mentoring_preferences'] == 'mentee']
+            if not mentors or not mentees:
+                continue
+            engine = MatchingEngine(mentors, mentees, token_names=token_names)
+
+            start = time.perf_counter()
+            full_result = engine.greedy_assign()
+            totals['full_seconds'] += time.perf_counter() - start
+            totals['full_pairs'] += len(mentors) * len(mentees)
+
+            start = time.perf_counter()
+            index = SkillIndex.build(engine)
+            indexed_result = engine.greedy_assign(index=index)
+            totals['indexed_seconds'] += time.perf_counter() - start
+            totals['indexed_pairs'] += engine.pairs_scored
+
+            if full_result[0] != indexed_result[0]:
+                self.stdout.write(self.style.ERROR(f"Indexed matching differs from the full scan ({len(mentors)} mentors, {len(mentees)} mentees)"))
+                return
+
+        if not totals['full_pairs']:
+            self.stdout.write(self.style.WARNING("No cohort has both mentors and mentees"))
+            return
+
+        self.stdout.write(f"Participants: {len(students)} in {len(cohorts)} cohort(s)")
+        self.stdout.write(f"Full scan:     {int(totals['full_pairs'])} pairs scored in {totals['full_seconds']:.3f}s")
+        self.stdout.write(f"Skill index:   {int(totals['indexed_pairs'])} pairs scored in {totals['indexed_seconds']:.3f}s")
+        self.stdout.write(self.style.SUCCESS(
+            f"Pairs scored reduced {totals['full_pairs'] / max(totals['indexed_pairs'], 1):.1f}x, identical assignments"
+        ))
@@ -0,0 +1,144 @@
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from account.models import Department
+from mentor_mentee.matching import load_match_records, match_by_department, match_mentors_mentees
+from mentor_mentee.models import Participant
+from mentor_mentee.relationships import save_matches
+from mentor_mentee.synthetic import BRANCHES, bulk_load_cohort, generate_cohort
+
+STRATEGIES = ('greedy', 'greedy_indexed', 'optimal', 'sharded')
+
+
+class QueryCounter:
+    """connection.execute_wrapper() hook counting queries without keeping the SQL"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks matching on reproducible synthetic cohorts and writes the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='Cohort sizes to run')
+        parser.add_argument('--seed', type=int, default=42, help='Seed for the generated cohorts')
+        parser.add_argument('--strategies', nargs='+', choices=STRATEGIES, default=list(STRATEGIES),
+                            help='Matching strategies to time')
+        parser.add_argument('--optimal-max', type=int, default=10000,
+                            help='Largest cohort for the optimal strategy (its score matrix is O(mentors x mentees))')
+        parser.add_argument('--no-memory', action='store_true', help='Skip the tracemalloc pass (peak memory)')
+        parser.add_argument('--output', default='matching_benchmark.json', help='Where to write the JSON results')
+
+    def handle(self, *args, **options):
+        self.track_memory = not options['no_memory']
+        results = []
+        for size in options['sizes']:
+            self.stdout.write(f"Cohort of {size} participants")
+            # Everything is rolled back, the database is left as it was
+            with transaction.atomic():
+                results.append(self.run_cohort(size, options))
+                transaction.set_rollback(True)
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'seed': options['seed'],
+            'environment': {
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'database': connection.vendor,
+                'cpu_count': os.cpu_count(),
+            },
+            'results': results,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Benchmark results written to {options['output']}"))
+
+    def measure(self, label, fn, rollback=False):
+        """
+        Run fn and return (result, stats). Wall time and query count come from
+        a plain run; peak memory from a separate tracemalloc run, since tracing
+        slows allocations down. Writes are undone when rollback=True (the
+        tracemalloc run of a write is always undone).
+        """
+        stats = {}
+        if self.track_memory:
+            tracemalloc.start()
+            with transaction.atomic():
+                fn()
+                transaction.set_rollback(True)
+            stats['peak_memory_mb'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+            tracemalloc.stop()
+
+        counter = QueryCounter()
+        with transaction.atomic(), connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            result = fn()
+            stats['wall_seconds'] = round(time.perf_counter() - started, 4)
+            if rollback:
+                transaction.set_rollback(True)
+        stats['queries'] = counter.count
+
+        self.stdout.write(f"  {label}: {stats['wall_seconds']}s, {stats['queries']} queries"
+                          + (f", peak {stats['peak_memory_mb']} MB" if 'peak_memory_mb' in stats else ''))
+        return result, stats
+
+    def run_cohort(self, size, options):
+        phases = {}
+        (participants, histories), phases['generate'] = self.measure(
+            'generate', lambda: generate_cohort(size, seed=options['seed'])
+        )
+
+        # Departments for every branch code so sharded matching has real shards
+        for code in BRANCHES:
+            Department.objects.get_or_create(code=code.upper(), defaults={'name': f'Benchmark {code.upper()}'})
+        _, phases['bulk_load'] = self.measure('bulk_load', lambda: bulk_load_cohort(participants, histories))
+
+        queryset = Participant.objects.filter(registration_no__in=[p['registration_no'] for p in participants])
+        students, phases['load_records'] = self.measure('load_records', lambda: load_match_records(queryset))
+
+        runners = {
+            'greedy': lambda: match_mentors_mentees(students, strategy='greedy'),
+            'greedy_indexed': lambda: match_mentors_mentees(students, strategy='greedy', use_index=True),
+            'optimal': lambda: match_mentors_mentees(students, strategy='optimal'),
+            'sharded': lambda: match_by_department(students, strategy='greedy'),
+        }
+        greedy_result = None
+        for strategy in options['strategies']:
+            if strategy == 'optimal' and size > options['optimal_max']:
+                phases[strategy] = {'skipped': f'cohort larger than --optimal-max {options["optimal_max"]}'}
+                continue
+            result, phases[strategy] = self.measure(strategy, runners[strategy])
+            statistics = result['statistics']
+            phases[strategy]['matches_made'] = statistics['matches_made']
+            if 'total_match_quality' in statistics:
+                phases[strategy]['total_match_quality'] = statistics['total_match_quality']
+            if strategy == 'greedy':
+                greedy_result = result
+
+        if greedy_result is None:
+            greedy_result = match_mentors_mentees(students)
+        _, phases['persistence'] = self.measure(
+            'persistence', lambda: save_matches(greedy_result['matches']), rollback=True
+        )
+
+        return {
+            'size': size,
+            'mentors': sum(1 for s in students if s['mentoring_preferences'] == 'mentor'),
+            'mentees': sum(1 for s in students if s['mentoring_preferences'] == 'mentee'),
+            'histories': len(histories),
+            'phases': phases,
+        }
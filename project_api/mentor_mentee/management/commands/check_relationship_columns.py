@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from mentor_mentee.models import Participant
+from mentor_mentee.relationships import relationship_columns, sync_relationship_columns
+
+class Command(BaseCommand):
+    help = 'Compares the denormalized mentee_count/current_mentor columns against the relationships table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Recompute the columns of inconsistent participants')
+        parser.add_argument('--limit', type=int, default=50, help='Inconsistent participants listed in the report')
+
+    def handle(self, *args, **options):
+        expected = relationship_columns()
+        participants = Participant.objects.annotate(
+            expected_mentee_count=expected['mentee_count'],
+            expected_mentor=expected['current_mentor'],
+        ).values_list(
+            'registration_no', 'mentee_count', 'expected_mentee_count', 'current_mentor', 'expected_mentor'
+        ).order_by('registration_no')
+
+        inconsistent = []
+        checked = 0
+        for registration_no, count, expected_count, mentor, expected_mentor in participants:
+            checked += 1
+            if count != expected_count or mentor != expected_mentor:
+                inconsistent.append((registration_no, count, expected_count, mentor, expected_mentor))
+
+        self.stdout.write(f"Checked {checked} participants, {len(inconsistent)} are inconsistent")
+        for registration_no, count, expected_count, mentor, expected_mentor in inconsistent[:options['limit']]:
+            self.stdout.write(
+                f"  {registration_no}: mentee_count {count} (expected {expected_count}), "
+                f"current_mentor {mentor} (expected {expected_mentor})"
+            )
+
+        if not inconsistent:
+            self.stdout.write(self.style.SUCCESS("Relationship columns are consistent"))
+            return
+        if not options['fix']:
+            self.stdout.write(self.style.WARNING("Run with --fix to recompute the columns"))
+            return
+
+        with transaction.atomic():
+            fixed = sync_relationship_columns([row[0] for row in inconsistent])
+        self.stdout.write(self.style.SUCCESS(f"Fixed relationship columns for {fixed} participants"))
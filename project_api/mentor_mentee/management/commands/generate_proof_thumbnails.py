@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from mentor_mentee.models import ProofDocument
+from mentor_mentee.thumbnails import ensure_thumbnail, prune_thumbnails
+
+class Command(BaseCommand):
+    help = 'Renders the missing proof thumbnails shown in the approval queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pending-only', action='store_true',
+                            help='Only proofs of participants awaiting approval')
+        parser.add_argument('--prune', action='store_true',
+                            help='Also delete thumbnails no proof document refers to')
+
+    def handle(self, *args, **options):
+        documents = ProofDocument.objects.exclude(file='').order_by('id')
+        if options['pending_only']:
+            documents = documents.filter(participant__approval_status='pending')
+
+        rendered = failed = 0
+        for file_name, sha256, content_type in documents.values_list('file', 'sha256', 'content_type').iterator():
+            try:
+                rendered += ensure_thumbnail(file_name, sha256, content_type)
+            except Exception as e:
+                failed += 1
+                self.stdout.write(self.style.WARNING(f"  {file_name}: {str(e)}"))
+        self.stdout.write(self.style.SUCCESS(f"Rendered {rendered} thumbnails ({failed} failed)"))
+
+        if options['prune']:
+            referenced = set(ProofDocument.objects.values_list('sha256', flat=True))
+            removed = prune_thumbnails(referenced)
+            self.stdout.write(self.style.SUCCESS(f"Removed {removed} unreferenced thumbnails"))
@@ -79,12 +79,10 @@ class Command(BaseCommand):
                     internship_experience=safe_get('internship_experience'),
                     number_of_internships=safe_num('number_of_internships'),
                     internship_description=safe_get('internship_description'),
-                    proof_of_internships=None,  # No files in test data
                     seminars_or_workshops_attended=safe_get('seminars_or_workshops_attended'),
                     describe_seminars_or_workshops=safe_get('describe_seminars_or_workshops'),
                     extracurricular_activities=safe_get('extracurricular_activities'),
                     describe_extracurricular_activities=safe_get('describe_extracurricular_activities'),
-                    proof_of_extracurricular_activities=None,  # No files in test data
                     date=pd.to_datetime(row['date'])
                 )
                 
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from mentor_mentee.leaderboard import score_breakdown, with_score_components
+from mentor_mentee.models import Participant
+
+class Command(BaseCommand):
+    help = 'Compares the incrementally maintained leaderboard points against a full recomputation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Overwrite drifted points with the recomputed score')
+        parser.add_argument('--limit', type=int, default=50, help='Drifted participants listed in the report')
+
+    def handle(self, *args, **options):
+        participants = with_score_components(
+            Participant.objects.filter(approval_status='approved', status='active').only(
+                'registration_no', 'name', 'badges_earned', 'is_super_mentor', 'leaderboard_points'
+            ).order_by('registration_no')
+        )
+
+        drifted = []
+        checked = 0
+        for participant in participants:
+            checked += 1
+            expected = score_breakdown(participant)['total_score']
+            if participant.leaderboard_points != expected:
+                drifted.append((participant, expected))
+
+        self.stdout.write(f"Checked {checked} participants, {len(drifted)} have drifted")
+        for participant, expected in drifted[:options['limit']]:
+            self.stdout.write(
+                f"  {participant.registration_no}: stored {participant.leaderboard_points}, "
+                f"expected {expected} ({participant.leaderboard_points - expected:+d})"
+            )
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("Leaderboard points are consistent"))
+            return
+        if not options['fix']:
+            self.stdout.write(self.style.WARNING("Run with --fix to store the recomputed points"))
+            return
+
+        with transaction.atomic():
+            for participant, expected in drifted:
+                participant.leaderboard_points = expected
+            Participant.objects.bulk_update([p for p, _ in drifted], ['leaderboard_points'], batch_size=1000)
+        self.stdout.write(self.style.SUCCESS(f"Fixed leaderboard points for {len(drifted)} participants"))
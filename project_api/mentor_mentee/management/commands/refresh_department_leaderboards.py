@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from mentor_mentee.leaderboard import refresh_department_snapshots
+
+class Command(BaseCommand):
+    help = 'Recomputes the leaderboard snapshot of every department in one pass'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--department', type=int, action='append', dest='departments',
+                            help='Only refresh this department (repeatable)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            refreshed = refresh_department_snapshots(options['departments'])
+        self.stdout.write(self.style.SUCCESS(f"Refreshed leaderboard snapshots for {refreshed} departments"))
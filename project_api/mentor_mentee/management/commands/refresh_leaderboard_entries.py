@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from mentor_mentee.leaderboard import refresh_leaderboard_entries
+
+class Command(BaseCommand):
+    help = 'Recomputes the materialized leaderboard statistics for every participant'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Entries written per upsert')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            refreshed = refresh_leaderboard_entries(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Refreshed leaderboard entries for {refreshed} participants"))
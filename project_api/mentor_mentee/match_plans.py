@@ -0,0 +1,66 @@
+"""
+Dry-run matching plans: match_participants?plan=true stores the proposed
+matches instead of writing relationships, and commit_match_plan applies them
+later with relationships.save_matches(), provided the matching inputs are
+unchanged.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .matching import MATCH_FIELDS
+from .models import MatchPlan, MentorMenteeRelationship, Participant, ParticipantHistory
+
+# How long a plan can be committed after it was made
+MATCH_PLAN_TTL = timedelta(minutes=30)
+
+# ParticipantHistory fields that matching.attach_historical_data() reads
+HISTORY_FIELDS = (
+    'id', 'registration_no', 'total_badges_earned', 'total_leaderboard_points', 'total_quizzes_completed',
+    'average_quiz_score', 'was_mentor', 'was_mentee', 'mentor_rating', 'mentee_rating', 'sessions_attended',
+    'sessions_conducted',
+)
+
+
+def matching_fingerprint(department=None):
+    """
+    SHA-256 over everything matching reads for a scope: the approved, active
+    participants' matching fields, their archived history and the existing
+    relationships.
+    """
+    participants = Participant.objects.filter(approval_status='approved', status='active')
+    relationships = MentorMenteeRelationship.objects.all()
+    if department:
+        participants = participants.filter(department=department)
+        relationships = relationships.filter(Q(mentor__department=department) | Q(mentee__department=department))
+
+    digest = hashlib.sha256()
+    for row in participants.order_by('registration_no').values_list(*MATCH_FIELDS).iterator():
+        digest.update(repr(row).encode())
+    digest.update(b'|history|')
+    history = ParticipantHistory.objects.filter(registration_no__in=participants.values('registration_no'))
+    for row in history.order_by('registration_no', 'id').values_list(*HISTORY_FIELDS).iterator():
+        digest.update(repr(row).encode())
+    digest.update(b'|relationships|')
+    for row in relationships.order_by('mentor_id', 'mentee_id').values_list('mentor_id', 'mentee_id').iterator():
+        digest.update(repr(row).encode())
+    return digest.hexdigest()
+
+
+def create_match_plan(department, strategy, matches, fingerprint, sharded=False):
+    """Store the result of a matching run as a plan; expired plans are dropped on the way."""
+    now = timezone.now()
+    MatchPlan.objects.filter(expires_at__lt=now, committed_at__isnull=True).delete()
+    return MatchPlan.objects.create(
+        department=department,
+        strategy=strategy,
+        fingerprint=fingerprint,
+        payload={
+            'matches': matches['matches'],
+            'statistics': matches.get('statistics', {}),
+            'sharded': sharded,
+        },
+        expires_at=now + MATCH_PLAN_TTL,
+    )
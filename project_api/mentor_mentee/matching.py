@@ -0,0 +1,898 @@
+"""
+Mentor-mentee matching engine.
+
+Every participant is encoded once into NumPy arrays (skill count matrices,
+preference weights and history-derived quality terms) so the full
+mentor x mentee score matrix can be computed with batched array operations
+instead of calling has_common_interests() for every pair.
+"""
+import math
+import os
+import time
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+import numpy as np
+
+from .models import Participant, ParticipantHistory, SkillToken, normalize_skills
+
+MAX_MENTEES_PER_MENTOR = 4
+
+# Weights for interest_preference1..3 (highest priority first)
+PREFERENCE_WEIGHTS = (10, 6, 3)
+
+# Number of mentee rows scored at once, keeps the score block small in memory
+SCORE_BLOCK_SIZE = 256
+
+# Assignment strategies accepted by match_mentors_mentees()
+MATCHING_STRATEGIES = ('greedy', 'optimal')
+
+# Participant fields the matching engine reads
+MATCH_FIELDS = (
+    'registration_no', 'name', 'semester', 'branch', 'department_id', 'mentoring_preferences',
+    'tech_stack', 'areas_of_interest', 'interest_preference1', 'interest_preference2',
+    'interest_preference3', 'badges_earned', 'is_super_mentor',
+    'tech_stack_tokens', 'interest_tokens', 'preference_tokens',
+)
+
+
+def split_skills(value):
+    """Split a comma-separated skill field into stripped, non-empty entries."""
+    if not value:
+        return []
+    return [item.strip() for item in str(value).split(',') if item.strip()]
+
+
+def has_common_interests(mentor, mentee):
+    """
+    Check if mentor and mentee share common tech stack or areas of interest.
+    Takes into account interest priorities of both mentor and mentee.
+    Returns tuple of (common_tech, common_interests, preference_score)
+    """
+    # Handle possible nan or empty values
+    mentor_tech = split_skills(mentor.get('tech_stack'))
+    mentee_tech = split_skills(mentee.get('tech_stack'))
+    mentor_interests = split_skills(mentor.get('areas_of_interest'))
+    mentee_interests = split_skills(mentee.get('areas_of_interest'))
+
+    # Get prioritized interests
+    mentor_prefs = [(mentor.get(f'interest_preference{i}') or '').strip() for i in range(1, 4)]
+    mentee_prefs = [(mentee.get(f'interest_preference{i}') or '').strip() for i in range(1, 4)]
+
+    # Find common tech stack and interests
+    common_tech = []
+    for m_tech in mentor_tech:
+        for s_tech in mentee_tech:
+            if m_tech.lower() in s_tech.lower() or s_tech.lower() in m_tech.lower():
+                common_tech.append((m_tech, s_tech))
+
+    common_interests = []
+    for m_int in mentor_interests:
+        for s_int in mentee_interests:
+            if m_int.lower() in s_int.lower() or s_int.lower() in m_int.lower():
+                common_interests.append((m_int, s_int))
+
+    # Calculate preference match score (higher is better)
+    preference_score = 0
+
+    # Check if mentor's preferences match mentee's interests/tech
+    for pref, weight in zip(mentor_prefs, PREFERENCE_WEIGHTS):
+        if pref:
+            if any(pref.lower() in interest.lower() for interest in mentee_interests) or \
+               any(pref.lower() in tech.lower() for tech in mentee_tech):
+                preference_score += weight
+
+    # Check if mentee's preferences match mentor's interests/tech
+    for pref, weight in zip(mentee_prefs, PREFERENCE_WEIGHTS):
+        if pref:
+            if any(pref.lower() in interest.lower() for interest in mentor_interests) or \
+               any(pref.lower() in tech.lower() for tech in mentor_tech):
+                preference_score += weight
+
+    return common_tech, common_interests, preference_score
+
+
+def calculate_match_quality(mentor, mentee):
+    """Calculate the match quality score between a mentor and mentee"""
+    quality_score = 0
+
+    # Consider mentor's historical performance
+    if mentor.get('historical_data'):
+        mentor_history = mentor['historical_data']
+        if mentor_history['was_mentor'] and mentor_history['mentor_rating']:
+            quality_score += min(mentor_history['mentor_rating'] / 2, 2)  # Max 2 points for good rating
+        if mentor_history['sessions_conducted'] > 0:
+            quality_score += min(mentor_history['sessions_conducted'] / 5, 1)  # Max 1 point for session experience
+
+    # Consider mentee's historical performance
+    if mentee.get('historical_data'):
+        mentee_history = mentee['historical_data']
+        if mentee_history['was_mentee'] and mentee_history['mentee_rating']:
+            quality_score += min(mentee_history['mentee_rating'] / 2, 2)  # Max 2 points for good rating
+        if mentee_history['sessions_attended'] > 0:
+            quality_score += min(mentee_history['sessions_attended'] / 5, 1)  # Max 1 point for session attendance
+
+    # Consider badges and super mentor status
+    if mentor.get('badges_earned'):
+        badge_count = int(mentor['badges_earned'])
+        quality_score += min(badge_count * 0.5, 2)  # Max 2 points for badges
+
+    if mentor.get('is_super_mentor'):
+        quality_score += 2  # Bonus points for super mentors
+
+    return quality_score
+
+
+def pair_match_details(mentor, mentee):
+    """Score a single pair exactly like the matcher does, with the overlap details."""
+    common_tech, common_interests, preference_score = has_common_interests(mentor, mentee)
+    match_quality = calculate_match_quality(mentor, mentee)
+    if common_tech or common_interests:
+        match_quality += len(common_tech) + len(common_interests)
+    match_quality += preference_score
+    return match_quality, common_tech, common_interests, preference_score
+
+
+class MatchRecord:
+    """
+    Compact participant row for matching: the MATCH_FIELDS columns plus the
+    attached historical data in __slots__, with the dict-style access
+    (record['name'], record.get(...)) the engine uses.
+    """
+    __slots__ = MATCH_FIELDS + ('historical_data',)
+
+    def __init__(self, values):
+        for field, value in zip(MATCH_FIELDS, values):
+            setattr(self, field, value)
+        self.historical_data = None
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def keys(self):
+        return self.__slots__
+
+    def __repr__(self):
+        return f'<MatchRecord {self.registration_no} ({self.mentoring_preferences})>'
+
+
+def load_match_records(queryset):
+    """
+    MatchRecords for a Participant queryset in one query that selects only
+    MATCH_FIELDS, so unused columns stay in the database.
+    """
+    rows = queryset.values_list(*MATCH_FIELDS).iterator(chunk_size=2000)
+    return [MatchRecord(row) for row in rows]
+
+
+def attach_historical_data(students):
+    """Attach archived ParticipantHistory data to each student dict (one query)."""
+    registration_nos = [s['registration_no'] for s in students]
+    historical_data = {
+        h.registration_no: h for h in ParticipantHistory.objects.filter(
+            registration_no__in=registration_nos
+        )
+    }
+
+    for student in students:
+        history = historical_data.get(student['registration_no'])
+        if history:
+            student['historical_data'] = {
+                'total_badges': history.total_badges_earned,
+                'total_points': history.total_leaderboard_points,
+                'quizzes_completed': history.total_quizzes_completed,
+                'average_quiz_score': history.average_quiz_score,
+                'was_mentor': history.was_mentor,
+                'was_mentee': history.was_mentee,
+                'mentor_rating': history.mentor_rating,
+                'mentee_rating': history.mentee_rating,
+                'sessions_attended': history.sessions_attended,
+                'sessions_conducted': history.sessions_conducted
+            }
+        else:
+            student['historical_data'] = None
+
+
+def load_token_names(students):
+    """{id: name} for every SkillToken referenced by the students (one query)."""
+    token_ids = set()
+    for student in students:
+        for field in Participant.SKILL_TOKEN_FIELDS:
+            token_ids.update(i for i in (student.get(field) or []) if i is not None)
+    if not token_ids:
+        return {}
+    return dict(SkillToken.objects.filter(id__in=token_ids).values_list('id', 'name'))
+
+
+def skill_names(student, token_names):
+    """
+    Normalized (tech_stack, areas_of_interest, preferences) names for a student,
+    read from the precomputed SkillToken ids. Rows that have not been backfilled
+    yet fall back to parsing the text fields the same way Participant.save() does.
+    """
+    tech_ids = student.get('tech_stack_tokens') or []
+    interest_ids = student.get('interest_tokens') or []
+    pref_ids = student.get('preference_tokens') or []
+    has_tokens = (tech_ids or not student.get('tech_stack')) and (interest_ids or not student.get('areas_of_interest'))
+    if has_tokens and len(pref_ids) == 3 and all(i is None or i in token_names for i in tech_ids + interest_ids + pref_ids):
+        return (
+            [token_names[i] for i in tech_ids],
+            [token_names[i] for i in interest_ids],
+            [token_names[i] if i is not None else '' for i in pref_ids],
+        )
+
+    preferences = [(student.get(f'interest_preference{i}') or '').strip().lower() for i in range(1, 4)]
+    return normalize_skills(student.get('tech_stack')), normalize_skills(student.get('areas_of_interest')), preferences
+
+
+def containment_matrix(needles, haystack):
+    """
+    Boolean matrix C where C[i, j] is True when needles[i] is a substring of
+    haystack[j]. The haystack is joined into one string so each needle is a
+    handful of str.find() calls instead of len(haystack) substring tests.
+    """
+    result = np.zeros((len(needles), len(haystack)), dtype=bool)
+    if not needles or not haystack:
+        return result
+
+    starts = []
+    offset = 0
+    for item in haystack:
+        starts.append(offset)
+        offset += len(item) + 1
+    joined = '\x00'.join(haystack)
+
+    for i, needle in enumerate(needles):
+        if not needle:
+            continue
+        pos = joined.find(needle)
+        while pos != -1:
+            j = bisect_right(starts, pos) - 1
+            result[i, j] = True
+            if j + 1 >= len(starts):
+                break
+            pos = joined.find(needle, starts[j + 1])
+    return result
+
+
+def _history_terms(student, role):
+    """Return the (rating, sessions) quality terms for one side of a pair."""
+    history = student.get('historical_data')
+    if not history:
+        return 0.0, 0.0
+    if role == 'mentor':
+        was_role, rating, sessions = history['was_mentor'], history['mentor_rating'], history['sessions_conducted']
+    else:
+        was_role, rating, sessions = history['was_mentee'], history['mentee_rating'], history['sessions_attended']
+    rating_term = min(rating / 2, 2) if was_role and rating else 0.0
+    sessions_term = min(sessions / 5, 1) if sessions > 0 else 0.0
+    return float(rating_term), float(sessions_term)
+
+
+class MatchingEngine:
+    """
+    Encodes mentors and mentees once and scores them with array operations.
+
+    score(mentor, mentee) = calculate_match_quality() + len(common_tech)
+                            + len(common_interests) + preference_score
+
+    which is exactly what pair_match_details() returns for the same pair.
+    """
+
+    def __init__(self, mentors, mentees, token_names=None):
+        self.mentors = mentors
+        self.mentees = mentees
+        token_names = token_names or {}
+
+        vocabulary = {}
+        preferences = {}
+        mentor_profiles = [self._encode_profile(m, vocabulary, preferences, token_names) for m in mentors]
+        mentee_profiles = [self._encode_profile(m, vocabulary, preferences, token_names) for m in mentees]
+
+        tokens = list(vocabulary)
+        pref_strings = list(preferences)
+        self.tokens = tokens
+        self.pref_strings = pref_strings
+        self.mentor_profiles = mentor_profiles
+        self.mentee_profiles = mentee_profiles
+        # Mentors are encoded first, so their token / preference ids only depend
+        # on the mentor list (see SkillIndex)
+        self.n_mentor_tokens = max((max(t + i, default=-1) for t, i, _ in mentor_profiles), default=-1) + 1
+        self.n_mentor_prefs = max((max(p, default=-1) for _, _, p in mentor_profiles), default=-1) + 1
+
+        # Token x token relation: one token contains the other (either direction)
+        contains = containment_matrix(tokens, tokens)
+        self.related = (contains | contains.T).astype(np.float32)
+        # Preference x token relation: preference is a substring of the token
+        pref_hits = containment_matrix(pref_strings, tokens).astype(np.float32)
+        self.pref_hits = pref_hits
+
+        mentor_tech, mentor_interest, mentor_weights = self._build_matrices(mentor_profiles, len(tokens), len(pref_strings))
+        mentee_tech, mentee_interest, mentee_weights = self._build_matrices(mentee_profiles, len(tokens), len(pref_strings))
+
+        # Mentor side is fixed for the whole run, so fold the relation in once
+        self.mentor_tech_related = mentor_tech @ self.related
+        self.mentor_interest_related = mentor_interest @ self.related
+        self.mentor_pref_weights = mentor_weights
+        self.mentee_pref_weights = mentee_weights
+        self.mentee_tech = mentee_tech
+        self.mentee_interest = mentee_interest
+
+        # Does preference p occur in any of the participant's tokens?
+        mentor_has = ((mentor_tech + mentor_interest) > 0).astype(np.float32)
+        mentee_has = ((mentee_tech + mentee_interest) > 0).astype(np.float32)
+        self.pref_in_mentor = ((pref_hits @ mentor_has.T) > 0).astype(np.float32)  # P x M
+        self.pref_in_mentee = ((pref_hits @ mentee_has.T) > 0).astype(np.float32)  # P x N
+
+        # History-derived quality terms, kept separate to add them in the same
+        # order as calculate_match_quality() does
+        mentor_terms = np.array([_history_terms(m, 'mentor') for m in mentors], dtype=np.float64).reshape(-1, 2)
+        mentee_terms = np.array([_history_terms(m, 'mentee') for m in mentees], dtype=np.float64).reshape(-1, 2)
+        self.mentor_history = mentor_terms[:, 0] + mentor_terms[:, 1]
+        self.mentee_rating = mentee_terms[:, 0]
+        self.mentee_sessions = mentee_terms[:, 1]
+        self.mentor_badges = np.array([
+            min(int(m['badges_earned']) * 0.5, 2) if m.get('badges_earned') else 0.0 for m in mentors
+        ], dtype=np.float64)
+        self.mentor_super = np.array([2.0 if m.get('is_super_mentor') else 0.0 for m in mentors], dtype=np.float64)
+
+        self.mentor_index = {m['registration_no']: i for i, m in enumerate(mentors)}
+
+    @staticmethod
+    def _encode_profile(student, vocabulary, preferences, token_names):
+        tech, interests, prefs = skill_names(student, token_names)
+        tech_ids = [vocabulary.setdefault(name, len(vocabulary)) for name in tech]
+        interest_ids = [vocabulary.setdefault(name, len(vocabulary)) for name in interests]
+        pref_ids = [preferences.setdefault(pref, len(preferences)) if pref else -1 for pref in prefs]
+        return tech_ids, interest_ids, pref_ids
+
+    @staticmethod
+    def _build_matrices(profiles, n_tokens, n_prefs):
+        tech = np.zeros((len(profiles), n_tokens), dtype=np.float32)
+        interest = np.zeros((len(profiles), n_tokens), dtype=np.float32)
+        weights = np.zeros((len(profiles), n_prefs), dtype=np.float32)
+        for row, (tech_ids, interest_ids, pref_ids) in enumerate(profiles):
+            # np.add.at keeps duplicate entries, the pairwise loop counts them too
+            np.add.at(tech[row], tech_ids, 1)
+            np.add.at(interest[row], interest_ids, 1)
+            for pref_id, weight in zip(pref_ids, PREFERENCE_WEIGHTS):
+                if pref_id >= 0:
+                    weights[row, pref_id] += weight
+        return tech, interest, weights
+
+    def score_block(self, start, stop):
+        """Scores for mentees[start:stop] against every mentor, shape (stop - start, M)."""
+        rows = slice(start, stop)
+        common_tech = self.mentee_tech[rows] @ self.mentor_tech_related.T
+        common_interests = self.mentee_interest[rows] @ self.mentor_interest_related.T
+        preference = (self.mentor_pref_weights @ self.pref_in_mentee[:, rows]).T
+        preference += self.mentee_pref_weights[rows] @ self.pref_in_mentor
+
+        quality = self.mentor_history[None, :] + self.mentee_rating[rows, None]
+        quality += self.mentee_sessions[rows, None]
+        quality += self.mentor_badges[None, :]
+        quality += self.mentor_super[None, :]
+
+        quality += common_tech.astype(np.float64) + common_interests.astype(np.float64)
+        quality += preference.astype(np.float64)
+        return quality
+
+    def iter_score_blocks(self, block_size=SCORE_BLOCK_SIZE):
+        for start in range(0, len(self.mentees), block_size):
+            stop = min(start + block_size, len(self.mentees))
+            yield start, self.score_block(start, stop)
+
+    def score_matrix(self):
+        """Full mentee x mentor score matrix, float32 to halve its footprint."""
+        matrix = np.empty((len(self.mentees), len(self.mentors)), dtype=np.float32)
+        for start, block in self.iter_score_blocks():
+            matrix[start:start + len(block)] = block
+        return matrix
+
+    def pair_scores(self, mentee_idx, mentor_idxs):
+        """Scores of one mentee against some mentors, bit-identical to score_block()."""
+        common_tech = self.mentor_tech_related[mentor_idxs] @ self.mentee_tech[mentee_idx]
+        common_interests = self.mentor_interest_related[mentor_idxs] @ self.mentee_interest[mentee_idx]
+        preference = self.mentor_pref_weights[mentor_idxs] @ self.pref_in_mentee[:, mentee_idx]
+        preference += self.mentee_pref_weights[mentee_idx] @ self.pref_in_mentor[:, mentor_idxs]
+
+        quality = self.mentor_history[mentor_idxs] + self.mentee_rating[mentee_idx]
+        quality += self.mentee_sessions[mentee_idx]
+        quality += self.mentor_badges[mentor_idxs]
+        quality += self.mentor_super[mentor_idxs]
+
+        quality += common_tech.astype(np.float64) + common_interests.astype(np.float64)
+        quality += preference.astype(np.float64)
+        return quality
+
+    def greedy_assign(self, capacity=MAX_MENTEES_PER_MENTOR, index=None):
+        """
+        Same greedy rule as the original loop: mentees in order, each takes the
+        first best-scoring mentor that still has room, if that score is > 0.
+        With a SkillIndex only mentors sharing a token or preference with the
+        mentee are fully scored (same result, see pruned_greedy_assign()). That
+        scores fewer pairs but pays Python overhead per mentee, and measured
+        slower than the full scan on every cohort benchmarked so far
+        (benchmark_matching), so the index is opt-in.
+        Returns (list of (mentee_idx, mentor_idx), mentee load per mentor).
+        """
+        if index is not None:
+            return self.pruned_greedy_assign(index, capacity)
+
+        load = np.zeros(len(self.mentors), dtype=np.int64)
+        assignments = []
+        if not self.mentors:
+            return assignments, load
+
+        for start, block in self.iter_score_blocks():
+            for offset, row in enumerate(block):
+                mentee_idx = start + offset
+                candidates = np.where(load < capacity, row, -np.inf)
+                own_idx = self.mentor_index.get(self.mentees[mentee_idx]['registration_no'])
+                if own_idx is not None:
+                    candidates[own_idx] = -np.inf
+
+                mentor_idx = int(np.argmax(candidates))
+                if candidates[mentor_idx] > 0:
+                    assignments.append((mentee_idx, mentor_idx))
+                    load[mentor_idx] += 1
+        return assignments, load
+
+    def pruned_greedy_assign(self, index, capacity=MAX_MENTEES_PER_MENTOR):
+        """
+        greedy_assign() that only scores each mentee against the mentors the
+        index says overlap with it. Every other mentor scores just its
+        mentor-only quality terms plus the mentee's own, so the best of them is
+        the available mentor with the highest mentor-only terms, found by
+        walking the mentors in that order. The number of pairs scored is kept
+        in self.pairs_scored.
+        """
+        load = np.zeros(len(self.mentors), dtype=np.int64)
+        assignments = []
+        self.pairs_scored = 0
+        if not self.mentors:
+            return assignments, load
+
+        # Mentor-only terms, in the order score_block() adds them. Mentors with
+        # identical terms score the same against any mentee, so they are grouped
+        # and only the first available mentor of each group needs scoring.
+        groups = {}
+        for mentor_idx, terms in enumerate(zip(self.mentor_history, self.mentor_badges, self.mentor_super)):
+            groups.setdefault(terms, []).append(mentor_idx)
+        static = self.mentor_history + self.mentor_badges + self.mentor_super
+        groups = sorted(groups.values(), key=lambda members: -static[members[0]])
+        group_open = [0] * len(groups)  # Members before this position are full
+        memo = {}
+
+        for mentee_idx in range(len(self.mentees)):
+            candidates = index.candidates(self, mentee_idx, memo)
+            own_idx = self.mentor_index.get(self.mentees[mentee_idx]['registration_no'])
+            if own_idx is not None:
+                candidates = candidates[candidates != own_idx]
+            open_candidates = candidates[load[candidates] < capacity]
+
+            # Fallback: best available mentor without any overlap, near-ties included
+            fallback = []
+            skip = set(candidates.tolist())
+            skip.add(own_idx)
+            top_static = None
+            for group_idx, members in enumerate(groups):
+                if top_static is not None and static[members[0]] < top_static - 1e-9:
+                    break
+                position = group_open[group_idx]
+                while position < len(members) and load[members[position]] >= capacity:
+                    position += 1
+                group_open[group_idx] = position
+                for mentor_idx in members[position:]:
+                    if mentor_idx not in skip and load[mentor_idx] < capacity:
+                        fallback.append(mentor_idx)
+                        if top_static is None:
+                            top_static = static[mentor_idx]
+                        break
+
+            scored = np.concatenate([open_candidates, np.asarray(fallback, dtype=np.int64)])
+            if not len(scored):
+                continue
+            self.pairs_scored += len(scored)
+            scores = self.pair_scores(mentee_idx, scored)
+            best = scores.max()
+            if best > 0:
+                # argmax over all mentors returns the lowest index among ties
+                mentor_idx = int(scored[scores == best].min())
+                assignments.append((mentee_idx, mentor_idx))
+                load[mentor_idx] += 1
+        return assignments, load
+
+    def optimal_assign(self, capacity=MAX_MENTEES_PER_MENTOR):
+        """
+        Maximise the total match quality over all mentees at once, with at most
+        `capacity` mentees per mentor and only pairs scoring > 0 matched.
+        Returns the same (assignments, load) tuple as greedy_assign().
+        """
+        load = np.zeros(len(self.mentors), dtype=np.int64)
+        if not self.mentors or not self.mentees:
+            return [], load
+
+        scores = self.score_matrix()
+        for mentee_idx, mentee in enumerate(self.mentees):
+            own_idx = self.mentor_index.get(mentee['registration_no'])
+            if own_idx is not None:
+                scores[mentee_idx, own_idx] = 0
+
+        np.maximum(scores, 0, out=scores)
+        pairs = solve_capacitated_assignment(scores, capacity)
+        assignments = []
+        for mentee_idx, mentor_idx in sorted(pairs):
+            if scores[mentee_idx, mentor_idx] > 0:
+                assignments.append((mentee_idx, mentor_idx))
+                load[mentor_idx] += 1
+        return assignments, load
+
+
+class SkillIndex:
+    """
+    Inverted index from skill token (and interest preference) to the mentors
+    holding it, over a MatchingEngine's vocabulary.
+
+    Mentor tokens get the first vocabulary ids, so the index only depends on
+    the mentor list. Containment between tokens is applied when a mentee's
+    candidates are looked up.
+    """
+
+    def __init__(self, tech, interest, preference):
+        self.tech = tech              # token id -> mentor indexes with that tech token
+        self.interest = interest      # token id -> mentor indexes with that interest token
+        self.preference = preference  # preference id -> mentor indexes with that preference
+
+    @classmethod
+    def build(cls, engine):
+        tech = [[] for _ in range(engine.n_mentor_tokens)]
+        interest = [[] for _ in range(engine.n_mentor_tokens)]
+        preference = [[] for _ in range(engine.n_mentor_prefs)]
+        for mentor_idx, (tech_ids, interest_ids, pref_ids) in enumerate(engine.mentor_profiles):
+            for token_id in set(tech_ids):
+                tech[token_id].append(mentor_idx)
+            for token_id in set(interest_ids):
+                interest[token_id].append(mentor_idx)
+            for pref_id in set(pref_ids) - {-1}:
+                preference[pref_id].append(mentor_idx)
+
+        def as_arrays(postings):
+            return [np.asarray(mentors, dtype=np.int64) for mentors in postings]
+        return cls(as_arrays(tech), as_arrays(interest), as_arrays(preference))
+
+    def _expand(self, engine, key, memo):
+        """Mentors reached from one mentee token / preference, memoised per run."""
+        if key in memo:
+            return memo[key]
+        kind, item_id = key
+        n_tokens = engine.n_mentor_tokens
+        if kind == 'tech':
+            postings = [self.tech[t] for t in np.flatnonzero(engine.related[item_id, :n_tokens])]
+        elif kind == 'interest':
+            postings = [self.interest[t] for t in np.flatnonzero(engine.related[item_id, :n_tokens])]
+        elif kind == 'mentor_pref':
+            postings = [self.preference[item_id]]
+        else:
+            # Mentee preference contained in a mentor token
+            postings = []
+            for token_id in np.flatnonzero(engine.pref_hits[item_id, :n_tokens]):
+                postings.append(self.tech[token_id])
+                postings.append(self.interest[token_id])
+        memo[key] = np.unique(np.concatenate(postings)) if postings else np.empty(0, dtype=np.int64)
+        return memo[key]
+
+    def candidates(self, engine, mentee_idx, memo=None):
+        """Sorted mentor indexes sharing a (containment-related) token or preference hit."""
+        memo = {} if memo is None else memo
+        tech_ids, interest_ids, pref_ids = engine.mentee_profiles[mentee_idx]
+        keys = [('tech', t) for t in set(tech_ids)] + [('interest', t) for t in set(interest_ids)]
+        keys += [('mentee_pref', p) for p in set(pref_ids) - {-1}]
+        # Mentor preferences found in the mentee's tokens
+        keys += [('mentor_pref', p) for p in np.flatnonzero(engine.pref_in_mentee[:engine.n_mentor_prefs, mentee_idx])]
+        if not keys:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate([self._expand(engine, key, memo) for key in keys]))
+
+
+def solve_capacitated_assignment(benefit, capacity):
+    """
+    Maximum-benefit assignment of rows (mentees) to columns (mentors) where
+    each column takes at most `capacity` rows and a row may stay unmatched.
+
+    Successive shortest augmenting paths (Hungarian algorithm) on the
+    capacitated columns directly rather than on `capacity` copies of each
+    mentor: every row is inserted with a Dijkstra search over the columns,
+    vectorised with numpy, so a cohort of N mentees and M mentors costs
+    O(N * M) memory and polynomial time. Duals u (rows) and v (columns)
+    certify optimality; columns with spare capacity keep v == 0.
+
+    Returns a list of (row, column) pairs.
+    """
+    n_rows, n_cols = benefit.shape
+    if not n_rows or not n_cols:
+        return []
+
+    u = np.zeros(n_rows)
+    v = np.zeros(n_cols)
+    load = np.zeros(n_cols, dtype=np.int64)
+    row_col = [-1] * n_rows
+    col_rows = [[] for _ in range(n_cols)]
+
+    dist = np.empty(n_cols)
+    reached_from = np.empty(n_cols, dtype=np.int64)
+    settled = np.zeros(n_cols, dtype=bool)
+    open_dist = np.empty(n_cols)
+    base = np.empty(n_cols)
+    candidate = np.empty(n_cols)
+    improved = np.empty(n_cols, dtype=bool)
+
+    for root in range(n_rows):
+        # Start dual feasible: no arc (including "unmatched", cost 0) below zero
+        u[root] = min(0.0, float((-benefit[root] - v).min()))
+
+        # base holds -v for open columns and +inf once a column is settled
+        np.negative(v, out=base)
+        open_dist.fill(math.inf)
+        settled.fill(False)
+        tree_rows = [root]
+        row_dist = [0.0]
+        row_parent = {}  # row -> full column it would be displaced from
+        # Not being matched is never "full", so only its best entry matters
+        best_unmatched, unmatched_row = -u[root], root
+
+        pending = [root]
+        reached = 0.0
+        while True:
+            # Relax the arcs out of rows that just joined the search tree
+            while pending:
+                row = pending.pop()
+                offset = reached - u[row]
+                np.subtract(base, benefit[row], out=candidate)
+                candidate += offset
+                np.less(candidate, open_dist, out=improved)
+                np.copyto(open_dist, candidate, where=improved)
+                np.copyto(reached_from, row, where=improved)
+                if offset < best_unmatched:
+                    best_unmatched, unmatched_row = offset, row
+
+            col = int(open_dist.argmin())
+            reached = open_dist[col]
+            if load[col] >= capacity:
+                # On ties, prefer a column that still has spare capacity
+                ties = np.flatnonzero((open_dist <= reached + 1e-9) & (load < capacity))
+                if len(ties):
+                    col = int(ties[0])
+                    reached = open_dist[col]
+            if best_unmatched < reached or (best_unmatched <= reached + 1e-9 and load[col] >= capacity):
+                end_dist, end_col, end_row = best_unmatched, -1, unmatched_row
+                break
+            settled[col] = True
+            dist[col] = reached
+            open_dist[col] = math.inf
+            base[col] = math.inf
+            if load[col] < capacity:
+                end_dist, end_col, end_row = reached, col, int(reached_from[col])
+                break
+            for row in col_rows[col]:
+                if row not in row_parent and row != root:
+                    row_parent[row] = col
+                    tree_rows.append(row)
+                    row_dist.append(reached)
+                    pending.append(row)
+
+        # Update potentials so every reduced cost stays non-negative
+        u[tree_rows] += np.maximum(end_dist - np.asarray(row_dist), 0)
+        v[settled] -= np.maximum(end_dist - dist[settled], 0)
+
+        # Flip the augmenting path ending at end_col
+        col, row = end_col, end_row
+        while True:
+            previous = row_col[row]
+            if previous >= 0:
+                col_rows[previous].remove(row)
+                load[previous] -= 1
+            row_col[row] = col
+            if col >= 0:
+                col_rows[col].append(row)
+                load[col] += 1
+            if row == root:
+                break
+            col = row_parent[row]
+            row = int(reached_from[col])
+
+    return [(row, col) for row, col in enumerate(row_col) if col >= 0]
+
+
+def build_match_entry(mentor, mentee):
+    """Build the response entry for one mentor-mentee match."""
+    match_quality, common_tech, common_interests, preference_score = pair_match_details(mentor, mentee)
+    return {
+        "mentor": {
+            "name": mentor['name'],
+            "registration_no": mentor['registration_no'],
+            "semester": mentor['semester'],
+            "branch": mentor['branch'],
+            "tech_stack": mentor['tech_stack'],
+            "department_id": mentor.get('department_id')
+        },
+        "mentee": {
+            "name": mentee['name'],
+            "registration_no": mentee['registration_no'],
+            "semester": mentee['semester'],
+            "branch": mentee['branch'],
+            "tech_stack": mentee['tech_stack'],
+            "department_id": mentee.get('department_id')
+        },
+        "match_quality": match_quality,
+        "common_tech": common_tech,
+        "common_interests": common_interests,
+        "preference_score": preference_score
+    }
+
+
+def match_mentors_mentees(students, strategy='greedy', use_index=False):
+    """
+    Match mentors and mentees based on various criteria.
+
+    strategy='greedy' assigns mentees one by one in list order, scoring each
+    against every mentor (use_index=True scores only the mentors the
+    SkillIndex finds for it, with the same result);
+    strategy='optimal' maximises the total match quality of the cohort.
+    """
+    token_names = {}
+    roles = {s['mentoring_preferences'] for s in students}
+    if 'mentor' in roles and 'mentee' in roles:
+        # Get historical data for all participants
+        attach_historical_data(students)
+        token_names = load_token_names(students)
+    return match_cohort(students, strategy, token_names, use_index)
+
+
+def match_cohort(students, strategy, token_names, use_index=False):
+    """
+    Matching for students whose historical data is already attached.
+    Does not touch the database, so it can run in a worker process.
+    """
+    # Separate mentors and mentees
+    mentors = [s for s in students if s['mentoring_preferences'] == 'mentor']
+    mentees = [s for s in students if s['mentoring_preferences'] == 'mentee']
+
+    # If no mentors or mentees, return empty matches
+    if not mentors or not mentees:
+        return {
+            "matches": [],
+            "unmatched_mentees": mentees,
+            "unmatched_mentors": mentors,
+            "statistics": {
+                "total_participants": len(students),
+                "total_mentors": len(mentors),
+                "total_mentees": len(mentees),
+                "matches_made": 0,
+                "total_match_quality": 0,
+                "mean_match_quality": 0
+            }
+        }
+
+    engine = MatchingEngine(mentors, mentees, token_names=token_names)
+    if strategy == 'optimal':
+        assignments, load = engine.optimal_assign()
+    else:
+        assignments, load = engine.greedy_assign(index=SkillIndex.build(engine) if use_index else None)
+
+    # Payload values are recomputed per match so they keep their exact types
+    matches = [build_match_entry(mentors[j], mentees[i]) for i, j in assignments]
+    matched = {i for i, _ in assignments}
+    unmatched_mentees = [m for i, m in enumerate(mentees) if i not in matched]
+
+    # Get list of mentors who still have capacity
+    available_mentors = [m for j, m in enumerate(mentors) if load[j] < MAX_MENTEES_PER_MENTOR]
+
+    return {
+        "matches": matches,
+        "unmatched_mentees": unmatched_mentees,
+        "unmatched_mentors": available_mentors,
+        "statistics": match_statistics(len(students), len(mentors), len(mentees), matches,
+                                       len(unmatched_mentees), len(available_mentors))
+    }
+
+
+def match_statistics(total_participants, total_mentors, total_mentees, matches, mentees_unmatched, mentors_with_capacity):
+    """Statistics block of the matching response."""
+    total_quality = sum(match['match_quality'] for match in matches)
+    return {
+        "total_participants": total_participants,
+        "total_mentors": total_mentors,
+        "total_mentees": total_mentees,
+        "matches_made": len(matches),
+        "mentees_unmatched": mentees_unmatched,
+        "mentors_with_capacity": mentors_with_capacity,
+        "total_match_quality": round(total_quality, 2),
+        "mean_match_quality": round(total_quality / len(matches), 2) if matches else 0
+    }
+
+
+def department_shards(students):
+    """Group students by department_id; shards ordered by id, no department last."""
+    shards = {}
+    for student in students:
+        shards.setdefault(student.get('department_id'), []).append(student)
+    return sorted(shards.items(), key=lambda item: (item[0] is None, item[0] or 0))
+
+
+def _match_shard(department_id, students, strategy, token_names):
+    """Worker entry point: match one department and time it."""
+    started = time.perf_counter()
+    result = match_cohort(students, strategy, token_names)
+    return department_id, result, time.perf_counter() - started
+
+
+def match_by_department(students, strategy='greedy', max_workers=None):
+    """
+    Match every department independently, in parallel worker processes.
+
+    History and token names are loaded once here (the workers never use the
+    database); shard results are merged in department order, so the output is
+    the same as running the departments one after another. Pass max_workers=1
+    to do exactly that in-process.
+    """
+    shards = department_shards(students)
+    attach_historical_data(students)
+    token_names = load_token_names(students)
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, len(shards))
+
+    started = time.perf_counter()
+    args = ([d for d, _ in shards], [s for _, s in shards], [strategy] * len(shards), [token_names] * len(shards))
+    if max_workers > 1:
+        # django.setup() lets workers import the app under spawn/forkserver too
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=django.setup) as executor:
+            shard_results = list(executor.map(_match_shard, *args))
+    else:
+        shard_results = list(map(_match_shard, *args))
+    wall_seconds = time.perf_counter() - started
+
+    matches, unmatched_mentees, unmatched_mentors, shard_timings = [], [], [], []
+    for department_id, result, seconds in shard_results:
+        matches.extend(result['matches'])
+        unmatched_mentees.extend(result['unmatched_mentees'])
+        unmatched_mentors.extend(result['unmatched_mentors'])
+        shard_timings.append({
+            "department_id": department_id,
+            "participants": result['statistics']['total_participants'],
+            "matches_made": result['statistics']['matches_made'],
+            "seconds": round(seconds, 4)
+        })
+
+    statistics = match_statistics(
+        len(students),
+        sum(1 for s in students if s['mentoring_preferences'] == 'mentor'),
+        sum(1 for s in students if s['mentoring_preferences'] == 'mentee'),
+        matches, len(unmatched_mentees), len(unmatched_mentors),
+    )
+    return {
+        "matches": matches,
+        "unmatched_mentees": unmatched_mentees,
+        "unmatched_mentors": unmatched_mentors,
+        "statistics": statistics,
+        "shards": shard_timings,
+        "sharding": {
+            "workers": max_workers,
+            "wall_seconds": round(wall_seconds, 4)
+        }
+    }
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.16 on 2026-10-17 07:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0009_student_google_refresh_token_student_google_scopes_and_more'),
+        ('mentor_mentee', '0017_participant_mobile_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SkillToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.TextField(unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='participant',
+            name='interest_tokens',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='participant',
+            name='preference_tokens',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='participant',
+            name='tech_stack_tokens',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.CreateModel(
+            name='ParticipantHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('registration_no', models.CharField(max_length=20)),
+                ('name', models.CharField(max_length=100)),
+                ('semester', models.CharField(max_length=1)),
+                ('branch', models.CharField(max_length=10)),
+                ('total_badges_earned', models.IntegerField(default=0)),
+                ('total_leaderboard_points', models.IntegerField(default=0)),
+                ('total_quizzes_completed', models.IntegerField(default=0)),
+                ('average_quiz_score', models.FloatField(default=0.0)),
+                ('was_mentor', models.BooleanField(default=False)),
+                ('was_mentee', models.BooleanField(default=False)),
+                ('mentor_rating', models.FloatField(blank=True, null=True)),
+                ('mentee_rating', models.FloatField(blank=True, null=True)),
+                ('sessions_attended', models.IntegerField(default=0)),
+                ('sessions_conducted', models.IntegerField(default=0)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='account.department')),
+            ],
+            options={
+                'verbose_name_plural': 'Participant Histories',
+                'ordering': ['-end_date'],
+            },
+        ),
+    ]
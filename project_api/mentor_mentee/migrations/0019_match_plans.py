@@ -0,0 +1,29 @@
+# Generated by Django 4.2.16 on 2026-10-17 07:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0009_student_google_refresh_token_student_google_scopes_and_more'),
+        ('mentor_mentee', '0018_skill_tokens'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchPlan',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('strategy', models.CharField(default='greedy', max_length=20)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('payload', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+                ('committed_at', models.DateTimeField(blank=True, null=True)),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='account.department')),
+            ],
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 4.2.16 on 2026-10-17 07:40
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, F, FloatField, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def _total(queryset, outer_field, aggregate, output_field):
+    rows = queryset.filter(**{outer_field: OuterRef('pk')}).order_by().values(outer_field)
+    return Coalesce(
+        Subquery(rows.annotate(total=aggregate).values('total')[:1], output_field=output_field),
+        Value(0, output_field=output_field),
+    )
+
+
+def populate_leaderboard_entries(apps, schema_editor):
+    Participant = apps.get_model('mentor_mentee', 'Participant')
+    LeaderboardEntry = apps.get_model('mentor_mentee', 'LeaderboardEntry')
+    MentorMenteeRelationship = apps.get_model('mentor_mentee', 'MentorMenteeRelationship')
+    QuizResult = apps.get_model('mentor_mentee', 'QuizResult')
+    Session = apps.get_model('mentor_mentee', 'Session')
+
+    completed = QuizResult.objects.filter(status='completed')
+    attendance = Session.participants.through.objects.all()
+    # A mentee's first relationship, like the views show
+    first_mentor = MentorMenteeRelationship.objects.filter(mentee=OuterRef('pk')).order_by('id')
+    rows = Participant.objects.annotate(
+        entry_mentees=_total(MentorMenteeRelationship.objects.all(), 'mentor', Count('pk'), IntegerField()),
+        entry_mentor_no=Subquery(first_mentor.values('mentor_id')[:1]),
+        entry_mentor_name=Subquery(first_mentor.values('mentor__name')[:1]),
+        entry_sessions_created=_total(Session.objects.all(), 'mentor', Count('pk'), IntegerField()),
+        entry_sessions_joined=_total(attendance, 'participant', Count('pk'), IntegerField()),
+        entry_sessions_own=_total(
+            attendance.filter(session__mentor=F('participant')), 'participant', Count('pk'), IntegerField()
+        ),
+        entry_tasks_completed=_total(completed, 'participant', Count('pk'), IntegerField()),
+        entry_average_score=_total(completed, 'participant', Avg('percentage'), FloatField()),
+        entry_assigned_quizzes=_total(QuizResult.objects.all(), 'mentor', Count('pk'), IntegerField()),
+        entry_completed_assigned_quizzes=_total(completed, 'mentor', Count('pk'), IntegerField()),
+        entry_average_assigned_score=_total(completed, 'mentor', Avg('percentage'), FloatField()),
+    ).values(
+        'registration_no', 'entry_mentees', 'entry_mentor_no', 'entry_mentor_name', 'entry_sessions_created',
+        'entry_sessions_joined', 'entry_sessions_own', 'entry_tasks_completed', 'entry_average_score',
+        'entry_assigned_quizzes', 'entry_completed_assigned_quizzes', 'entry_average_assigned_score',
+    )
+
+    entries = [
+        LeaderboardEntry(
+            participant_id=row['registration_no'],
+            role='mentor' if row['entry_mentees'] else 'mentee' if row['entry_mentor_no'] else 'unknown',
+            mentor_registration_no=row['entry_mentor_no'],
+            mentor_name=row['entry_mentor_name'] or '',
+            mentees_count=row['entry_mentees'],
+            sessions_attended=row['entry_sessions_created'] + row['entry_sessions_joined'] - row['entry_sessions_own'],
+            tasks_completed=row['entry_tasks_completed'],
+            average_score=row['entry_average_score'],
+            assigned_quizzes=row['entry_assigned_quizzes'],
+            completed_assigned_quizzes=row['entry_completed_assigned_quizzes'],
+            average_assigned_score=row['entry_average_assigned_score'],
+        )
+        for row in rows.iterator(chunk_size=1000)
+    ]
+    LeaderboardEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentor_mentee', '0019_match_plans'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('participant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='leaderboard_entry', serialize=False, to='mentor_mentee.participant')),
+                ('role', models.CharField(choices=[('mentor', 'Mentor'), ('mentee', 'Mentee'), ('unknown', 'Unknown')], db_index=True, default='unknown', max_length=10)),
+                ('mentor_registration_no', models.CharField(blank=True, max_length=20, null=True)),
+                ('mentor_name', models.CharField(blank=True, default='', max_length=100)),
+                ('mentees_count', models.IntegerField(default=0)),
+                ('sessions_attended', models.IntegerField(default=0)),
+                ('tasks_completed', models.IntegerField(default=0)),
+                ('average_score', models.FloatField(default=0)),
+                ('assigned_quizzes', models.IntegerField(default=0)),
+                ('completed_assigned_quizzes', models.IntegerField(default=0)),
+                ('average_assigned_score', models.FloatField(default=0)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(populate_leaderboard_entries, migrations.RunPython.noop),
+    ]
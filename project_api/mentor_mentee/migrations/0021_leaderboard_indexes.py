@@ -0,0 +1,21 @@
+# Generated by Django 4.2.16 on 2026-10-17 07:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentor_mentee', '0020_leaderboard_entries'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(fields=['-leaderboard_points', 'registration_no'], name='participant_leaderboard_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(fields=['department', '-leaderboard_points', 'registration_no'], name='participant_dept_lb_idx'),
+        ),
+    ]
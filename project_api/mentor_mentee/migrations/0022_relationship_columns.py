@@ -0,0 +1,38 @@
+# Generated by Django 4.2.16 on 2026-10-17 07:47
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def populate_relationship_columns(apps, schema_editor):
+    Participant = apps.get_model('mentor_mentee', 'Participant')
+    MentorMenteeRelationship = apps.get_model('mentor_mentee', 'MentorMenteeRelationship')
+    counts = MentorMenteeRelationship.objects.filter(mentor=OuterRef('pk')).order_by().values('mentor')
+    first_mentor = MentorMenteeRelationship.objects.filter(mentee=OuterRef('pk')).order_by('id')
+    Participant.objects.update(
+        mentee_count=Coalesce(Subquery(counts.annotate(total=Count('pk')).values('total')[:1]), Value(0)),
+        current_mentor=Subquery(first_mentor.values('mentor_id')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentor_mentee', '0021_leaderboard_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='participant',
+            name='current_mentor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='mentor_mentee.participant'),
+        ),
+        migrations.AddField(
+            model_name='participant',
+            name='mentee_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(populate_relationship_columns, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.16 on 2026-10-17 07:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0009_student_google_refresh_token_student_google_scopes_and_more'),
+        ('mentor_mentee', '0022_relationship_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepartmentLeaderboardSnapshot',
+            fields=[
+                ('department', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='leaderboard_snapshot', serialize=False, to='account.department')),
+                ('rows', models.JSONField(default=list)),
+                ('participant_count', models.IntegerField(default=0)),
+                ('version', models.IntegerField(default=0)),
+                ('computed_version', models.IntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,133 @@
+# Generated by Django 4.2.16 on 2026-10-17 07:57
+
+import hashlib
+
+from django.core.files.base import ContentFile
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Participant BLOB column -> ProofDocument.proof_type
+PROOF_COLUMNS = {
+    'proof_of_research_publications': 'research',
+    'proof_of_hackathon_participation': 'hackathon',
+    'proof_of_coding_competitions': 'coding',
+    'proof_of_academic_performance': 'academic',
+    'proof_of_internships': 'internship',
+    'proof_of_extracurricular_activities': 'extracurricular',
+}
+
+# A copy of mentor_mentee.proofs.SIGNATURES as of this migration
+SIGNATURES = [
+    (b'%PDF-', 'application/pdf', '.pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png', '.png'),
+    (b'\xff\xd8\xff', 'image/jpeg', '.jpg'),
+    (b'GIF87a', 'image/gif', '.gif'),
+    (b'GIF89a', 'image/gif', '.gif'),
+]
+
+
+def sniff_content_type(head):
+    for signature, content_type, extension in SIGNATURES:
+        if head.startswith(signature):
+            return content_type, extension
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp', '.webp'
+    return 'application/octet-stream', ''
+
+
+def move_proofs_to_documents(apps, schema_editor):
+    Participant = apps.get_model('mentor_mentee', 'Participant')
+    ProofDocument = apps.get_model('mentor_mentee', 'ProofDocument')
+    storage = ProofDocument._meta.get_field('file').storage
+    # Files are written straight away but their rows only exist once the
+    # migration commits: if moving fails, remove the files written so far.
+    # A failure in a later operation of this migration still leaves them
+    # behind under proofs/.
+    written = []
+    try:
+        # One column at a time and in small chunks, so only a few BLOBs are in memory
+        for column, proof_type in PROOF_COLUMNS.items():
+            rows = Participant.objects.filter(**{f'{column}__isnull': False}).values_list('registration_no', column)
+            for registration_no, data in rows.iterator(chunk_size=20):
+                data = bytes(data)
+                if not data:
+                    continue
+                content_type, extension = sniff_content_type(data[:16])
+                document = ProofDocument(
+                    participant_id=registration_no,
+                    proof_type=proof_type,
+                    size=len(data),
+                    sha256=hashlib.sha256(data).hexdigest(),
+                    content_type=content_type,
+                )
+                # Same name as ProofDocument.file_name()
+                name = f'{registration_no}/{proof_type}-{document.sha256[:16]}{extension}'
+                document.file.save(name, ContentFile(data), save=False)
+                written.append(document.file.name)
+                document.save()
+    except Exception:
+        for name in written:
+            storage.delete(name)
+        raise
+
+
+def move_documents_to_proofs(apps, schema_editor):
+    Participant = apps.get_model('mentor_mentee', 'Participant')
+    ProofDocument = apps.get_model('mentor_mentee', 'ProofDocument')
+    columns = {proof_type: column for column, proof_type in PROOF_COLUMNS.items()}
+    for document in ProofDocument.objects.iterator(chunk_size=20):
+        with document.file.open('rb') as proof_file:
+            Participant.objects.filter(registration_no=document.participant_id).update(
+                **{columns[document.proof_type]: proof_file.read()}
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentor_mentee', '0023_department_leaderboard_snapshots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProofDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('proof_type', models.CharField(choices=[('research', 'Research publications'), ('hackathon', 'Hackathon participation'), ('coding', 'Coding competitions'), ('academic', 'Academic performance'), ('internship', 'Internships'), ('extracurricular', 'Extracurricular activities')], max_length=20)),
+                ('file', models.FileField(max_length=255, upload_to='proofs')),
+                ('size', models.PositiveIntegerField()),
+                ('sha256', models.CharField(max_length=64)),
+                ('content_type', models.CharField(max_length=100)),
+                ('uploaded_at', models.DateTimeField(auto_now=True)),
+                ('participant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='proof_documents', to='mentor_mentee.participant')),
+            ],
+            options={
+                'unique_together': {('participant', 'proof_type')},
+            },
+        ),
+        migrations.RunPython(move_proofs_to_documents, move_documents_to_proofs),
+        migrations.RemoveField(
+            model_name='participant',
+            name='proof_of_academic_performance',
+        ),
+        migrations.RemoveField(
+            model_name='participant',
+            name='proof_of_coding_competitions',
+        ),
+        migrations.RemoveField(
+            model_name='participant',
+            name='proof_of_extracurricular_activities',
+        ),
+        migrations.RemoveField(
+            model_name='participant',
+            name='proof_of_hackathon_participation',
+        ),
+        migrations.RemoveField(
+            model_name='participant',
+            name='proof_of_internships',
+        ),
+        migrations.RemoveField(
+            model_name='participant',
+            name='proof_of_research_publications',
+        ),
+    ]
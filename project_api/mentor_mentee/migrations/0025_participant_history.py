@@ -0,0 +1,14 @@
+# ParticipantHistory is created by 0018_skill_tokens. This migration briefly
+# created it here instead; it is kept, without operations, so databases that
+# recorded it still have a consistent migration history.
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentor_mentee', '0024_proof_documents'),
+    ]
+
+    operations = []
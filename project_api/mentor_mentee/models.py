@@ -3,6 +3,35 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
 import uuid
 from account.models import Department
+from .caching import ACTIVITY_NAMESPACE, MENTOR_FEATURES_NAMESPACE, bump_version_on_commit
+
+
+def normalize_skills(value):
+    """Split a comma-separated skills field into lowercased, stripped names."""
+    if not value:
+        return []
+    return [item.strip().lower() for item in str(value).split(',') if item.strip()]
+
+
+class SkillToken(models.Model):
+    """Shared vocabulary of normalized tech stack / interest names"""
+    name = models.TextField(unique=True)
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def ids_for(cls, names):
+        """Return {name: id} for the given normalized names, creating missing tokens"""
+        names = set(names)
+        if not names:
+            return {}
+        token_ids = dict(cls.objects.filter(name__in=names).values_list('name', 'id'))
+        missing = names - token_ids.keys()
+        if missing:
+            cls.objects.bulk_create([cls(name=name) for name in missing], ignore_conflicts=True)
+            token_ids.update(cls.objects.filter(name__in=missing).values_list('name', 'id'))
+        return token_ids
 
 
 class Participant(models.Model):
@@ -57,31 +86,26 @@ class Participant(models.Model):
 
     # Research
     published_research_papers = models.CharField(max_length=15, choices=LEVEL_CHOICES, default='None')
-    proof_of_research_publications = models.BinaryField(blank=True, null=True)  # Store the file as a BLOB
 
     # Hackathon
     hackathon_participation = models.CharField(max_length=50, choices=LEVEL_CHOICES)
     number_of_wins = models.IntegerField(default=0, validators=[MinValueValidator(0)],blank=True, null=True)
     number_of_participations = models.IntegerField(default=0, validators=[MinValueValidator(0)],blank=True, null=True)
     hackathon_role = models.CharField(default=None,max_length=20, choices=HACKATHON_ROLE_CHOICES,blank=True, null=True)
-    proof_of_hackathon_participation = models.BinaryField(blank=True, null=True)  # Store the file as a BLOB
 
     # Coding Competitions
     coding_competitions_participate = models.CharField(max_length=3, choices=YES_NO_CHOICES)
     level_of_competition = models.CharField(default=None,max_length=15, choices=LEVEL_CHOICES,blank=True, null=True)
     number_of_coding_competitions = models.IntegerField(default=0, validators=[MinValueValidator(0)],blank=True, null=True)
-    proof_of_coding_competitions = models.BinaryField(blank=True, null=True)  # Store the file as a BLOB
 
     # Academic Performance
     cgpa = models.DecimalField(max_digits=4, decimal_places=2, validators=[MinValueValidator(0.0), MaxValueValidator(10.0)])
     sgpa = models.DecimalField(max_digits=4, decimal_places=2, validators=[MinValueValidator(0.0), MaxValueValidator(10.0)])
-    proof_of_academic_performance = models.BinaryField(blank=True, null=True)  # Store the file as a BLOB
 
     # Internship
     internship_experience = models.CharField(max_length=3, choices=YES_NO_CHOICES)
     number_of_internships = models.IntegerField(default=0, validators=[MinValueValidator(0)],blank=True, null=True)
     internship_description = models.TextField(blank=True, null=True)
-    proof_of_internships = models.BinaryField(blank=True, null=True)  # Store the file as a BLOB
 
     # Seminars & Workshops
     seminars_or_workshops_attended = models.CharField(default=None,max_length=3, choices=YES_NO_CHOICES,blank=True, null=True)
@@ -90,7 +114,6 @@ class Participant(models.Model):
     # Extracurricular Activities
     extracurricular_activities = models.CharField(max_length=3, choices=YES_NO_CHOICES,blank=True, null=True)
     describe_extracurricular_activities = models.TextField(blank=True, null=True)
-    proof_of_extracurricular_activities = models.BinaryField(blank=True, null=True)  # Store the file as a BLOB
 
     # Miscellaneous
     date = models.DateTimeField(auto_now_add=True)
@@ -102,12 +125,91 @@ class Participant(models.Model):
     badges_earned = models.IntegerField(default=0)
     is_super_mentor = models.BooleanField(default=False)
     leaderboard_points = models.IntegerField(default=0)
+    # Denormalized from MentorMenteeRelationship, kept in sync by relationships.changing_relationships()
+    mentee_count = models.IntegerField(default=0)
+    current_mentor = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
     mobile_number = models.CharField(max_length=13, blank=True, null=True)  # Mobile number of the participant
 
+    # SkillToken ids derived from the fields above, kept in sync by save()
+    tech_stack_tokens = models.JSONField(default=list, blank=True)
+    interest_tokens = models.JSONField(default=list, blank=True)
+    preference_tokens = models.JSONField(default=list, blank=True)  # One id (or None) per interest preference
+
+    SKILL_SOURCE_FIELDS = ('tech_stack', 'areas_of_interest', 'interest_preference1',
+                           'interest_preference2', 'interest_preference3')
+    SKILL_TOKEN_FIELDS = ('tech_stack_tokens', 'interest_tokens', 'preference_tokens')
+    RELATIONSHIP_FIELDS = ('mentee_count', 'current_mentor')
+    # Shown by the department leaderboard snapshots or deciding who is on them (attnames)
+    LEADERBOARD_FIELDS = ('name', 'branch', 'semester', 'tech_stack', 'leaderboard_points', 'badges_earned',
+                          'is_super_mentor', 'department_id', 'approval_status', 'status')
+
+    class Meta:
+        indexes = [
+            # Leaderboard order, for keyset pagination and rank lookups
+            models.Index(fields=['-leaderboard_points', 'registration_no'], name='participant_leaderboard_idx'),
+            models.Index(fields=['department', '-leaderboard_points', 'registration_no'], name='participant_dept_lb_idx'),
+        ]
+
     def __str__(self):
         return f'{self.name} ({self.registration_no})'
-        
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Stored department, so save() can invalidate the board a participant leaves
+        instance._loaded_department_id = instance.__dict__.get('department_id')
+        instance._loaded_mentoring_preferences = instance.__dict__.get('mentoring_preferences')
+        instance._loaded_skill_sources = instance._skill_sources()
+        instance._loaded_leaderboard_values = instance._leaderboard_values()
+        return instance
+
+    def _skill_sources(self):
+        """Loaded values of the skill source fields (deferred ones are left out)"""
+        return {field: self.__dict__[field] for field in self.SKILL_SOURCE_FIELDS if field in self.__dict__}
+
+    def skill_sources_changed(self):
+        """Whether a skill source field differs from the stored row (always True for new rows)"""
+        loaded = getattr(self, '_loaded_skill_sources', None)
+        if loaded is None:
+            return True
+        return any(field not in loaded or loaded[field] != value for field, value in self._skill_sources().items())
+
+    def _leaderboard_values(self, update_fields=None):
+        """Current values of the leaderboard fields, only those being saved if update_fields is given"""
+        saved = None if update_fields is None else {self._meta.get_field(field).attname for field in update_fields}
+        return {field: self.__dict__[field] for field in self.LEADERBOARD_FIELDS
+                if field in self.__dict__ and (saved is None or field in saved)}
+
+    def leaderboard_fields_changed(self, update_fields=None):
+        """Whether a leaderboard field being saved differs from the stored row (always True for new rows)"""
+        loaded = getattr(self, '_loaded_leaderboard_values', None)
+        if loaded is None:
+            return True
+        return any(field not in loaded or loaded[field] != value
+                   for field, value in self._leaderboard_values(update_fields).items())
+
+    def skill_names(self):
+        """Normalized (tech_stack, areas_of_interest, preferences) names"""
+        preferences = [(getattr(self, f'interest_preference{i}') or '').strip().lower() for i in range(1, 4)]
+        return normalize_skills(self.tech_stack), normalize_skills(self.areas_of_interest), preferences
+
+    def refresh_skill_tokens(self, token_ids=None):
+        """Recompute the token fields; token_ids lets bulk callers resolve names once"""
+        tech, interests, preferences = self.skill_names()
+        if token_ids is None:
+            token_ids = SkillToken.ids_for(tech + interests + [p for p in preferences if p])
+        self.tech_stack_tokens = [token_ids[name] for name in tech]
+        self.interest_tokens = [token_ids[name] for name in interests]
+        self.preference_tokens = [token_ids[name] if name else None for name in preferences]
+
     def save(self, *args, **kwargs):
+        # Keep the skill tokens in sync when a source field was changed and is saved
+        update_fields = kwargs.get('update_fields')
+        if (update_fields is None or set(update_fields) & set(self.SKILL_SOURCE_FIELDS)) and self.skill_sources_changed():
+            self.refresh_skill_tokens()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | set(self.SKILL_TOKEN_FIELDS)
+
         # Try to map branch to department
         if not self.department and self.branch:
             branch_code = self.branch.upper()
@@ -117,7 +219,25 @@ class Participant(models.Model):
                     self.department = department
             except:
                 pass
+        leaderboard_changed = self.leaderboard_fields_changed(update_fields)
         super().save(*args, **kwargs)
+        bump_version_on_commit(ACTIVITY_NAMESPACE)
+        if leaderboard_changed:
+            DepartmentLeaderboardSnapshot.mark_stale([self.department_id, getattr(self, '_loaded_department_id', None)])
+        self._loaded_department_id = self.department_id
+        self._loaded_leaderboard_values = {
+            **(getattr(self, '_loaded_leaderboard_values', None) or {}), **self._leaderboard_values(update_fields)
+        }
+
+        # Cached matching features of mentors are rebuilt after any change to
+        # a mentor, including one that just stopped being a mentor
+        if 'mentor' in (self.mentoring_preferences, getattr(self, '_loaded_mentoring_preferences', None)):
+            bump_version_on_commit(MENTOR_FEATURES_NAMESPACE)
+        self._loaded_mentoring_preferences = self.mentoring_preferences
+        saved = self._skill_sources()
+        if update_fields is not None:
+            saved = {field: value for field, value in saved.items() if field in update_fields}
+        self._loaded_skill_sources = {**(getattr(self, '_loaded_skill_sources', None) or {}), **saved}
 
 
 class MentorMenteeRelationship(models.Model):
@@ -352,3 +472,121 @@ class ParticipantHistory(models.Model):
     
     def __str__(self):
         return f"{self.name} ({self.registration_no}) - {self.start_date} to {self.end_date}"
+
+
+class MatchPlan(models.Model):
+    """Dry-run matching result that can be committed later if its inputs did not change"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, null=True, blank=True)  # null = all departments
+    strategy = models.CharField(max_length=20, default='greedy')
+    fingerprint = models.CharField(max_length=64)  # Hash of the matching inputs when the plan was made
+    payload = models.JSONField(default=dict)  # Proposed matches and statistics
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    committed_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        scope = self.department.name if self.department else "All Departments"
+        return f"Match plan {self.id} ({scope})"
+
+
+class LeaderboardEntry(models.Model):
+    """Per-participant leaderboard statistics, refreshed by the write paths that change them"""
+    ROLE_CHOICES = [
+        ('mentor', 'Mentor'),
+        ('mentee', 'Mentee'),
+        ('unknown', 'Unknown'),
+    ]
+    
+    participant = models.OneToOneField(Participant, primary_key=True, on_delete=models.CASCADE, related_name='leaderboard_entry')
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='unknown', db_index=True)
+    mentor_registration_no = models.CharField(max_length=20, null=True, blank=True)  # Set for mentees
+    mentor_name = models.CharField(max_length=100, blank=True, default='')
+    mentees_count = models.IntegerField(default=0)
+    sessions_attended = models.IntegerField(default=0)  # Sessions created or attended
+    tasks_completed = models.IntegerField(default=0)
+    average_score = models.FloatField(default=0)
+    assigned_quizzes = models.IntegerField(default=0)
+    completed_assigned_quizzes = models.IntegerField(default=0)
+    average_assigned_score = models.FloatField(default=0)
+    refreshed_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Leaderboard entry for {self.participant_id} ({self.role})"
+
+
+class DepartmentLeaderboardSnapshot(models.Model):
+    """
+    A department's leaderboard rows in leaderboard order, computed in one pass.
+    Writes bump version; the snapshot is stale until it is recomputed from
+    data read at that version.
+    """
+    department = models.OneToOneField(Department, primary_key=True, on_delete=models.CASCADE, related_name='leaderboard_snapshot')
+    rows = models.JSONField(default=list)
+    participant_count = models.IntegerField(default=0)
+    version = models.IntegerField(default=0)
+    computed_version = models.IntegerField(default=0)
+    computed_at = models.DateTimeField()
+
+    @property
+    def is_stale(self):
+        return self.computed_version != self.version
+
+    @classmethod
+    def mark_stale(cls, departments=None):
+        """Bump the version of the given departments' snapshots (ids or a values() queryset; None for all)"""
+        snapshots = cls.objects.all()
+        if departments is not None:
+            snapshots = snapshots.filter(department__in=departments)
+        snapshots.update(version=models.F('version') + 1)
+
+    def __str__(self):
+        return f"Leaderboard snapshot for department {self.department_id} ({self.participant_count} participants)"
+
+
+class ProofDocument(models.Model):
+    """A participant's uploaded proof file, kept under MEDIA_ROOT instead of in the Participant row"""
+    PROOF_TYPES = [
+        ('research', 'Research publications'),
+        ('hackathon', 'Hackathon participation'),
+        ('coding', 'Coding competitions'),
+        ('academic', 'Academic performance'),
+        ('internship', 'Internships'),
+        ('extracurricular', 'Extracurricular activities'),
+    ]
+    # Registration form upload field -> proof_type
+    UPLOAD_FIELDS = {
+        'proof_of_research_publications': 'research',
+        'proof_of_hackathon_participation': 'hackathon',
+        'proof_of_coding_competitions': 'coding',
+        'proof_of_academic_performance': 'academic',
+        'proof_of_internships': 'internship',
+        'proof_of_extracurricular_activities': 'extracurricular',
+    }
+
+    participant = models.ForeignKey(Participant, on_delete=models.CASCADE, related_name='proof_documents')
+    proof_type = models.CharField(max_length=20, choices=PROOF_TYPES)
+    file = models.FileField(upload_to='proofs', max_length=255)
+    size = models.PositiveIntegerField()
+    sha256 = models.CharField(max_length=64)
+    content_type = models.CharField(max_length=100)
+    uploaded_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('participant', 'proof_type')
+
+    def file_name(self, extension):
+        """<registration_no>/<proof_type>-<sha256 prefix><ext>, the name the file is saved under in proofs/"""
+        return f'{self.participant_id}/{self.proof_type}-{self.sha256[:16]}{extension}'
+
+    def __str__(self):
+        return f"{self.get_proof_type_display()} proof of {self.participant_id}"
+
+
+class CacheVersion(models.Model):
+    """Version counter of a cache namespace (see caching.py), bumped with an atomic F() update"""
+    namespace = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.namespace} v{self.version}"
@@ -0,0 +1,263 @@
+"""
+Proof documents.
+
+Uploaded proofs live in ProofDocument rows whose files are kept by the default
+storage under MEDIA_ROOT, one per (participant, proof_type). The row records
+size, SHA-256 and the content type sniffed from the file's first bytes, so
+the hot Participant row never carries file data.
+
+Multipart uploads of proof fields go through ProofUploadHandler, which
+streams them to a temporary file while hashing and counting, and drops a
+file as soon as it passes MAX_PROOF_SIZE. Storing such an upload moves the
+temporary file into place instead of reading it again, and re-uploading the
+file a proof already holds writes nothing. Each stored proof gets a
+thumbnail rendered in the background (see thumbnails.py).
+
+Downloads are streamed from storage in chunks, honour single byte ranges and
+are conditional on an ETag of the stored hash, so a re-open costs a 304.
+"""
+import hashlib
+import re
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopFutureHandlers
+from django.db import transaction
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import ProofDocument
+from .thumbnails import schedule_thumbnail
+
+# Leading bytes of the formats participants upload
+SIGNATURES = [
+    (b'%PDF-', 'application/pdf', '.pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png', '.png'),
+    (b'\xff\xd8\xff', 'image/jpeg', '.jpg'),
+    (b'GIF87a', 'image/gif', '.gif'),
+    (b'GIF89a', 'image/gif', '.gif'),
+]
+UNKNOWN_CONTENT_TYPE = ('application/octet-stream', '')
+
+MAX_PROOF_SIZE = 5 * 1024 * 1024
+PROOF_SIZE_ERROR = 'File size should not exceed 5 MB.'
+SNIFF_BYTES = 16
+
+STREAM_CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def sniff_content_type(head):
+    """(content type, extension) for a file starting with `head`."""
+    for signature, content_type, extension in SIGNATURES:
+        if head.startswith(signature):
+            return content_type, extension
+    # WebP: RIFF container with a WEBP form type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp', '.webp'
+    return UNKNOWN_CONTENT_TYPE
+
+
+def _delete_files_on_commit(names):
+    """Remove stored files once the rows pointing at them are gone for good."""
+    storage = ProofDocument._meta.get_field('file').storage
+
+    def delete():
+        for name in names:
+            storage.delete(name)
+    transaction.on_commit(delete)
+
+
+class ProofUploadHandler(FileUploadHandler):
+    """
+    Upload handler for the proof fields of a multipart request. Each proof is
+    written to a temporary file chunk by chunk while its SHA-256, size and
+    leading bytes are recorded; one that grows past MAX_PROOF_SIZE is
+    discarded on the spot and noted in request.proof_upload_errors. Other
+    fields fall through to the next handler.
+    """
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.upload = None
+        if field_name not in ProofDocument.UPLOAD_FIELDS:
+            return
+        if self.content_length and self.content_length > MAX_PROOF_SIZE:
+            self.reject()
+        self.upload = TemporaryUploadedFile(self.file_name, self.content_type, 0, self.charset, self.content_type_extra)
+        self.digest = hashlib.sha256()
+        self.head = b''
+        self.size = 0
+        # The default handlers would buffer the same file again
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.upload is None:
+            return raw_data
+        self.size += len(raw_data)
+        if self.size > MAX_PROOF_SIZE:
+            self.upload.close()
+            self.upload = None
+            self.reject()
+        if len(self.head) < SNIFF_BYTES:
+            self.head += raw_data[:SNIFF_BYTES - len(self.head)]
+        self.digest.update(raw_data)
+        self.upload.write(raw_data)
+
+    def file_complete(self, file_size):
+        if self.upload is None:
+            return None
+        self.upload.seek(0)
+        self.upload.size = file_size
+        self.upload.sha256 = self.digest.hexdigest()
+        self.upload.head = self.head
+        return self.upload
+
+    def reject(self):
+        """Drop the current file; the rest of its bytes are skipped unread."""
+        if not hasattr(self.request, 'proof_upload_errors'):
+            self.request.proof_upload_errors = {}
+        self.request.proof_upload_errors[self.field_name] = [PROOF_SIZE_ERROR]
+        raise SkipFile()
+
+
+def _fingerprint(content):
+    """(sha256, size, leading bytes) of a file, reusing what ProofUploadHandler recorded."""
+    if getattr(content, 'sha256', None):
+        return content.sha256, content.size, content.head
+    content.seek(0)
+    digest = hashlib.sha256()
+    size = 0
+    head = b''
+    for chunk in content.chunks():
+        if not head:
+            head = chunk[:SNIFF_BYTES]
+        digest.update(chunk)
+        size += len(chunk)
+    content.seek(0)
+    return digest.hexdigest(), size, head
+
+
+def store_proof(participant, proof_type, content):
+    """
+    Store an uploaded file (or bytes) as the participant's proof of
+    proof_type, replacing any previous one. Returns the ProofDocument.
+    """
+    if isinstance(content, bytes):
+        content = ContentFile(content)
+    sha256, size, head = _fingerprint(content)
+    content_type, extension = sniff_content_type(head)
+
+    document = ProofDocument.objects.filter(participant=participant, proof_type=proof_type).first()
+    if document and document.sha256 == sha256 and document.file and document.file.storage.exists(document.file.name):
+        # Same file uploaded again
+        return document
+    previous_file = document.file.name if document else None
+    if document is None:
+        document = ProofDocument(participant=participant, proof_type=proof_type)
+    document.size = size
+    document.sha256 = sha256
+    document.content_type = content_type
+    document.file.save(document.file_name(extension), content, save=False)
+    document.save()
+    if previous_file and previous_file != document.file.name:
+        _delete_files_on_commit([previous_file])
+    schedule_thumbnail(document)
+    return document
+
+
+def delete_proofs(documents):
+    """Delete the given ProofDocument queryset and, after commit, its files."""
+    names = [name for name in documents.values_list('file', flat=True) if name]
+    deleted = documents.delete()[0]
+    _delete_files_on_commit(names)
+    return deleted
+
+
+def parse_range(header, size):
+    """
+    Inclusive (start, end) of a single "bytes=" range within a file of
+    `size` bytes. None when the whole file should be sent (no header, a
+    malformed one or several ranges); ValueError when it is unsatisfiable.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        if int(last) == 0:
+            raise ValueError('Empty suffix range')
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError('Range starts after the end of the file')
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def _read_range(file, start, length):
+    """Yield `length` bytes of `file` from `start` in STREAM_CHUNK_SIZE chunks, then close it."""
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(STREAM_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def _proof_body(request, document, filename, etag, last_modified):
+    """The whole file, the requested byte range or a 416."""
+    byte_range = None
+    # If-Range: only send a range of the version the client already has part of
+    if request.headers.get('If-Range') in (None, etag, last_modified):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), document.size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{document.size}'
+            return response
+
+    if byte_range is None:
+        response = FileResponse(document.file.open('rb'), content_type=document.content_type, filename=filename)
+        response.block_size = STREAM_CHUNK_SIZE
+        return response
+
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        _read_range(document.file.open('rb'), start, end - start + 1),
+        status=206,
+        content_type=document.content_type,
+    )
+    response['Content-Length'] = end - start + 1
+    response['Content-Range'] = f'bytes {start}-{end}/{document.size}'
+    response['Content-Disposition'] = f'inline; filename="{filename}"'
+    return response
+
+
+def proof_response(request, document, filename):
+    """
+    Streaming response for a ProofDocument with ETag/Last-Modified from the
+    stored hash and upload time: 304 when the client's copy is current,
+    206 for a satisfiable Range, 416 for an unsatisfiable one.
+    """
+    etag = quote_etag(document.sha256)
+    # Whole seconds, the resolution of If-Modified-Since
+    modified = int(document.uploaded_at.timestamp())
+    last_modified = http_date(modified)
+    response = get_conditional_response(request, etag=etag, last_modified=modified)
+    if response is None:
+        response = _proof_body(request, document, filename, etag, last_modified)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    response['Accept-Ranges'] = 'bytes'
+    # Proofs are personal: browsers may keep them but must revalidate
+    response['Cache-Control'] = 'private, no-cache'
+    return response
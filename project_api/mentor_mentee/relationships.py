@@ -0,0 +1,177 @@
+"""
+Relationship writes and bulk persistence for matching results.
+
+Every write to MentorMenteeRelationship goes through changing_relationships(),
+which keeps the denormalized Participant.mentee_count/current_mentor columns,
+leaderboard points and leaderboard entries in step within one transaction.
+
+The matching helpers run a fixed number of queries however many matches a
+run produces: mentor loads, existing relationships and departments are
+loaded up front and all new rows go in with one bulk_create.
+"""
+import heapq
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .caching import MENTOR_FEATURES_NAMESPACE, bump_version_on_commit
+from .leaderboard import refresh_leaderboard_entries, tracking_relationship_points
+from .matching import MAX_MENTEES_PER_MENTOR
+from .models import MentorMenteeRelationship, Participant
+
+
+def relationship_columns():
+    """Expected mentee_count/current_mentor values as expressions on a Participant queryset."""
+    counts = MentorMenteeRelationship.objects.filter(mentor=OuterRef('pk')).order_by().values('mentor')
+    # A mentee's first relationship, like the views have always shown
+    first_mentor = MentorMenteeRelationship.objects.filter(mentee=OuterRef('pk')).order_by('id')
+    return {
+        'mentee_count': Coalesce(Subquery(counts.annotate(total=Count('pk')).values('total')[:1]), Value(0)),
+        'current_mentor': Subquery(first_mentor.values('mentor_id')[:1]),
+    }
+
+
+def sync_relationship_columns(registration_nos=None):
+    """
+    Recompute mentee_count and current_mentor for the given participants
+    (default: everyone) from their relationships with one UPDATE.
+    """
+    participants = Participant.objects.all()
+    if registration_nos is not None:
+        participants = participants.filter(registration_no__in=registration_nos)
+    updated = participants.update(**relationship_columns())
+    # The UPDATE bypasses Participant.save()
+    bump_version_on_commit(MENTOR_FEATURES_NAMESPACE)
+    return updated
+
+
+@contextmanager
+def changing_relationships(registration_nos):
+    """
+    Wrap writes to MentorMenteeRelationship touching the given mentors and
+    mentees. The write, the relationship columns, leaderboard points and
+    leaderboard entries are updated in one transaction.
+    """
+    registration_nos = {r for r in registration_nos if r}
+    with transaction.atomic():
+        with tracking_relationship_points(registration_nos):
+            yield
+        if registration_nos:
+            sync_relationship_columns(registration_nos)
+        refresh_leaderboard_entries(registration_nos)
+
+
+def assign_to_existing_mentors(unmatched_mentees, mentor_reg_nos, department=None, per_department=False):
+    """
+    Hand unmatched mentees to already matched mentors with spare capacity,
+    least-loaded mentor first (one query). With per_department=True a mentee
+    only goes to a mentor of its own department_id. Returns match entries;
+    nothing is written.
+    """
+    mentors = Participant.objects.filter(registration_no__in=mentor_reg_nos)
+    if department:
+        mentors = mentors.filter(department=department)
+    mentors = mentors.order_by('registration_no').values(
+        'registration_no', 'name', 'semester', 'branch', 'tech_stack', 'department_id', 'mentee_count'
+    )
+
+    # (mentee count, position, mentor) heaps; position keeps ties in a stable order
+    heaps = {}
+    for position, mentor in enumerate(mentors):
+        if mentor['mentee_count'] < MAX_MENTEES_PER_MENTOR:
+            key = mentor['department_id'] if per_department else None
+            heaps.setdefault(key, []).append((mentor['mentee_count'], position, mentor))
+    for heap in heaps.values():
+        heapq.heapify(heap)
+
+    entries = []
+    for mentee in unmatched_mentees:
+        heap = heaps.get(mentee.get('department_id') if per_department else None)
+        if not heap:
+            continue
+        count, position, mentor = heapq.heappop(heap)
+        if count + 1 < MAX_MENTEES_PER_MENTOR:
+            heapq.heappush(heap, (count + 1, position, mentor))
+        entries.append({
+            "mentor": {
+                "name": mentor['name'],
+                "registration_no": mentor['registration_no'],
+                "semester": mentor['semester'],
+                "branch": mentor['branch'],
+                "tech_stack": mentor['tech_stack'],
+                "department_id": mentor['department_id']
+            },
+            "mentee": {
+                "name": mentee['name'],
+                "registration_no": mentee['registration_no'],
+                "semester": mentee['semester'],
+                "branch": mentee['branch'],
+                "tech_stack": mentee['tech_stack'],
+                "department_id": mentee.get('department_id')
+            },
+            "match_quality": "assigned-to-existing",
+            "common_tech": [],
+            "common_interests": [],
+            "preference_score": 0
+        })
+    return entries
+
+
+class _RowsWritten:
+    """execute_wrapper adding up the rows the wrapped statements reported as written."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        self.count += max(context['cursor'].rowcount, 0)
+        return result
+
+
+def save_matches(matches, department=None):
+    """
+    Create the relationships for a list of match entries in a fixed number of
+    queries (lookups, one insert and the changing_relationships() bookkeeping).
+    Skips missing participants, mentees that already have a mentor and, when
+    a department is given, participants from other departments.
+    Returns the number of relationships actually inserted.
+    """
+    pairs = [(match['mentor']['registration_no'], match['mentee']['registration_no']) for match in matches]
+    if not pairs:
+        return 0
+
+    registration_nos = {reg_no for pair in pairs for reg_no in pair}
+    departments = dict(
+        Participant.objects.filter(registration_no__in=registration_nos).values_list('registration_no', 'department_id')
+    )
+    matched_mentees = set(
+        MentorMenteeRelationship.objects.filter(mentee_id__in={mentee for _, mentee in pairs})
+        .values_list('mentee_id', flat=True)
+    )
+
+    relationships = []
+    for mentor_reg_no, mentee_reg_no in pairs:
+        if mentor_reg_no not in departments or mentee_reg_no not in departments:
+            continue
+        if mentee_reg_no in matched_mentees:
+            continue
+        if department and any(departments[r] not in (None, department.id) for r in (mentor_reg_no, mentee_reg_no)):
+            continue
+        matched_mentees.add(mentee_reg_no)
+        relationships.append(MentorMenteeRelationship(
+            mentor_id=mentor_reg_no,
+            mentee_id=mentee_reg_no,
+            manually_created=False
+        ))
+
+    # ignore_conflicts drops rows another request inserted in the meantime
+    # without an error (or primary keys), so the database's row count of the
+    # insert is what was actually created
+    inserted = _RowsWritten()
+    with changing_relationships({reg_no for r in relationships for reg_no in (r.mentor_id, r.mentee_id)}):
+        with connection.execute_wrapper(inserted):
+            MentorMenteeRelationship.objects.bulk_create(relationships, ignore_conflicts=True)
+    return inserted.count
@@ -1,23 +1,19 @@
 from rest_framework import serializers
 from django.core.exceptions import ValidationError
-from .models import Participant, MentorMenteeRelationship, Session, QuizResult, Badge, ParticipantBadge, MentorFeedback, ApplicationFeedback, FeedbackSettings
+from .models import Participant, ProofDocument, MentorMenteeRelationship, Session, QuizResult, Badge, ParticipantBadge, MentorFeedback, ApplicationFeedback, FeedbackSettings
 from account.models import Department
 from account.serializers import DepartmentSerializer
+from .proofs import MAX_PROOF_SIZE, PROOF_SIZE_ERROR, store_proof
 
 # Validator for file size
 def validate_file_size(file):
-    limit = 5 * 1024 * 1024  # 5 MB limit
-    if file.size > limit:
-        raise ValidationError('File size should not exceed 5 MB.')
+    if file.size > MAX_PROOF_SIZE:  # 5 MB limit
+        raise ValidationError(PROOF_SIZE_ERROR)
 
 class MentorInfoSerializer(serializers.ModelSerializer):
     """Serializer for basic mentor information"""
-    mentee_count = serializers.SerializerMethodField()
     department_name = serializers.SerializerMethodField()
     
-    def get_mentee_count(self, obj):
-        return MentorMenteeRelationship.objects.filter(mentor=obj).count()
-    
     def get_department_name(self, obj):
         return obj.department.name if obj.department else None
     
@@ -34,11 +30,10 @@ class MenteeInfoSerializer(serializers.ModelSerializer):
     department_name = serializers.SerializerMethodField()
     
     def get_mentor(self, obj):
-        relationship = MentorMenteeRelationship.objects.filter(mentee=obj).first()
-        if relationship:
+        if obj.current_mentor_id:
             return {
-                'name': relationship.mentor.name,
-                'registration_no': relationship.mentor.registration_no
+                'name': obj.current_mentor.name,
+                'registration_no': obj.current_mentor_id
             }
         return None
     
@@ -62,13 +57,13 @@ class ParticipantSerializer(serializers.ModelSerializer):
     class Meta:
         model = Participant
         fields = '__all__'
+        read_only_fields = Participant.SKILL_TOKEN_FIELDS + Participant.RELATIONSHIP_FIELDS
 
     def get_mentor(self, obj):
         """Get the mentor for this participant (if they are a mentee)"""
         try:
-            relationship = MentorMenteeRelationship.objects.filter(mentee=obj).first()
-            if relationship:
-                return MentorInfoSerializer(relationship.mentor).data
+            if obj.current_mentor_id:
+                return MentorInfoSerializer(obj.current_mentor).data
             return None
         except Exception:
             return None
@@ -76,7 +71,9 @@ class ParticipantSerializer(serializers.ModelSerializer):
     def get_mentees(self, obj):
         """Get the mentees for this participant (if they are a mentor)"""
         try:
-            relationships = MentorMenteeRelationship.objects.filter(mentor=obj)
+            if not obj.mentee_count:
+                return []
+            relationships = MentorMenteeRelationship.objects.filter(mentor=obj).select_related('mentee__current_mentor')
             if relationships:
                 return MenteeInfoSerializer([rel.mentee for rel in relationships], many=True).data
             return []
@@ -105,44 +102,14 @@ class ParticipantSerializer(serializers.ModelSerializer):
             except Department.DoesNotExist:
                 pass
         
-        # Validate and save 'proof_of_research_publications'
-        if 'proof_of_research_publications' in self.initial_data:
-            file = self.initial_data['proof_of_research_publications']
-            validate_file_size(file)  # Validate file size
-            validated_data['proof_of_research_publications'] = file.read()  # Store as binary
-
-        # Validate and save 'proof_of_hackathon_participation'
-        if 'proof_of_hackathon_participation' in self.initial_data:
-            file = self.initial_data['proof_of_hackathon_participation']
-            validate_file_size(file)  # Validate file size
-            validated_data['proof_of_hackathon_participation'] = file.read()
-
-        # Validate and save 'proof_of_coding_competitions'
-        if 'proof_of_coding_competitions' in self.initial_data:
-            file = self.initial_data['proof_of_coding_competitions']
-            validate_file_size(file)  # Validate file size
-            validated_data['proof_of_coding_competitions'] = file.read()
-
-        # Validate and save 'proof_of_academic_performance'
-        if 'proof_of_academic_performance' in self.initial_data:
-            file = self.initial_data['proof_of_academic_performance']
-            validate_file_size(file)  # Validate file size
-            validated_data['proof_of_academic_performance'] = file.read()
-
-        # Validate and save 'proof_of_internships'
-        if 'proof_of_internships' in self.initial_data:
-            file = self.initial_data['proof_of_internships']
-            validate_file_size(file)  # Validate file size
-            validated_data['proof_of_internships'] = file.read()
-
-        # Validate and save 'proof_of_extracurricular_activities'
-        if 'proof_of_extracurricular_activities' in self.initial_data:
-            file = self.initial_data['proof_of_extracurricular_activities']
-            validate_file_size(file)  # Validate file size
-            validated_data['proof_of_extracurricular_activities'] = file.read()
+        # Proof files are validated here and stored as ProofDocuments once the participant exists
+        proofs = self._proof_uploads()
 
         # Create the Participant instance with validated data
-        return Participant.objects.create(**validated_data)
+        participant = Participant.objects.create(**validated_data)
+        for proof_type, file in proofs.items():
+            store_proof(participant, proof_type, file)
+        return participant
 
     def update(self, instance, validated_data):
         # Check for department data
@@ -154,41 +121,8 @@ class ParticipantSerializer(serializers.ModelSerializer):
             except Department.DoesNotExist:
                 pass
                 
-        # Validate and update 'proof_of_research_publications'
-        if 'proof_of_research_publications' in self.initial_data:
-            file = self.initial_data['proof_of_research_publications']
-            validate_file_size(file)  # Validate file size
-            instance.proof_of_research_publications = file.read()
-
-        # Validate and update 'proof_of_hackathon_participation'
-        if 'proof_of_hackathon_participation' in self.initial_data:
-            file = self.initial_data['proof_of_hackathon_participation']
-            validate_file_size(file)  # Validate file size
-            instance.proof_of_hackathon_participation = file.read()
-
-        # Validate and update 'proof_of_coding_competitions'
-        if 'proof_of_coding_competitions' in self.initial_data:
-            file = self.initial_data['proof_of_coding_competitions']
-            validate_file_size(file)  # Validate file size
-            instance.proof_of_coding_competitions = file.read()
-
-        # Validate and update 'proof_of_academic_performance'
-        if 'proof_of_academic_performance' in self.initial_data:
-            file = self.initial_data['proof_of_academic_performance']
-            validate_file_size(file)  # Validate file size
-            instance.proof_of_academic_performance = file.read()
-
-        # Validate and update 'proof_of_internships'
-        if 'proof_of_internships' in self.initial_data:
-            file = self.initial_data['proof_of_internships']
-            validate_file_size(file)  # Validate file size
-            instance.proof_of_internships = file.read()
-
-        # Validate and update 'proof_of_extracurricular_activities'
-        if 'proof_of_extracurricular_activities' in self.initial_data:
-            file = self.initial_data['proof_of_extracurricular_activities']
-            validate_file_size(file)  # Validate file size
-            instance.proof_of_extracurricular_activities = file.read()
+        # Validate the proof files
+        proofs = self._proof_uploads()
 
         # Update the rest of the fields
         instance.name = validated_data.get('name', instance.name)
@@ -220,8 +154,20 @@ class ParticipantSerializer(serializers.ModelSerializer):
         instance.describe_extracurricular_activities = validated_data.get('describe_extracurricular_activities', instance.describe_extracurricular_activities)
         
         instance.save()
+        for proof_type, file in proofs.items():
+            store_proof(instance, proof_type, file)
         return instance
 
+    def _proof_uploads(self):
+        """{proof_type: uploaded file} for the proof fields in the request, size-checked"""
+        proofs = {}
+        for field_name, proof_type in ProofDocument.UPLOAD_FIELDS.items():
+            if field_name in self.initial_data:
+                file = self.initial_data[field_name]
+                validate_file_size(file)  # Validate file size
+                proofs[proof_type] = file
+        return proofs
+
 
 class ParticipantInfoSerializer(serializers.ModelSerializer):
     """Simple serializer for participant information in sessions"""
@@ -350,7 +296,7 @@ class FeedbackSettingsSerializer(serializers.ModelSerializer):
         return obj.department.name if obj.department else "Global Settings"
 
 class ProfileSerializer(serializers.ModelSerializer):
-    """Serializer for participant profile data, excluding binary proof fields"""
+    """Serializer for participant profile data"""
     mentor = serializers.SerializerMethodField()
     mentees = serializers.SerializerMethodField()
     department_name = serializers.SerializerMethodField()
@@ -358,21 +304,14 @@ class ProfileSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Participant
-        exclude = [
-            'proof_of_research_publications',
-            'proof_of_hackathon_participation',
-            'proof_of_coding_competitions',
-            'proof_of_academic_performance',
-            'proof_of_internships',
-            'proof_of_extracurricular_activities'
-        ]
+        fields = '__all__'
+        read_only_fields = Participant.RELATIONSHIP_FIELDS
 
     def get_mentor(self, obj):
         """Get the mentor for this participant (if they are a mentee)"""
         try:
-            relationship = MentorMenteeRelationship.objects.filter(mentee=obj).first()
-            if relationship:
-                return MentorInfoSerializer(relationship.mentor).data
+            if obj.current_mentor_id:
+                return MentorInfoSerializer(obj.current_mentor).data
             return None
         except Exception:
             return None
@@ -380,7 +319,9 @@ class ProfileSerializer(serializers.ModelSerializer):
     def get_mentees(self, obj):
         """Get the mentees for this participant (if they are a mentor)"""
         try:
-            relationships = MentorMenteeRelationship.objects.filter(mentor=obj)
+            if not obj.mentee_count:
+                return []
+            relationships = MentorMenteeRelationship.objects.filter(mentor=obj).select_related('mentee__current_mentor')
             if relationships:
                 return MenteeInfoSerializer([rel.mentee for rel in relationships], many=True).data
             return []
@@ -400,20 +341,14 @@ class ProfileSerializer(serializers.ModelSerializer):
         return None
 
 class ParticipantListSerializer(serializers.ModelSerializer):
-    """Serializer for listing participants, excluding binary proof fields"""
+    """Serializer for listing participants"""
     department_name = serializers.SerializerMethodField()
     department_details = serializers.SerializerMethodField()
     
     class Meta:
         model = Participant
-        exclude = [
-            'proof_of_research_publications',
-            'proof_of_hackathon_participation',
-            'proof_of_coding_competitions',
-            'proof_of_academic_performance',
-            'proof_of_internships',
-            'proof_of_extracurricular_activities'
-        ]
+        fields = '__all__'
+        read_only_fields = Participant.RELATIONSHIP_FIELDS
         
     def get_department_name(self, obj):
         return obj.department.name if obj.department else None
@@ -0,0 +1,138 @@
+"""
+Reproducible synthetic cohorts for load testing the matcher.
+
+Skill popularity follows a Zipf-like curve (a few very common stacks and a
+long tail of rare ones), participants list several skills each, and the
+mentor/mentee split depends on the semester like generate_test_data does.
+The same size and seed always produce the same cohort.
+"""
+import datetime
+import random
+
+from account.models import Department
+
+from .models import Participant, ParticipantHistory, SkillToken, normalize_skills
+
+TECH_SKILLS = [
+    "Python", "JavaScript", "Java", "React", "C++", "Node.js", "SQL", "Django", "HTML", "CSS",
+    "TypeScript", "Spring Boot", "Android", "Flask", "C", "Docker", "Kotlin", "TensorFlow", "MongoDB",
+    "Angular", "Git", "AWS", "PHP", "Vue.js", "Go", "Flutter", "PyTorch", "Kubernetes", "C#", ".NET",
+    "Swift", "Laravel", "Rust", "OpenCV", "Pandas", "Linux", "Firebase", "GraphQL", "Redis",
+    "Ruby", "Rails", "MATLAB", "Unity", "Solidity", "Scala", "R", "Embedded C", "Verilog",
+]
+
+INTERESTS = [
+    "Web Development", "Machine Learning", "AI", "Data Science", "App Development",
+    "Cloud Computing", "Cybersecurity", "DevOps", "Competitive Programming", "Blockchain",
+    "UI/UX Design", "Game Development", "IoT", "Computer Vision", "Natural Language Processing",
+    "Big Data", "Robotics", "Open Source", "Augmented Reality", "Embedded Systems",
+    "FinTech", "EdTech", "HealthTech", "Quantum Computing", "System Design",
+    "Networking", "Database Systems", "Product Management", "Research", "Entrepreneurship",
+]
+
+BRANCHES = [code for code, _ in Participant.BRANCH_CHOICES]
+
+
+def zipf_weights(count, exponent=1.1):
+    """Relative popularity of the rank-1..count items."""
+    return [1 / rank ** exponent for rank in range(1, count + 1)]
+
+
+TECH_WEIGHTS = zipf_weights(len(TECH_SKILLS))
+INTEREST_WEIGHTS = zipf_weights(len(INTERESTS))
+BRANCH_WEIGHTS = zipf_weights(len(BRANCHES), exponent=0.6)
+
+
+def _sample(rng, population, weights, k):
+    """k distinct items drawn by weight."""
+    picked = []
+    while len(picked) < k:
+        item = rng.choices(population, weights)[0]
+        if item not in picked:
+            picked.append(item)
+    return picked
+
+
+def generate_cohort(size, seed=42, prefix='BM', history_rate=0.3):
+    """
+    Participant field values for `size` approved, active participants, plus
+    ParticipantHistory field values for roughly history_rate of them.
+    """
+    rng = random.Random(f'{seed}:{size}')
+    participants = []
+    histories = []
+    for i in range(size):
+        semester = rng.randint(1, 8)
+        mentor = rng.random() < (0.75 if semester >= 6 else 0.25)
+        techs = _sample(rng, TECH_SKILLS, TECH_WEIGHTS, rng.choices((1, 2, 3, 4), (2, 4, 3, 1))[0])
+        interests = _sample(rng, INTERESTS, INTEREST_WEIGHTS, rng.choices((1, 2, 3), (3, 4, 2))[0])
+        # Preferences mostly repeat the participant's own interests, sometimes left blank
+        preferences = [p.lower() if rng.random() < 0.8 else '' for p in _sample(rng, INTERESTS, INTEREST_WEIGHTS, 3)]
+        badges = rng.choices(range(8), (40, 20, 12, 8, 6, 5, 5, 4))[0]
+        registration_no = f'{prefix}{i:07d}'
+
+        participants.append({
+            'registration_no': registration_no,
+            'name': f'Participant {i}',
+            'semester': str(semester),
+            'branch': rng.choices(BRANCHES, BRANCH_WEIGHTS)[0],
+            'mentoring_preferences': 'mentor' if mentor else 'mentee',
+            'tech_stack': ', '.join(techs),
+            'areas_of_interest': ', '.join(interests),
+            'interest_preference1': preferences[0],
+            'interest_preference2': preferences[1],
+            'interest_preference3': preferences[2],
+            'hackathon_participation': rng.choice(['None', 'College', 'National', 'International']),
+            'coding_competitions_participate': rng.choice(['yes', 'no']),
+            'cgpa': round(rng.uniform(6.0, 10.0), 2),
+            'sgpa': round(rng.uniform(6.0, 10.0), 2),
+            'internship_experience': rng.choice(['yes', 'no']),
+            'badges_earned': badges,
+            'is_super_mentor': mentor and badges >= 6,
+            'approval_status': 'approved',
+            'status': 'active',
+        })
+
+        if rng.random() < history_rate:
+            was_mentor = mentor and rng.random() < 0.7
+            histories.append({
+                'registration_no': registration_no,
+                'name': f'Participant {i}',
+                'semester': str(max(semester - 1, 1)),
+                'branch': participants[-1]['branch'],
+                'total_badges_earned': badges,
+                'was_mentor': was_mentor,
+                'was_mentee': not was_mentor,
+                'mentor_rating': round(rng.uniform(2.0, 5.0), 1) if was_mentor else None,
+                'mentee_rating': None if was_mentor else round(rng.uniform(2.0, 5.0), 1),
+                'sessions_attended': 0 if was_mentor else rng.randint(0, 12),
+                'sessions_conducted': rng.randint(0, 12) if was_mentor else 0,
+                'start_date': datetime.date(2024, 1, 1),
+                'end_date': datetime.date(2024, 6, 30),
+            })
+    return participants, histories
+
+
+def bulk_load_cohort(participants, histories=(), batch_size=2000):
+    """
+    Insert a generated cohort with bulk_create: skill tokens are resolved in
+    one pass and departments mapped from the branch code, which is what
+    Participant.save() would do row by row.
+    """
+    names = set()
+    for row in participants:
+        names.update(normalize_skills(row['tech_stack']))
+        names.update(normalize_skills(row['areas_of_interest']))
+        names.update(row[f'interest_preference{i}'] for i in range(1, 4))
+    names.discard('')
+    token_ids = SkillToken.ids_for(names)
+    departments = {code.lower(): pk for code, pk in Department.objects.values_list('code', 'id')}
+
+    objects = []
+    for row in participants:
+        participant = Participant(department_id=departments.get(row['branch']), **row)
+        participant.refresh_skill_tokens(token_ids)
+        objects.append(participant)
+    Participant.objects.bulk_create(objects, batch_size=batch_size)
+    ParticipantHistory.objects.bulk_create([ParticipantHistory(**row) for row in histories], batch_size=batch_size)
+    return len(objects)
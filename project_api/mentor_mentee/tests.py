@@ -1,3 +1,1421 @@
-from django.test import TestCase
+import base64
+import copy
+import hashlib
+import io
+import itertools
+import json
+import random
+import tempfile
+import threading
+import uuid
+from collections import Counter
+from datetime import timedelta
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import connection
+from django.db.models import F, Q
+from django.db.migrations.executor import MigrationExecutor
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+import numpy as np
+from PIL import Image
+from unittest import mock
+
+from account.models import Department
+from . import caching
+from .leaderboard import (
+    BADGE_POINTS, QUIZ_ASSIGNED_POINTS, SESSION_ATTENDED_POINTS, SESSION_CREATED_POINTS, SUPER_MENTOR_POINTS,
+    SEARCH_TOKEN_LIMIT, adjust_points, award_point_badges, recalculate_leaderboard, refresh_department_snapshots,
+    search_filter,
+)
+from .incremental_matching import cached_mentor_features
+from .match_plans import MATCH_PLAN_TTL
+from .matching import (
+    MATCH_FIELDS, MAX_MENTEES_PER_MENTOR, MatchingEngine, SkillIndex, department_shards, load_match_records,
+    match_by_department, match_cohort, match_mentors_mentees, pair_match_details, solve_capacitated_assignment,
+)
+from .proofs import MAX_PROOF_SIZE, parse_range, store_proof
+from .models import (
+    Badge, DepartmentLeaderboardSnapshot, FeedbackSettings, LeaderboardEntry, MatchPlan, Participant, ParticipantBadge, MentorMenteeRelationship,
+    ParticipantHistory, QuizResult, Session, SkillToken,
+)
+from .relationships import assign_to_existing_mentors, save_matches, sync_relationship_columns
+from .thumbnails import THUMBNAIL_SIZE, _ensure_in_background, ensure_thumbnail
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'}}
+
+SKILLS = ['Python', 'Django', 'React', 'Java', 'Machine Learning', 'SQL', 'Go', 'Rust', 'Docker', 'Flutter']
+INTERESTS = ['AI', 'Web Development', 'Security', 'Cloud', 'Data Science', 'Mobile']
+
+
+def create_participant(registration_no, mentoring_preferences, **fields):
+    """Approved, active participant with the required form fields filled in"""
+    data = {
+        'name': registration_no,
+        'registration_no': registration_no,
+        'semester': '5',
+        'branch': 'CT',
+        'mentoring_preferences': mentoring_preferences,
+        'tech_stack': 'Python',
+        'areas_of_interest': 'AI',
+        'hackathon_participation': 'None',
+        'coding_competitions_participate': 'no',
+        'cgpa': 8,
+        'sgpa': 8,
+        'internship_experience': 'no',
+        'approval_status': 'approved',
+        'status': 'active',
+    }
+    data.update(fields)
+    return Participant.objects.create(**data)
+
+
+def match_entry(mentor, mentee):
+    """Minimal match entry as produced by the matching engine"""
+    return {
+        'mentor': {'registration_no': mentor.registration_no},
+        'mentee': {'registration_no': mentee.registration_no},
+    }
+
+
+def skill_cohort(mentors, mentees, seed=0, department_id=None, prefix=''):
+    """Random mentor and mentee records shaped like load_match_records() rows"""
+    rng = random.Random(seed)
+
+    def student(registration_no, role):
+        return {
+            'registration_no': registration_no, 'name': registration_no, 'semester': '5', 'branch': 'ct',
+            'department_id': department_id, 'mentoring_preferences': role,
+            'tech_stack': ', '.join(rng.sample(SKILLS, rng.randint(0, 3))),
+            'areas_of_interest': ', '.join(rng.sample(INTERESTS, rng.randint(0, 2))),
+            'interest_preference1': rng.choice(INTERESTS + [None]),
+            'interest_preference2': rng.choice(SKILLS + [None]),
+            'interest_preference3': None,
+            'badges_earned': rng.randint(0, 5) if role == 'mentor' else 0,
+            'is_super_mentor': role == 'mentor' and rng.random() < 0.2,
+            'tech_stack_tokens': [], 'interest_tokens': [], 'preference_tokens': [],
+            'historical_data': None,
+        }
+    return ([student(f'{prefix}M{i:02}', 'mentor') for i in range(mentors)]
+            + [student(f'{prefix}E{i:02}', 'mentee') for i in range(mentees)])
+
+
+def matched_pairs(result):
+    return [(m['mentee']['registration_no'], m['mentor']['registration_no']) for m in result['matches']]
+
+
+def brute_force_assignment(benefit, capacity):
+    """Best total benefit over every assignment (a row may stay unmatched, -1)"""
+    n_rows, n_cols = benefit.shape
+    best = 0
+    for choice in itertools.product(range(-1, n_cols), repeat=n_rows):
+        if any(choice.count(col) > capacity for col in range(n_cols)):
+            continue
+        best = max(best, sum(benefit[row, col] for row, col in enumerate(choice) if col >= 0))
+    return best
+
+
+class CapacitatedAssignmentTests(SimpleTestCase):
+    """solve_capacitated_assignment() is optimal and respects capacities"""
+
+    def assert_valid(self, pairs, shape, capacity):
+        rows = [row for row, _ in pairs]
+        self.assertEqual(len(rows), len(set(rows)))
+        loads = np.bincount([col for _, col in pairs], minlength=shape[1])
+        self.assertTrue((loads <= capacity).all())
+        self.assertTrue(all(0 <= row < shape[0] and 0 <= col < shape[1] for row, col in pairs))
+
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(7)
+        for _ in range(300):
+            shape = (int(rng.integers(1, 7)), int(rng.integers(1, 4)))
+            capacity = int(rng.integers(1, 4))
+            # Small integers, so ties and negative (better unmatched) pairs are common
+            benefit = rng.integers(-2, 6, size=shape).astype(float)
+            pairs = solve_capacitated_assignment(benefit, capacity)
+            self.assert_valid(pairs, shape, capacity)
+            self.assertEqual(sum(benefit[row, col] for row, col in pairs), brute_force_assignment(benefit, capacity),
+                             f'capacity {capacity}\n{benefit}')
+
+    def test_empty_sides(self):
+        self.assertEqual(solve_capacitated_assignment(np.zeros((0, 3)), 2), [])
+        self.assertEqual(solve_capacitated_assignment(np.zeros((3, 0)), 2), [])
+
+    def test_capacity_limit(self):
+        # Everyone prefers mentor 0, which only has room for two
+        benefit = np.array([[5.0, 1.0]] * 5)
+        pairs = solve_capacitated_assignment(benefit, 2)
+        self.assert_valid(pairs, benefit.shape, 2)
+        self.assertEqual(sorted(col for _, col in pairs), [0, 0, 1, 1])
+
+    def test_ties(self):
+        benefit = np.ones((6, 3))
+        pairs = solve_capacitated_assignment(benefit, 2)
+        self.assert_valid(pairs, benefit.shape, 2)
+        self.assertEqual(len(pairs), 6)
+
+    def test_optimal_strategy_beats_greedy(self):
+        students = skill_cohort(6, 30, seed=11)
+        greedy = match_cohort(students, 'greedy', {})
+        optimal = match_cohort(students, 'optimal', {})
+        self.assertGreaterEqual(optimal['statistics']['total_match_quality'], greedy['statistics']['total_match_quality'])
+        self.assertTrue(all(match['match_quality'] > 0 for match in optimal['matches']))
+        mentors = [match['mentor']['registration_no'] for match in optimal['matches']]
+        self.assertLessEqual(max(mentors.count(m) for m in set(mentors)), 4)
+
+
+def reference_greedy(students):
+    """The pairwise greedy loop the matching engine replaced, scored with pair_match_details()"""
+    mentors = [s for s in students if s['mentoring_preferences'] == 'mentor']
+    load = [0] * len(mentors)
+    pairs = []
+    for mentee in (s for s in students if s['mentoring_preferences'] == 'mentee'):
+        best, best_score = None, 0
+        for j, mentor in enumerate(mentors):
+            if load[j] >= MAX_MENTEES_PER_MENTOR or mentor['registration_no'] == mentee['registration_no']:
+                continue
+            score = pair_match_details(mentor, mentee)[0]
+            if score > best_score:
+                best, best_score = j, score
+        if best is not None:
+            load[best] += 1
+            pairs.append((mentee['registration_no'], mentors[best]['registration_no']))
+    return pairs
+
+
+class MatchingStrategyTests(SimpleTestCase):
+    """Greedy and optimal assignment on cohorts that need no database"""
+
+    def test_engine_scores_match_pairwise_scores(self):
+        rng = random.Random(5)
+        students = skill_cohort(8, 12, seed=5)
+        for student in students[::3]:
+            student['historical_data'] = {
+                'was_mentor': True, 'was_mentee': True,
+                'mentor_rating': rng.choice([0, 3, 4.5]), 'mentee_rating': rng.choice([None, 2, 5]),
+                'sessions_conducted': rng.randint(0, 9), 'sessions_attended': rng.randint(0, 9),
+            }
+        mentors, mentees = students[:8], students[8:]
+        matrix = MatchingEngine(mentors, mentees).score_matrix()
+        expected = [[pair_match_details(mentor, mentee)[0] for mentor in mentors] for mentee in mentees]
+        np.testing.assert_allclose(matrix, np.array(expected), rtol=1e-6)
+
+    def test_greedy_matches_pairwise_loop(self):
+        for seed in range(20):
+            students = skill_cohort(5, 25, seed=seed)
+            self.assertEqual(matched_pairs(match_cohort(students, 'greedy', {})), reference_greedy(students), seed)
+
+    def test_greedy_scans_every_mentor_by_default(self):
+        students = skill_cohort(12, 40, seed=4)
+        with mock.patch.object(SkillIndex, 'build', side_effect=AssertionError('index built')):
+            full_scan = match_cohort(students, 'greedy', {})
+        indexed = match_cohort(students, 'greedy', {}, use_index=True)
+        self.assertTrue(full_scan['matches'])
+        self.assertEqual(matched_pairs(indexed), matched_pairs(full_scan))
+
+
+class ShardedMatchingTests(TestCase):
+    """Department sharding gives the same matches as matching each department on its own"""
+
+    def setUp(self):
+        self.students = []
+        for department_id, seed in ((1, 21), (2, 22), (None, 23), (3, 24)):
+            self.students += skill_cohort(4, 14, seed=seed, department_id=department_id, prefix=f'D{department_id}')
+
+    def unsharded(self):
+        pairs = []
+        for _, students in department_shards(copy.deepcopy(self.students)):
+            pairs += matched_pairs(match_cohort(students, 'greedy', {}))
+        return pairs
+
+    def test_parallel_matches_unsharded_run(self):
+        result = match_by_department(copy.deepcopy(self.students), max_workers=2)
+        self.assertEqual(result['sharding']['workers'], 2)
+        self.assertTrue(result['matches'])
+        self.assertEqual(matched_pairs(result), self.unsharded())
+        self.assertEqual([shard['department_id'] for shard in result['shards']], [1, 2, 3, None])
+        self.assertEqual(result['statistics']['matches_made'], len(result['matches']))
+
+    def test_single_worker_runs_in_process(self):
+        with mock.patch('mentor_mentee.matching.ProcessPoolExecutor', side_effect=AssertionError('pool started')):
+            result = match_by_department(copy.deepcopy(self.students), max_workers=1)
+        self.assertEqual(result['sharding']['workers'], 1)
+        self.assertEqual(matched_pairs(result), self.unsharded())
+
+    @override_settings(MATCHING_SHARD_WORKERS=1)
+    def test_shard_workers_setting(self):
+        ct = Department.objects.create(name='Computer Technology', code='CT')
+        ee = Department.objects.create(name='Electrical Engineering', code='EE')
+        for department in (ct, ee):
+            create_participant(f'{department.code}M', 'mentor', department=department)
+            create_participant(f'{department.code}E', 'mentee', department=department)
+
+        with mock.patch('mentor_mentee.matching.ProcessPoolExecutor', side_effect=AssertionError('pool started')):
+            response = self.client.get(reverse('match_participants'), {'sharded': 'true', 'plan': 'true'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['sharding']['workers'], 1)
+        pairs = sorted((m['mentee']['registration_no'], m['mentor']['registration_no']) for m in response.json()['new_matches'])
+        self.assertEqual(pairs, [('CTE', 'CTM'), ('EEE', 'EEM')])
+
+
+class MatchRecordTests(TestCase):
+    """Matching reads only MATCH_FIELDS into slotted records that behave like the old dicts"""
+
+    def setUp(self):
+        for student in skill_cohort(3, 9, seed=9):
+            create_participant(
+                student['registration_no'], student['mentoring_preferences'], tech_stack=student['tech_stack'],
+                areas_of_interest=student['areas_of_interest'], interest_preference1=student['interest_preference1'],
+                badges_earned=student['badges_earned'],
+            )
+
+    def test_selects_only_match_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            records = load_match_records(Participant.objects.order_by('registration_no'))
+        self.assertEqual(len(queries), 1)
+        selected = queries[0]['sql'].split(' FROM ')[0]
+        self.assertEqual(selected.count('"mentor_mentee_participant".'), len(MATCH_FIELDS))
+        self.assertNotIn('cgpa', selected)
+
+        record = records[0]
+        self.assertEqual(record['registration_no'], 'E00')
+        self.assertEqual(record.get('cgpa', 'missing'), 'missing')
+        self.assertIn('tech_stack_tokens', record)
+        self.assertIsNone(record['historical_data'])
+        with self.assertRaises(KeyError):
+            record['cgpa']
+        record['historical_data'] = {'was_mentor': False}
+        self.assertEqual(record.get('historical_data'), {'was_mentor': False})
+
+    def test_records_match_like_dicts(self):
+        queryset = Participant.objects.order_by('registration_no')
+        dicts = [dict(row) for row in queryset.values(*MATCH_FIELDS)]
+        from_records = match_mentors_mentees(load_match_records(queryset))
+        from_dicts = match_mentors_mentees(dicts)
+        self.assertTrue(from_records['matches'])
+        self.assertEqual(from_records['matches'], from_dicts['matches'])
+        self.assertEqual(from_records['statistics'], from_dicts['statistics'])
+
+
+class MatchPlanCommitTests(TestCase):
+    """A plan is committed only while it is fresh and its inputs are unchanged"""
+
+    def setUp(self):
+        create_participant('M01', 'mentor')
+        create_participant('E01', 'mentee')
+        create_participant('E02', 'mentee')
+
+    def make_plan(self):
+        response = self.client.get(reverse('match_participants'), {'plan': 'true'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(MentorMenteeRelationship.objects.count(), 0)
+        return response.json()['plan_id']
+
+    def commit(self, plan_id):
+        return self.client.post(reverse('commit_match_plan', args=[plan_id]))
+
+    def test_commit_applies_plan_once(self):
+        plan_id = self.make_plan()
+        response = self.commit(plan_id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['newly_matched'], 2)
+        self.assertEqual(
+            sorted(MentorMenteeRelationship.objects.values_list('mentee_id', 'mentor_id')),
+            [('E01', 'M01'), ('E02', 'M01')],
+        )
+        self.assertIsNotNone(MatchPlan.objects.get(id=plan_id).committed_at)
+        self.assertEqual(self.commit(plan_id).status_code, 409)
+
+    def test_participant_changed_since_preview(self):
+        plan_id = self.make_plan()
+        Participant.objects.filter(registration_no='E02').update(tech_stack='Rust')
+        response = self.commit(plan_id)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['error'], 'Participants changed since the plan was made')
+        self.assertEqual(MentorMenteeRelationship.objects.count(), 0)
+        self.assertIsNone(MatchPlan.objects.get(id=plan_id).committed_at)
+
+    def test_history_changed_since_preview(self):
+        history = ParticipantHistory.objects.create(
+            registration_no='M01', name='M01', semester='4', branch='CT', was_mentor=True, mentor_rating=3,
+            start_date='2025-01-01', end_date='2025-06-01',
+        )
+        plan_id = self.make_plan()
+        history.mentor_rating = 5
+        history.save()
+        self.assertEqual(self.commit(plan_id).status_code, 409)
+
+        plan_id = self.make_plan()
+        ParticipantHistory.objects.create(
+            registration_no='E01', name='E01', semester='4', branch='CT', was_mentee=True, sessions_attended=4,
+            start_date='2025-01-01', end_date='2025-06-01',
+        )
+        self.assertEqual(self.commit(plan_id).status_code, 409)
+        self.assertEqual(MentorMenteeRelationship.objects.count(), 0)
+
+    def test_expired_plan(self):
+        plan_id = self.make_plan()
+        plan = MatchPlan.objects.get(id=plan_id)
+        self.assertAlmostEqual(plan.expires_at - plan.created_at, MATCH_PLAN_TTL, delta=timedelta(seconds=5))
+        with mock.patch('mentor_mentee.views.timezone.now', return_value=plan.expires_at + timedelta(seconds=1)):
+            response = self.commit(plan_id)
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(MentorMenteeRelationship.objects.count(), 0)
+
+    def test_unknown_plan(self):
+        self.assertEqual(self.commit(uuid.uuid4()).status_code, 404)
+
+
+class MatchPersistenceQueryTests(TestCase):
+    """The persistence phase of matching must not issue queries per match"""
+
+    def setUp(self):
+        self.mentors = [create_participant(f'M{i:02}', 'mentor') for i in range(10)]
+        self.mentees = [create_participant(f'E{i:02}', 'mentee') for i in range(30)]
+        # Existing load: mentor 0 is full, mentor 1 has one mentee
+        for mentee in self.mentees[:4]:
+            MentorMenteeRelationship.objects.create(mentor=self.mentors[0], mentee=mentee)
+        MentorMenteeRelationship.objects.create(mentor=self.mentors[1], mentee=self.mentees[4])
+        sync_relationship_columns()
+
+    def test_save_matches_query_budget(self):
+        matches = [
+            match_entry(self.mentors[2 + i % 8], mentee)
+            for i, mentee in enumerate(self.mentees[3:])
+        ]
+
+        # Participants, existing relationships, a savepoint, one bulk insert,
+        # the mentors' leaderboard points read before/after plus one update,
+        # one relationship column update, the leaderboard entries read plus
+        # one upsert, marking the department snapshots stale after the points
+        # and the entries, and the savepoint release
+        with self.assertNumQueries(13):
+            created = save_matches(matches)
+
+        # Mentees 3 and 4 already had a mentor
+        self.assertEqual(created, len(self.mentees) - 5)
+        self.assertEqual(MentorMenteeRelationship.objects.count(), len(self.mentees))
+        self.assertEqual(Participant.objects.get(registration_no='M04').mentee_count, 4)
+        self.assertEqual(Participant.objects.get(registration_no='E29').current_mentor_id, 'M04')
+
+    def test_save_matches_counts_rows_dropped_by_conflicts(self):
+        matches = [match_entry(self.mentors[2], mentee) for mentee in self.mentees[5:8]]
+        bulk_create = MentorMenteeRelationship.objects.bulk_create
+
+        def racing_bulk_create(objs, **kwargs):
+            # Another request pairs the first mentee after save_matches() read
+            # the relationships; its insert is not ours to count
+            wrappers, connection.execute_wrappers = connection.execute_wrappers, []
+            try:
+                MentorMenteeRelationship.objects.create(mentor_id=objs[0].mentor_id, mentee_id=objs[0].mentee_id)
+            finally:
+                connection.execute_wrappers = wrappers
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(MentorMenteeRelationship.objects, 'bulk_create', side_effect=racing_bulk_create):
+            created = save_matches(matches)
+        self.assertEqual(created, 2)
+        self.assertEqual(MentorMenteeRelationship.objects.filter(mentor=self.mentors[2]).count(), 3)
+
+    def test_assign_to_existing_mentors_query_budget(self):
+        unmatched = [
+            {'name': m.name, 'registration_no': m.registration_no, 'semester': m.semester,
+             'branch': m.branch, 'tech_stack': m.tech_stack}
+            for m in self.mentees[5:]
+        ]
+        mentor_reg_nos = [m.registration_no for m in self.mentors[:3]]
+
+        with self.assertNumQueries(1):
+            entries = assign_to_existing_mentors(unmatched, mentor_reg_nos)
+
+        # Mentor 0 is full, mentor 1 takes three more, mentor 2 takes four
+        assigned = [entry['mentor']['registration_no'] for entry in entries]
+        self.assertEqual(assigned.count('M00'), 0)
+        self.assertEqual(assigned.count('M01'), 3)
+        self.assertEqual(assigned.count('M02'), 4)
+        # Least-loaded mentor goes first
+        self.assertEqual(assigned[0], 'M02')
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class VersionedResponseCacheTests(TestCase):
+    """Leaderboard and public stats are served from the cache until the data changes"""
+
+    def setUp(self):
+        cache.clear()
+        self.mentor = create_participant('M01', 'mentor', leaderboard_points=50)
+        self.mentee = create_participant('E01', 'mentee', leaderboard_points=10)
+
+    def test_leaderboard_served_from_cache_with_etag(self):
+        url = reverse('get_leaderboard')
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('ETag', first)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['ETag'], first['ETag'])
+
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+
+    def test_query_parameters_are_cached_separately(self):
+        url = reverse('get_leaderboard')
+        everyone = self.client.get(url).json()
+        page = self.client.get(url, {'limit': 1}).json()
+        self.assertEqual(len(everyone), 2)
+        self.assertEqual([row['id'] for row in page['results']], ['M01'])
+
+    def test_write_bumps_the_version(self):
+        url = reverse('get_leaderboard')
+        first = self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            adjust_points({'E01': 100})
+
+        second = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual([row['id'] for row in second.json()], ['E01', 'M01'])
+
+    def test_public_stats_invalidated_by_feedback(self):
+        url = reverse('public-stats')
+        first = self.client.get(url)
+        self.assertEqual(first.json()['average_rating'], 4.8)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        FeedbackSettings.objects.create(app_feedback_enabled=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            submitted = self.client.post(reverse('submit_app_feedback'), {
+                'participant_id': 'E01', 'usability_rating': 3, 'features_rating': 3,
+                'performance_rating': 3, 'overall_rating': 3, 'nps_score': 5,
+            }, content_type='application/json')
+        self.assertEqual(submitted.status_code, 201)
+
+        second = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()['average_rating'], 3.0)
+
+
+class SkillTokenTests(TestCase):
+    """Skill tokens follow the text fields without extra work on unrelated saves"""
+
+    def setUp(self):
+        create_participant('M01', 'mentor', tech_stack='Python, Django', areas_of_interest='AI')
+
+    def test_tokens_refreshed_only_when_skills_change(self):
+        participant = Participant.objects.get(registration_no='M01')
+        with mock.patch.object(SkillToken, 'ids_for', wraps=SkillToken.ids_for) as ids_for:
+            participant.leaderboard_points = 40
+            participant.save()
+            participant.save(update_fields=['tech_stack', 'leaderboard_points'])
+            self.assertFalse(ids_for.called)
+
+            participant.tech_stack = 'Python, React'
+            participant.save(update_fields=['tech_stack'])
+            self.assertEqual(ids_for.call_count, 1)
+
+        participant.refresh_from_db()
+        names = SkillToken.objects.in_bulk(participant.tech_stack_tokens)
+        self.assertEqual([names[i].name for i in participant.tech_stack_tokens], ['python', 'react'])
+
+    def test_leaderboard_search_matches_skills(self):
+        create_participant('E01', 'mentee', tech_stack='Java', areas_of_interest='Security')
+        url = reverse('get_leaderboard')
+        self.assertEqual([row['id'] for row in self.client.get(url, {'search': 'djan'}).json()], ['M01'])
+        self.assertEqual([row['id'] for row in self.client.get(url, {'search': 'SECUR'}).json()], ['E01'])
+        self.assertEqual(len(self.client.get(url, {'search': 'a'}).json()), 2)
+
+    def test_search_expands_to_bounded_token_set(self):
+        SkillToken.ids_for([f'skill {i:02}' for i in range(SEARCH_TOKEN_LIMIT + 10)])
+        with mock.patch.object(connection.features, 'supports_json_field_contains', True):
+            query = search_filter('Skill')
+            django = search_filter('DJANGO')
+
+        def lookups(q):
+            for child in q.children:
+                if isinstance(child, Q):
+                    yield from lookups(child)
+                else:
+                    yield child
+        self.assertEqual(Counter(lookup for lookup, value in lookups(query)), {
+            'name__icontains': 1, 'tech_stack_tokens__contains': SEARCH_TOKEN_LIMIT,
+            'interest_tokens__contains': SEARCH_TOKEN_LIMIT,
+        })
+        self.assertIn(('tech_stack_tokens__contains', [SkillToken.objects.get(name='django').id]), list(lookups(django)))
+
+
+class SharedCacheVersionTests(TestCase):
+    """A version bump made by one worker invalidates the responses cached by every worker"""
+
+    def test_bump_from_another_cache_client(self):
+        self.assertNotIn('locmem', settings.CACHES['default']['BACKEND'])
+        create_participant('M01', 'mentor', leaderboard_points=50)
+        url = reverse('get_leaderboard')
+        first = self.client.get(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        # Another worker process has its own cache client
+        Participant.objects.filter(registration_no='M01').update(leaderboard_points=70)
+        with mock.patch.object(caching, 'cache', caches.create_connection('default')):
+            caching.bump_version(caching.ACTIVITY_NAMESPACE)
+
+        second = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()[0]['score'], 70)
+
+    def test_versions_are_counted_in_the_database(self):
+        namespace = caching.ACTIVITY_NAMESPACE
+        self.assertEqual(caching.bump_version(namespace), 2)
+        self.assertEqual(caching.bump_version(namespace), 3)
+        # A worker still seeing an older cached counter gets a fresh version, not a used one
+        cache.set(f'cache_version:{namespace}', 2, None)
+        self.assertEqual(caching.bump_version(namespace), 4)
+        # An evicted counter is reloaded instead of restarting at 1
+        cache.delete(f'cache_version:{namespace}')
+        self.assertEqual(caching.get_version(namespace), 4)
+        self.assertEqual(cache.get(f'cache_version:{namespace}'), 4)
+
+    def test_reads_do_not_invalidate(self):
+        department = Department.objects.create(name='Computer Technology', code='CT')
+        create_participant('M01', 'mentor', department=department)
+        refresh_department_snapshots()
+        LeaderboardEntry.objects.all().delete()
+        version = caching.get_version(caching.ACTIVITY_NAMESPACE)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.assertEqual(self.client.get(reverse('get_leaderboard')).status_code, 200)
+        self.assertEqual(callbacks, [])
+        self.assertTrue(LeaderboardEntry.objects.filter(participant_id='M01').exists())
+        self.assertEqual(caching.get_version(caching.ACTIVITY_NAMESPACE), version)
+        self.assertFalse(DepartmentLeaderboardSnapshot.objects.get(department=department).is_stale)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class MentorFeatureCacheTests(TestCase):
+    """Cached mentor features are rebuilt once a write touching a mentor commits"""
+
+    def setUp(self):
+        cache.clear()
+        self.mentor = create_participant('M01', 'mentor')
+        create_participant('E01', 'mentee')
+        self.badge = Badge.objects.create(name='Helper', description='', points_required=0)
+        ParticipantBadge.objects.create(participant=self.mentor, badge=self.badge)
+        self.assertEqual(cached_mentor_features()[0]['badges_earned'], 0)
+        with self.assertNumQueries(0):
+            cached_mentor_features()
+
+    def test_badge_claim(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('claim_badge'), {
+                'participant_id': 'M01', 'badge_id': self.badge.id,
+            }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(cached_mentor_features()[0]['badges_earned'], 1)
+
+    def test_mentor_assignment(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('create_relationship'), {
+                'mentor_registration_no': 'M01', 'mentee_registration_no': 'E01',
+            }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        with self.assertNumQueries(2):
+            # Mentors and their history are read again
+            cached_mentor_features()
+
+    def test_not_invalidated_before_commit(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            self.mentor.name = 'Renamed'
+            self.mentor.save()
+            self.assertEqual(cached_mentor_features()[0]['name'], 'M01')
+
+
+@override_settings(MATCHING_AUTO_INCREMENTAL=True)
+class AutoMatchingFailureTests(TestCase):
+    """A failed incremental placement is logged and reported, not swallowed"""
+
+    def test_failure_is_reported(self):
+        create_participant('E01', 'mentee', approval_status='pending')
+        with mock.patch('mentor_mentee.views.incremental_match', side_effect=RuntimeError('engine broke')), \
+                self.assertLogs('mentor_mentee.views', 'ERROR'):
+            response = self.client.post(reverse('update_participant_approval'), {
+                'registration_no': 'E01', 'approval_status': 'approved',
+            }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['auto_matches'], [])
+        self.assertEqual(response.json()['auto_matching_errors'], [{'registration_no': 'E01', 'details': 'engine broke'}])
+        self.assertIsNone(Participant.objects.get(registration_no='E01').current_mentor_id)
+
+
+def reference_leaderboard_score(participant):
+    """The per-participant formula recalculate_leaderboard() replaced, one query per component"""
+    sessions_score = (Session.objects.filter(mentor=participant).count() * 20
+                      + Session.objects.filter(participants=participant).count() * 10)
+    assigned = QuizResult.objects.filter(mentor=participant)
+    quiz_assignment_score = assigned.count() * 5 + sum(q.score for q in assigned.filter(status='completed'))
+    relationships = MentorMenteeRelationship.objects.filter(mentor=participant)
+    if relationships.exists():
+        mentee_score = relationships.count() * 40
+        quiz_score = sum(q.score for rel in relationships
+                         for q in QuizResult.objects.filter(participant=rel.mentee, status='completed'))
+    else:
+        mentee_score = 0
+        quiz_score = sum(q.score for q in QuizResult.objects.filter(participant=participant, status='completed'))
+    total_score = sessions_score + quiz_score + mentee_score + quiz_assignment_score
+    if participant.badges_earned > 0:
+        total_score += participant.badges_earned * 20
+    if participant.is_super_mentor:
+        total_score += 100
+    return {
+        'sessions_score': sessions_score, 'quiz_score': quiz_score, 'mentee_score': mentee_score,
+        'quiz_assignment_score': quiz_assignment_score, 'total_score': total_score,
+    }
+
+
+class LeaderboardRecalculationTests(TestCase):
+    """The set-based recalculation gives every participant the score of the old per-row formula"""
+
+    def setUp(self):
+        rng = random.Random(3)
+        mentors = [create_participant(f'M{i:02}', 'mentor', badges_earned=rng.randint(0, 6),
+                                      is_super_mentor=rng.random() < 0.3) for i in range(5)]
+        mentees = [create_participant(f'E{i:02}', 'mentee', badges_earned=rng.randint(0, 2)) for i in range(15)]
+        for mentee in mentees[:12]:
+            MentorMenteeRelationship.objects.create(mentor=rng.choice(mentors), mentee=mentee)
+        # A mentor mentored by another mentor still counts as a mentor
+        MentorMenteeRelationship.objects.create(mentor=mentors[0], mentee=mentors[1])
+        for _ in range(8):
+            session = Session.objects.create(mentor=rng.choice(mentors), session_type='physical', location='Lab',
+                                             date_time='2030-01-01T10:00:00Z', summary='Review')
+            session.participants.set(rng.sample(mentees + mentors, rng.randint(0, 5)))
+        for _ in range(25):
+            QuizResult.objects.create(
+                participant=rng.choice(mentees + mentors[1:2]), mentor=rng.choice(mentors + [None]),
+                quiz_topic='AI', score=rng.randint(0, 5), total_questions=5, percentage=0,
+                status=rng.choice(['completed', 'pending']),
+            )
+
+    def test_matches_per_participant_formula(self):
+        results = {r['registration_no']: r for r in recalculate_leaderboard()}
+        self.assertEqual(len(results), 20)
+        for participant in Participant.objects.all():
+            expected = reference_leaderboard_score(participant)
+            self.assertEqual({key: results[participant.registration_no][key] for key in expected}, expected,
+                             participant.registration_no)
+            self.assertEqual(participant.leaderboard_points, expected['total_score'])
+
+
+class LeaderboardRoleFilterTests(TestCase):
+    """The role filter also finds participants whose leaderboard entry was never built"""
+
+    def setUp(self):
+        mentor = create_participant('M01', 'mentor')
+        create_participant('M02', 'mentor')
+        mentee = create_participant('E01', 'mentee')
+        MentorMenteeRelationship.objects.create(mentor=mentor, mentee=mentee)
+        sync_relationship_columns()
+        LeaderboardEntry.objects.all().delete()
+
+    def ids(self, role):
+        response = self.client.get(reverse('get_leaderboard'), {'role': role})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.json()]
+
+    def test_role_filter_without_entries(self):
+        self.assertEqual(self.ids('mentor'), ['M01'])
+        self.assertEqual(self.ids('mentee'), ['E01'])
+        self.assertEqual(sorted(self.ids('all')), ['E01', 'M01', 'M02'])
+
+
+class LeaderboardPagingTests(TestCase):
+    """Keyset pages and ranks stay consistent across tied scores and within a department"""
+
+    POINTS = [50, 10, 50, 30, 0, 50, 10, 30, 10]
+
+    def setUp(self):
+        self.ct = Department.objects.create(name='Computer Technology', code='CT')
+        self.ee = Department.objects.create(name='Electrical Engineering', code='EE')
+        for i, points in enumerate(self.POINTS):
+            create_participant(f'P{i:02}', 'mentee', leaderboard_points=points,
+                               department=self.ct if i % 2 == 0 else self.ee)
+        self.url = reverse('get_leaderboard')
+
+    def ordered_ids(self, department=None):
+        participants = Participant.objects.all()
+        if department:
+            participants = participants.filter(department=department)
+        return [p.registration_no for p in sorted(participants, key=lambda p: (-p.leaderboard_points, p.registration_no))]
+
+    def all_pages(self, limit, **params):
+        ids, cursor = [], None
+        while True:
+            response = self.client.get(self.url, {'limit': limit, **params, **({'cursor': cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            self.assertLessEqual(len(page['results']), limit)
+            ids += [row['id'] for row in page['results']]
+            cursor = page['next_cursor']
+            if cursor is None:
+                return ids
+
+    def test_pages_through_ties(self):
+        full = [row['id'] for row in self.client.get(self.url).json()]
+        self.assertEqual(full, self.ordered_ids())
+        for limit in (1, 2, 3, 4, len(self.POINTS)):
+            self.assertEqual(self.all_pages(limit), full, limit)
+
+    def test_department_pages(self):
+        refresh_department_snapshots()
+        for department in (self.ct, self.ee):
+            expected = self.ordered_ids(department)
+            for limit in (1, 2, 3):
+                self.assertEqual(self.all_pages(limit, department_id=department.id), expected, limit)
+
+    def test_malformed_cursor(self):
+        refresh_department_snapshots()
+        for cursor in ('not a cursor', base64.urlsafe_b64encode(b'high:P01').decode(),
+                       base64.urlsafe_b64encode(b'\xff\xfe').decode()):
+            response = self.client.get(self.url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+            self.assertTrue(response.json()['error'].startswith('Invalid cursor'))
+            response = self.client.get(self.url, {'cursor': cursor, 'department_id': self.ct.id})
+            self.assertEqual(response.status_code, 400, cursor)
+
+    def test_tied_ranks_and_positions(self):
+        # Order: P00 P02 P05 (50), P03 P07 (30), P01 P06 P08 (10), P04 (0)
+        response = self.client.get(reverse('get_leaderboard_rank', args=['P07']), {'window': 3}).json()
+        self.assertEqual((response['rank'], response['position'], response['total']), (4, 5, 9))
+        self.assertEqual(
+            [(entry['id'], entry['rank'], entry['position']) for entry in response['nearby']],
+            [('P02', 1, 2), ('P05', 1, 3), ('P03', 4, 4), ('P07', 4, 5), ('P01', 6, 6), ('P06', 6, 7), ('P08', 6, 8)],
+        )
+        response = self.client.get(reverse('get_leaderboard_rank', args=['P08']), {'window': 1}).json()
+        self.assertEqual((response['rank'], response['position']), (6, 8))
+        self.assertEqual([(entry['rank'], entry['position']) for entry in response['nearby']], [(6, 7), (6, 8), (9, 9)])
+
+    def test_rank_within_department(self):
+        # CT: P00 (50), P02 (50), P06 (10), P08 (10), P04 (0)
+        response = self.client.get(reverse('get_leaderboard_rank', args=['P08']), {'department_id': self.ct.id}).json()
+        self.assertEqual((response['rank'], response['position'], response['total']), (3, 4, 5))
+        self.assertEqual([(entry['id'], entry['rank']) for entry in response['nearby']],
+                         [('P00', 1), ('P02', 1), ('P06', 3), ('P08', 3), ('P04', 5)])
+        self.assertEqual(self.client.get(reverse('get_leaderboard_rank', args=['P07']),
+                                         {'department_id': self.ct.id}).status_code, 404)
+
+
+class LeaderboardEntryMigrationTests(TransactionTestCase):
+    """Migration 0020 builds the entries of existing participants"""
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_entries_backfilled(self):
+        apps = self.migrate([('mentor_mentee', '0019_match_plans')])
+        Participant = apps.get_model('mentor_mentee', 'Participant')
+        fields = {
+            'semester': '5', 'branch': 'CT', 'tech_stack': 'Python', 'areas_of_interest': 'AI',
+            'hackathon_participation': 'None', 'coding_competitions_participate': 'no', 'cgpa': 8, 'sgpa': 8,
+            'internship_experience': 'no',
+        }
+        mentor = Participant.objects.create(registration_no='M01', name='Mentor', mentoring_preferences='mentor', **fields)
+        mentee = Participant.objects.create(registration_no='E01', name='Mentee', mentoring_preferences='mentee', **fields)
+        Participant.objects.create(registration_no='E02', name='Alone', mentoring_preferences='mentee', **fields)
+        apps.get_model('mentor_mentee', 'MentorMenteeRelationship').objects.create(mentor=mentor, mentee=mentee)
+        apps.get_model('mentor_mentee', 'QuizResult').objects.create(
+            participant=mentee, mentor=mentor, quiz_topic='AI', score=4, total_questions=5, percentage=80,
+            status='completed',
+        )
+
+        apps = self.migrate([('mentor_mentee', '0020_leaderboard_entries')])
+        entries = {e.participant_id: e for e in apps.get_model('mentor_mentee', 'LeaderboardEntry').objects.all()}
+        self.assertEqual({r: e.role for r, e in entries.items()}, {'M01': 'mentor', 'E01': 'mentee', 'E02': 'unknown'})
+        self.assertEqual(entries['M01'].mentees_count, 1)
+        self.assertEqual((entries['E01'].mentor_registration_no, entries['E01'].mentor_name), ('M01', 'Mentor'))
+        self.assertEqual((entries['E01'].tasks_completed, entries['E01'].average_score), (1, 80))
+        self.assertEqual((entries['M01'].assigned_quizzes, entries['M01'].average_assigned_score), (1, 80))
+
+
+class BadgeAwardTests(TestCase):
+    """award_point_badges() awards exactly the badges Badge.points_required__lte would, in one insert"""
+
+    def setUp(self):
+        for name, points in (('Rookie', 50), ('Helper', 100), ('Guide', 100), ('Legend', 300)):
+            Badge.objects.create(name=name, description='', points_required=points)
+        self.points = {}
+        for registration_no, points in (('P01', 0), ('P02', 49), ('P03', 50), ('P04', 100), ('P05', 299), ('P06', 1000)):
+            create_participant(registration_no, 'mentee')
+            self.points[registration_no] = points
+        # Already held badges are not awarded again
+        ParticipantBadge.objects.create(participant_id='P06', badge=Badge.objects.get(name='Helper'), is_claimed=True)
+
+    def test_thresholds(self):
+        # Catalog, held badges and one insert
+        with self.assertNumQueries(3):
+            awarded = award_point_badges(self.points)
+        self.assertEqual(awarded, {
+            'P03': ['Rookie'],
+            'P04': ['Rookie', 'Helper', 'Guide'],
+            'P05': ['Rookie', 'Helper', 'Guide'],
+            'P06': ['Rookie', 'Guide', 'Legend'],
+        })
+        for registration_no, points in self.points.items():
+            held = set(ParticipantBadge.objects.filter(participant_id=registration_no).values_list('badge__name', flat=True))
+            eligible = set(Badge.objects.filter(points_required__lte=points).values_list('name', flat=True))
+            self.assertEqual(held, eligible, registration_no)
+        self.assertEqual(award_point_badges(self.points), {})
+
+
+@override_settings(LEADERBOARD_SYNC_CHUNK_SIZE=2)
+class LeaderboardSyncTests(TestCase):
+    """Synced points are validated up front and written in one transaction"""
+
+    def setUp(self):
+        Badge.objects.create(name='Rookie', description='', points_required=50)
+        for i in range(5):
+            create_participant(f'P{i:02}', 'mentee', leaderboard_points=7)
+        self.url = reverse('sync_leaderboard_points')
+
+    def sync(self, leaderboard_data):
+        return self.client.post(self.url, {'leaderboard_data': leaderboard_data}, content_type='application/json')
+
+    def points(self):
+        return dict(Participant.objects.values_list('registration_no', 'leaderboard_points'))
+
+    def test_sync(self):
+        response = self.sync([{'id': f'P{i:02}', 'score': i * 20} for i in range(5)] + [{'id': 'X99', 'score': 5}, {'score': 1}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.points(), {'P00': 0, 'P01': 20, 'P02': 40, 'P03': 60, 'P04': 80})
+        self.assertEqual(response.json()['unknown_ids'], ['X99'])
+        awarded = {p['registration_no']: p.get('newly_awarded_badges') for p in response.json()['updated_participants']}
+        self.assertEqual(awarded['P03'], ['Rookie'])
+        self.assertIsNone(awarded['P02'])
+
+    def test_invalid_entries_write_nothing(self):
+        response = self.sync([{'id': 'P00', 'score': 90}, {'id': 'P01', 'score': 'lots'}, {'id': 'P02', 'score': None}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['invalid_ids'], ['P01', 'P02'])
+        for leaderboard_data in ([], ['P00'], {'id': 'P00', 'score': 1}):
+            self.assertEqual(self.sync(leaderboard_data).status_code, 400, leaderboard_data)
+        self.assertEqual(set(self.points().values()), {7})
+        self.assertFalse(ParticipantBadge.objects.exists())
+
+    def test_failure_rolls_back_every_chunk(self):
+        with mock.patch('mentor_mentee.leaderboard.award_point_badges', side_effect=RuntimeError('boom')):
+            response = self.sync([{'id': f'P{i:02}', 'score': 99} for i in range(5)])
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(set(self.points().values()), {7})
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class DepartmentLeaderboardSnapshotTests(TestCase):
+    """Department boards are served from snapshots recomputed only for departments that changed"""
+
+    def setUp(self):
+        cache.clear()
+        self.ct = Department.objects.create(name='Computer Technology', code='CT')
+        self.ee = Department.objects.create(name='Electrical Engineering', code='EE')
+        create_participant('C01', 'mentor', leaderboard_points=10, department=self.ct)
+        create_participant('C02', 'mentee', leaderboard_points=30, department=self.ct)
+        create_participant('E01', 'mentee', leaderboard_points=20, department=self.ee)
+        refresh_department_snapshots()
+        # The cache version is loaded once; later reads find it in the cache
+        caching.get_version(caching.ACTIVITY_NAMESPACE)
+
+    def board(self, department, **params):
+        return self.client.get(reverse('get_leaderboard'), {'department_id': department.id, **params}).json()
+
+    def test_served_from_snapshot(self):
+        # Only the snapshot is read
+        with self.assertNumQueries(1):
+            rows = self.board(self.ct)
+        self.assertEqual([row['id'] for row in rows], ['C02', 'C01'])
+
+        page = self.board(self.ct, limit=1)
+        self.assertEqual([row['id'] for row in page['results']], ['C02'])
+        page = self.board(self.ct, limit=1, cursor=page['next_cursor'])
+        self.assertEqual([row['id'] for row in page['results']], ['C01'])
+        self.assertIsNone(page['next_cursor'])
+
+    def test_point_change_only_refreshes_its_department(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            adjust_points({'C01': 50})
+        self.assertTrue(DepartmentLeaderboardSnapshot.objects.get(department=self.ct).is_stale)
+        self.assertFalse(DepartmentLeaderboardSnapshot.objects.get(department=self.ee).is_stale)
+
+        self.assertEqual([row['id'] for row in self.board(self.ct)], ['C01', 'C02'])
+        self.assertFalse(DepartmentLeaderboardSnapshot.objects.get(department=self.ct).is_stale)
+        with self.assertNumQueries(1):
+            self.assertEqual([row['id'] for row in self.board(self.ee)], ['E01'])
+
+    def test_unknown_department(self):
+        self.assertEqual(self.client.get(reverse('get_leaderboard'), {'department_id': 999}).status_code, 404)
+
+    def test_only_leaderboard_fields_mark_stale(self):
+        participant = Participant.objects.get(registration_no='C01')
+        participant.mobile_number = '9999999999'
+        participant.save()
+        participant.name = 'Renamed'
+        participant.save(update_fields=['mobile_number'])
+        self.assertFalse(DepartmentLeaderboardSnapshot.objects.get(department=self.ct).is_stale)
+
+        participant.save(update_fields=['name'])
+        self.assertTrue(DepartmentLeaderboardSnapshot.objects.get(department=self.ct).is_stale)
+        refresh_department_snapshots([self.ct.id])
+        participant.department = self.ee
+        participant.save()
+        self.assertTrue(DepartmentLeaderboardSnapshot.objects.get(department=self.ct).is_stale)
+        self.assertTrue(DepartmentLeaderboardSnapshot.objects.get(department=self.ee).is_stale)
+
+    def test_refresh_builds_missing_entries_without_marking_stale(self):
+        LeaderboardEntry.objects.all().delete()
+        self.assertEqual(refresh_department_snapshots(), 2)
+        self.assertEqual(LeaderboardEntry.objects.count(), 3)
+        self.assertFalse(DepartmentLeaderboardSnapshot.objects.filter(computed_version__lt=F('version')).exists())
+
+    def test_rank_within_department(self):
+        url = reverse('get_leaderboard_rank', args=['C02'])
+        response = self.client.get(url, {'department_id': self.ct.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['department_id'], self.ct.id)
+        self.assertEqual([entry['id'] for entry in response.json()['nearby']], ['C02', 'C01'])
+        response = self.client.get(url, {'department_id': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'department_id must be an integer')
+
+
+@mock.patch('account.utils.Util.send_email')
+class ActivityPointsTests(TestCase):
+    """Sessions and quizzes move leaderboard points in the same transaction as the write"""
+
+    QUIZ = [{'question': 'Q1', 'answer': 'A'}, {'question': 'Q2', 'answer': 'B'}, {'question': 'Q3', 'answer': 'C'}]
+
+    def setUp(self):
+        self.mentor = create_participant('M01', 'mentor')
+        self.mentee = create_participant('E01', 'mentee')
+        MentorMenteeRelationship.objects.create(mentor=self.mentor, mentee=self.mentee)
+
+    def points(self):
+        return dict(Participant.objects.values_list('registration_no', 'leaderboard_points'))
+
+    def create_session(self):
+        return self.client.post(reverse('create_session'), {
+            'mentor': 'M01', 'session_type': 'virtual', 'date_time': '2030-01-01T10:00:00Z',
+            'meeting_link': 'https://meet.example.com/abc', 'summary': 'Intro', 'participants': ['E01'],
+        }, content_type='application/json')
+
+    def submit_quiz(self, **data):
+        return self.client.post(reverse('submit_quiz_answers'), {
+            'participant_id': 'E01', 'quiz_answers': {'0': 'A', '1': 'B', '2': 'D'}, **data,
+        }, content_type='application/json')
+
+    def test_session_points(self, send_email):
+        before = self.points()
+        response = self.create_session()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.points()['M01'], before['M01'] + SESSION_CREATED_POINTS)
+        self.assertEqual(self.points()['E01'], before['E01'] + SESSION_ATTENDED_POINTS)
+
+        session_id = response.json()['session']['session_id']
+        self.client.delete(reverse('delete_session', args=[session_id]), content_type='application/json')
+        self.assertEqual(self.points(), before)
+
+    def test_failed_session_points_roll_back_the_session(self, send_email):
+        before = self.points()
+        with mock.patch('mentor_mentee.views.refresh_leaderboard_entries', side_effect=RuntimeError('boom')):
+            self.assertEqual(self.create_session().status_code, 500)
+        self.assertFalse(Session.objects.exists())
+        self.assertEqual(self.points(), before)
+        send_email.assert_not_called()
+
+    def test_quiz_points(self, send_email):
+        before = self.points()
+        quiz = QuizResult.objects.create(
+            participant=self.mentee, mentor=self.mentor, quiz_topic='AI', score=0,
+            total_questions=len(self.QUIZ), percentage=0, quiz_data=self.QUIZ,
+        )
+        self.assertEqual(self.submit_quiz(quiz_id=quiz.id).status_code, 201)
+        # Two correct answers count for the assigner and for the mentee's mentor
+        self.assertEqual(self.points()['M01'], before['M01'] + 2 * 2)
+        self.assertEqual(self.points()['E01'], before['E01'] + 2)
+
+        response = self.client.delete(reverse('delete_quiz', args=[quiz.id]), {
+            'user_id': 'E01', 'user_role': 'mentee',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        # Deleting takes back the completion and the assignment points
+        self.assertEqual(self.points()['M01'], before['M01'] - QUIZ_ASSIGNED_POINTS)
+        self.assertEqual(self.points()['E01'], before['E01'])
+
+    def test_failed_quiz_points_roll_back_the_quiz(self, send_email):
+        before = self.points()
+        with mock.patch('mentor_mentee.views.refresh_leaderboard_entries', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                self.submit_quiz(quiz_topic='AI', quiz_data=self.QUIZ)
+        self.assertFalse(QuizResult.objects.exists())
+        self.assertEqual(self.points(), before)
+
+    def generate_quiz(self):
+        generated = mock.Mock()
+        generated.json.return_value = {'candidates': [{'content': {'parts': [{'text': json.dumps([
+            {'question': 'Q1', 'options': {'A': '1', 'B': '2', 'C': '3', 'D': '4'}, 'answer': 'A', 'explanation': ''},
+        ])}]}}]}
+        with mock.patch('mentor_mentee.views.requests.post', return_value=generated):
+            return self.client.post(reverse('generate_quiz'), {
+                'prompt': 'AI', 'num_questions': 1, 'mentor_id': 'M01',
+            }, content_type='application/json')
+
+    def test_unassigned_quiz_points(self, send_email):
+        before = self.points()
+        self.assertEqual(self.generate_quiz().status_code, 200)
+        self.assertEqual(QuizResult.objects.get().status, 'unassigned')
+        self.assertEqual(self.points()['M01'], before['M01'] + QUIZ_ASSIGNED_POINTS)
+
+    def test_failed_unassigned_quiz_points_roll_back_the_quiz(self, send_email):
+        before = self.points()
+        with mock.patch('mentor_mentee.views.refresh_leaderboard_entries', side_effect=RuntimeError('boom')):
+            self.assertEqual(self.generate_quiz().status_code, 500)
+        self.assertFalse(QuizResult.objects.exists())
+        self.assertEqual(self.points(), before)
+
+    def test_failed_quiz_delete_keeps_quiz_and_points(self, send_email):
+        self.assertEqual(self.submit_quiz(quiz_topic='AI', quiz_data=self.QUIZ).status_code, 201)
+        quiz = QuizResult.objects.get()
+        before = self.points()
+        with mock.patch('mentor_mentee.views.refresh_leaderboard_entries', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                self.client.delete(reverse('delete_quiz', args=[quiz.id]), {
+                    'user_id': 'E01', 'user_role': 'mentee',
+                }, content_type='application/json')
+        self.assertTrue(QuizResult.objects.filter(id=quiz.id).exists())
+        self.assertEqual(self.points(), before)
+
+
+# SQLite serialises writers and fails the parallel requests with "database
+# table is locked" instead of exercising the row locks
+@skipUnlessDBFeature('has_select_for_update')
+@override_settings(CACHES=LOCMEM_CACHE)
+class ConcurrentBadgeClaimTests(TransactionTestCase):
+    """Parallel badge claims must all be counted"""
+
+    def setUp(self):
+        self.participant = create_participant('M01', 'mentor')
+        self.badges = [
+            Badge.objects.create(name=f'Badge {i}', description='', points_required=0) for i in range(8)
+        ]
+        ParticipantBadge.objects.bulk_create(
+            [ParticipantBadge(participant=self.participant, badge=badge) for badge in self.badges]
+        )
+
+    def claim_in_parallel(self, badge_ids):
+        barrier = threading.Barrier(len(badge_ids))
+        statuses = []
+
+        def claim(badge_id):
+            try:
+                barrier.wait()
+                response = self.client_class().post(reverse('claim_badge'), {
+                    'participant_id': 'M01', 'badge_id': badge_id,
+                }, content_type='application/json')
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=claim, args=(badge_id,)) for badge_id in badge_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return statuses
+
+    def test_parallel_claims_are_all_counted(self):
+        statuses = self.claim_in_parallel([badge.id for badge in self.badges])
+
+        self.assertEqual(statuses, [200] * len(self.badges))
+        self.participant.refresh_from_db()
+        self.assertEqual(self.participant.badges_earned, len(self.badges))
+        self.assertTrue(self.participant.is_super_mentor)
+        self.assertEqual(self.participant.leaderboard_points, len(self.badges) * BADGE_POINTS + SUPER_MENTOR_POINTS)
+
+    def test_same_badge_is_claimed_once(self):
+        statuses = self.claim_in_parallel([self.badges[0].id] * 4)
+
+        self.assertEqual(sorted(statuses), [200, 400, 400, 400])
+        self.participant.refresh_from_db()
+        self.assertEqual(self.participant.badges_earned, 1)
+        self.assertEqual(self.participant.leaderboard_points, BADGE_POINTS)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ProofManifestTests(TestCase):
+    """Listing proofs returns metadata and links, never the file contents"""
+
+    def setUp(self):
+        self.participant = create_participant('M01', 'mentor')
+        store_proof(self.participant, 'research', b'%PDF-1.4 paper')
+        self.url = reverse('get_participant_proofs', args=['M01'])
+
+    def test_manifest_links_to_download(self):
+        with self.assertNumQueries(1):
+            proofs = self.client.get(self.url).json()['proofs']
+        self.assertEqual(len(proofs), 1)
+        self.assertEqual(proofs[0]['type'], 'research_publications')
+        self.assertEqual(proofs[0]['content_type'], 'application/pdf')
+        self.assertEqual(proofs[0]['size'], 14)
+        self.assertTrue(proofs[0]['url'].endswith(reverse('view_proof', args=['M01', 'research'])))
+
+    def test_inline_single_proof(self):
+        inline = self.client.get(self.url, {'inline': 'research'}).json()
+        self.assertEqual(inline, {'research_publications': 'JVBERi0xLjQgcGFwZXI='})
+        self.assertEqual(self.client.get(self.url, {'inline': 'coding'}).status_code, 404)
+        self.assertEqual(self.client.get(self.url, {'inline': 'resume'}).status_code, 400)
+
+    def test_archive_keeps_only_academic_proofs(self):
+        academic = store_proof(self.participant, 'academic', b'%PDF-1.4 grades')
+        research_name = self.participant.proof_documents.get(proof_type='research').file.name
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('archive_semester_data'), {}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['details']['participants_reset'], 1)
+        self.assertEqual(list(self.participant.proof_documents.values_list('proof_type', flat=True)), ['academic'])
+        self.assertFalse(academic.file.storage.exists(research_name))
+        self.assertTrue(academic.file.storage.exists(academic.file.name))
+
+
+class ParseRangeTests(SimpleTestCase):
+    """Single byte ranges are resolved against the file size, anything else sends the whole file"""
+
+    def test_ranges(self):
+        self.assertEqual(parse_range('bytes=2-5', 10), (2, 5))
+        self.assertEqual(parse_range('bytes=4-', 10), (4, 9))
+        self.assertEqual(parse_range('bytes=4-99', 10), (4, 9))
+        self.assertEqual(parse_range('bytes=-3', 10), (7, 9))
+        self.assertEqual(parse_range('bytes=-30', 10), (0, 9))
+
+    def test_whole_file(self):
+        for header in (None, '', 'bytes=-', 'bytes=5-2', 'bytes=0-1,4-5', 'items=0-1', 'bytes=a-b'):
+            self.assertIsNone(parse_range(header, 10), header)
+
+    def test_unsatisfiable(self):
+        for header in ('bytes=10-', 'bytes=12-15', 'bytes=-0'):
+            with self.assertRaises(ValueError):
+                parse_range(header, 10)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ProofDownloadTests(TestCase):
+    """Proof downloads answer Range, If-Range and If-None-Match"""
+
+    CONTENT = b'%PDF-1.4 abcdefghijklmnopqrstuvwxyz'
+
+    def setUp(self):
+        participant = create_participant('M01', 'mentor')
+        self.document = store_proof(participant, 'research', self.CONTENT)
+        self.url = reverse('view_proof', args=['M01', 'research'])
+
+    def get(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        # Reading a streamed body to the end closes the file
+        response.body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response
+
+    def test_full_download(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.body, self.CONTENT)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['ETag'], f'"{self.document.sha256}"')
+
+    def test_partial_content(self):
+        response = self.get(Range='bytes=9-12')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.body, b'abcd')
+        self.assertEqual(response['Content-Range'], f'bytes 9-12/{len(self.CONTENT)}')
+        self.assertEqual(response['Content-Length'], '4')
+
+    def test_suffix_range(self):
+        response = self.get(Range='bytes=-3')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.body, b'xyz')
+
+    def test_unsatisfiable_range(self):
+        response = self.get(Range=f'bytes={len(self.CONTENT)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.CONTENT)}')
+
+    def test_not_modified(self):
+        etag = f'"{self.document.sha256}"'
+        response = self.get(**{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_if_range(self):
+        etag = f'"{self.document.sha256}"'
+        matching = self.get(Range='bytes=0-3', **{'If-Range': etag})
+        self.assertEqual(matching.status_code, 206)
+        self.assertEqual(matching.body, b'%PDF')
+        # The client's partial copy is of another version: send the whole file
+        stale = self.get(Range='bytes=0-3', **{'If-Range': '"stale"'})
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(stale.body, self.CONTENT)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ProofUploadTests(TestCase):
+    """Proof uploads are hashed while streaming in, capped at 5 MB and not stored twice"""
+
+    def parse(self, content):
+        request = RequestFactory().post('/', {
+            'name': 'M01', 'proof_of_research_publications': SimpleUploadedFile('paper.pdf', content),
+        })
+        return request, request.FILES.get('proof_of_research_publications')
+
+    def test_upload_is_fingerprinted(self):
+        request, upload = self.parse(b'%PDF-1.4 paper')
+        self.assertEqual(upload.size, 14)
+        self.assertEqual(upload.head, b'%PDF-1.4 paper')
+        self.assertEqual(len(upload.sha256), 64)
+        self.assertFalse(hasattr(request, 'proof_upload_errors'))
+        self.assertEqual(request.POST['name'], 'M01')
+
+    def test_oversized_upload_is_dropped(self):
+        request, upload = self.parse(b'%PDF-' + b'x' * MAX_PROOF_SIZE)
+        self.assertIsNone(upload)
+        self.assertIn('proof_of_research_publications', request.proof_upload_errors)
+        self.assertEqual(request.POST['name'], 'M01')
+
+    def test_identical_reupload_is_not_rewritten(self):
+        participant = create_participant('M01', 'mentor')
+        uploads = [self.parse(b'%PDF-1.4 paper')[1] for _ in range(2)]
+        self.addCleanup(lambda: [upload.close() for upload in uploads])
+        first = store_proof(participant, 'research', uploads[0])
+        with self.assertNumQueries(1):
+            second = store_proof(participant, 'research', uploads[1])
+        self.assertEqual(second.pk, first.pk)
+        self.assertEqual(second.file.name, first.file.name)
+
+    @mock.patch('mentor_mentee.proofs.schedule_thumbnail')
+    def test_changed_file_replaces_previous(self, schedule_thumbnail):
+        participant = create_participant('M01', 'mentor')
+        first = store_proof(participant, 'research', b'%PDF-1.4 draft')
+        first_name = first.file.name
+        with self.captureOnCommitCallbacks(execute=True):
+            second = store_proof(participant, 'research', b'\x89PNG\r\n\x1a\n scan')
+        self.assertEqual(second.pk, first.pk)
+        self.assertEqual(second.content_type, 'image/png')
+        self.assertTrue(second.file.name.endswith('.png'))
+        self.assertFalse(second.file.storage.exists(first_name))
+        with second.file.open('rb') as stored:
+            self.assertEqual(stored.read(), b'\x89PNG\r\n\x1a\n scan')
+        self.assertEqual(schedule_thumbnail.call_count, 2)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ProofDocumentMigrationTests(TransactionTestCase):
+    """Migration 0024 moves proof BLOBs into files and back"""
+
+    before = [('mentor_mentee', '0023_department_leaderboard_snapshots')]
+    after = [('mentor_mentee', '0024_proof_documents')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_blobs_move_to_files_and_back(self):
+        apps = self.migrate(self.before)
+        fields = {
+            'semester': '5', 'branch': 'CT', 'mentoring_preferences': 'mentee', 'tech_stack': 'Python',
+            'areas_of_interest': 'AI', 'hackathon_participation': 'None', 'coding_competitions_participate': 'no',
+            'cgpa': 8, 'sgpa': 8, 'internship_experience': 'no',
+        }
+        Participant = apps.get_model('mentor_mentee', 'Participant')
+        Participant.objects.create(registration_no='P01', name='P01', proof_of_research_publications=b'%PDF-1.4 paper',
+                                   proof_of_internships=b'letter', **fields)
+        Participant.objects.create(registration_no='P02', name='P02', proof_of_hackathon_participation=b'', **fields)
+
+        apps = self.migrate(self.after)
+        ProofDocument = apps.get_model('mentor_mentee', 'ProofDocument')
+        documents = {d.proof_type: d for d in ProofDocument.objects.filter(participant_id='P01')}
+        self.assertEqual(set(documents), {'research', 'internship'})
+        self.assertFalse(ProofDocument.objects.filter(participant_id='P02').exists())
+        research = documents['research']
+        self.assertEqual(research.content_type, 'application/pdf')
+        self.assertEqual(research.size, 14)
+        self.assertEqual(research.sha256, hashlib.sha256(b'%PDF-1.4 paper').hexdigest())
+        self.assertTrue(research.file.name.endswith('.pdf'))
+        with research.file.open('rb') as stored:
+            self.assertEqual(stored.read(), b'%PDF-1.4 paper')
+        self.assertEqual(documents['internship'].content_type, 'application/octet-stream')
+
+        apps = self.migrate(self.before)
+        restored = apps.get_model('mentor_mentee', 'Participant').objects.get(registration_no='P01')
+        self.assertEqual(bytes(restored.proof_of_research_publications), b'%PDF-1.4 paper')
+        self.assertEqual(bytes(restored.proof_of_internships), b'letter')
+
+
+class ProofThumbnailTests(TestCase):
+    """Approval queue thumbnails are rendered once per file hash and served in one batch"""
+
+    def setUp(self):
+        media = override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+        media.enable()
+        self.addCleanup(media.disable)
+        image = io.BytesIO()
+        Image.new('RGB', (1200, 600), 'red').save(image, format='PNG')
+        self.photo = store_proof(create_participant('P01', 'mentee', approval_status='pending'), 'hackathon', image.getvalue())
+        self.paper = store_proof(create_participant('P02', 'mentee', approval_status='pending'), 'research', b'%PDF-1.4 paper')
+        create_participant('A01', 'mentee')
+        self.url = reverse('pending_proof_thumbnails')
+
+    def render(self, document):
+        return ensure_thumbnail(document.file.name, document.sha256, document.content_type)
+
+    def test_rendered_once_per_hash(self):
+        self.assertTrue(self.render(self.photo))
+        self.assertFalse(self.render(self.photo))
+        self.assertTrue(self.render(self.paper))
+
+    def test_batch_endpoint(self):
+        self.render(self.photo)
+        with self.assertNumQueries(2):
+            results = self.client.get(self.url).json()['results']
+        self.assertEqual([r['registration_no'] for r in results], ['P01', 'P02'])
+
+        photo = results[0]['proofs'][0]
+        self.assertEqual(photo['status'], 'ready')
+        with Image.open(io.BytesIO(base64.b64decode(photo['thumbnail']))) as thumbnail:
+            self.assertEqual(thumbnail.size, (THUMBNAIL_SIZE[0], THUMBNAIL_SIZE[0] // 2))
+        self.assertEqual(results[1]['proofs'][0]['status'], 'pending')
+
+        page = self.client.get(self.url, {'registration_nos': 'P02,A01'}).json()
+        self.assertEqual([r['registration_no'] for r in page['results']], ['P02'])
+
+    def test_paging(self):
+        page = self.client.get(self.url, {'limit': 1, 'offset': 1}).json()
+        self.assertEqual([r['registration_no'] for r in page['results']], ['P02'])
+        for params in ({'limit': -1}, {'offset': -1}, {'limit': 'ten'}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400, params)
+
+    def test_background_render_failure_is_logged(self):
+        with mock.patch('mentor_mentee.thumbnails.ensure_thumbnail', side_effect=OSError('disk full')):
+            with self.assertLogs('mentor_mentee.thumbnails', 'ERROR') as logs:
+                _ensure_in_background(self.photo.file.name, self.photo.sha256, self.photo.content_type)
+        self.assertIn(self.photo.file.name, logs.output[0])
@@ -0,0 +1,163 @@
+"""
+Proof thumbnails for the approval queue.
+
+A small PNG is rendered for every proof document and kept by the default
+storage under thumbnails/, named after the proof's SHA-256. Identical files
+share one thumbnail and a re-upload of the same file needs no new render.
+
+Rendering never happens on the request path: store_proof schedules it on a
+background worker once the upload is committed, and the
+generate_proof_thumbnails command backfills whatever is missing. Images are
+scaled with Pillow. The first page of a PDF is rasterised with poppler's
+pdftoppm when it is installed; Pillow cannot read PDFs, so without it (and
+for other file types) a labelled placeholder card is drawn instead.
+"""
+import io
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+THUMBNAIL_SIZE = (240, 240)
+THUMBNAIL_DIR = 'thumbnails'
+PLACEHOLDER_BACKGROUND = (236, 239, 243)
+PLACEHOLDER_FOREGROUND = (90, 98, 110)
+PDFTOPPM_TIMEOUT = 20
+
+logger = logging.getLogger(__name__)
+
+# One worker is enough: renders are small and uploads arrive one form at a time
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='proof-thumbnails')
+
+
+def thumbnail_name(sha256):
+    """Storage name of the thumbnail of a file with this hash."""
+    return f'{THUMBNAIL_DIR}/{sha256[:2]}/{sha256}.png'
+
+
+def _placeholder(label):
+    """Grey card with a short label, for files that cannot be previewed."""
+    image = Image.new('RGB', THUMBNAIL_SIZE, PLACEHOLDER_BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle([8, 8, THUMBNAIL_SIZE[0] - 9, THUMBNAIL_SIZE[1] - 9], outline=PLACEHOLDER_FOREGROUND, width=2)
+    font = ImageFont.load_default(size=36)
+    draw.text((THUMBNAIL_SIZE[0] / 2, THUMBNAIL_SIZE[1] / 2), label, fill=PLACEHOLDER_FOREGROUND, font=font, anchor='mm')
+    return image
+
+
+def _image_thumbnail(source):
+    image = Image.open(source)
+    # Let JPEG decode at a reduced scale instead of full resolution
+    image.draft('RGB', THUMBNAIL_SIZE)
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+    image.thumbnail(THUMBNAIL_SIZE)
+    return image
+
+
+def _pdf_thumbnail(source):
+    """First page of a PDF via pdftoppm, or None when it is unavailable or fails."""
+    pdftoppm = shutil.which('pdftoppm')
+    if not pdftoppm:
+        return None
+    with tempfile.TemporaryDirectory() as workdir:
+        pdf_path = os.path.join(workdir, 'proof.pdf')
+        with open(pdf_path, 'wb') as pdf:
+            shutil.copyfileobj(source, pdf)
+        try:
+            subprocess.run(
+                [pdftoppm, '-png', '-singlefile', '-f', '1', '-l', '1',
+                 '-scale-to', str(max(THUMBNAIL_SIZE)), pdf_path, os.path.join(workdir, 'page')],
+                check=True, capture_output=True, timeout=PDFTOPPM_TIMEOUT,
+            )
+            with Image.open(os.path.join(workdir, 'page.png')) as page:
+                page.load()
+                page.thumbnail(THUMBNAIL_SIZE)
+                return page.copy()
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+
+def render_thumbnail(source, content_type):
+    """PNG bytes of a thumbnail for a proof file opened for reading."""
+    image = None
+    if content_type.startswith('image/'):
+        try:
+            image = _image_thumbnail(source)
+        except (OSError, Image.DecompressionBombError):
+            image = None
+    elif content_type == 'application/pdf':
+        image = _pdf_thumbnail(source)
+
+    if image is None:
+        if content_type == 'application/octet-stream':
+            label = 'FILE'
+        else:
+            label = content_type.split('/')[-1][:4].upper()
+        image = _placeholder(label)
+
+    output = io.BytesIO()
+    image.save(output, format='PNG', optimize=True)
+    return output.getvalue()
+
+
+def ensure_thumbnail(file_name, sha256, content_type):
+    """
+    Render and store the thumbnail of a stored proof file unless one for its
+    hash exists already. Returns True when a thumbnail was written.
+    """
+    name = thumbnail_name(sha256)
+    if default_storage.exists(name):
+        return False
+    with default_storage.open(file_name, 'rb') as source:
+        png = render_thumbnail(source, content_type)
+    # A concurrent render of the same hash may have won; its file is identical
+    if not default_storage.exists(name):
+        default_storage.save(name, ContentFile(png))
+    return True
+
+
+def _ensure_in_background(file_name, sha256, content_type):
+    try:
+        ensure_thumbnail(file_name, sha256, content_type)
+    except Exception:
+        # The backfill command will pick it up later
+        logger.exception("Error rendering thumbnail for %s", file_name)
+
+
+def schedule_thumbnail(document):
+    """Render the document's thumbnail on the background worker after commit."""
+    args = (document.file.name, document.sha256, document.content_type)
+    transaction.on_commit(lambda: _executor.submit(_ensure_in_background, *args))
+
+
+def read_thumbnail(sha256):
+    """Stored thumbnail PNG bytes for a hash, or None if not rendered yet."""
+    try:
+        with default_storage.open(thumbnail_name(sha256), 'rb') as thumbnail:
+            return thumbnail.read()
+    except FileNotFoundError:
+        return None
+
+
+def prune_thumbnails(referenced_hashes):
+    """Delete stored thumbnails whose hash no proof document references any more."""
+    removed = 0
+    try:
+        prefixes = default_storage.listdir(THUMBNAIL_DIR)[0]
+    except FileNotFoundError:
+        return 0
+    for prefix in prefixes:
+        for file_name in default_storage.listdir(f'{THUMBNAIL_DIR}/{prefix}')[1]:
+            if os.path.splitext(file_name)[0] not in referenced_hashes:
+                default_storage.delete(f'{THUMBNAIL_DIR}/{prefix}/{file_name}')
+                removed += 1
+    return removed
@@ -16,6 +16,7 @@ urlpatterns = [
     # Admin approval endpoints
     path('admin/approvals/update/', views.update_participant_approval, name='update_participant_approval'),
     path('admin/approvals/pending/', views.list_pending_approvals, name='list_pending_approvals'),
+    path('admin/approvals/pending/thumbnails/', views.pending_proof_thumbnails, name='pending_proof_thumbnails'),
     path('participants/approval-status/<str:registration_no>/', views.get_approval_status, name='get_approval_status'),
     
     # Profile status management
@@ -35,11 +36,14 @@ urlpatterns = [
     
     # Leaderboard endpoints
     path('leaderboard/', views.get_leaderboard, name='get_leaderboard'),
+    path('leaderboard/rank/<str:registration_no>/', views.get_leaderboard_rank, name='get_leaderboard_rank'),
     path('leaderboard/calculate/', views.calculate_leaderboard_points, name='calculate_leaderboard_points'),
     path('leaderboard/sync/', views.sync_leaderboard_points, name='sync_leaderboard_points'),
     
     # Mentor-mentee matching and relationship management
     path('match/', views.match_participants, name='match_participants'),
+    path('match/incremental/', views.match_participant_incremental, name='match_participant_incremental'),
+    path('match/plans/<uuid:plan_id>/commit/', views.commit_match_plan, name='commit_match_plan'),
     path('delete_all/', views.delete_all_participants, name='delete_all_participants'),
     path('profile/<str:registration_no>/', views.get_participant_profile, name='get_participant_profile'),
     path('unmatched/', views.list_unmatched_participants, name='list_unmatched_participants'),
@@ -1,10 +1,24 @@
 import requests
 import json
+import logging
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from .models import Participant, MentorMenteeRelationship, Session, QuizResult, Badge, ParticipantBadge, Department, FeedbackSettings, MentorFeedback, ApplicationFeedback, ParticipantHistory
+from .models import Participant, MentorMenteeRelationship, MatchPlan, DepartmentLeaderboardSnapshot, Session, QuizResult, Badge, ParticipantBadge, Department, FeedbackSettings, MentorFeedback, ApplicationFeedback, ParticipantHistory, ProofDocument
 from .serializers import ParticipantSerializer, SessionSerializer, MentorInfoSerializer, MenteeInfoSerializer, QuizResultSerializer, BadgeSerializer, ParticipantBadgeSerializer, FeedbackSettingsSerializer, MentorFeedbackSerializer, ApplicationFeedbackSerializer, ProfileSerializer, ParticipantListSerializer
+from .matching import match_mentors_mentees, match_by_department, load_match_records, MAX_MENTEES_PER_MENTOR, MATCHING_STRATEGIES
+from .incremental_matching import incremental_match
+from .match_plans import matching_fingerprint, create_match_plan
+from .relationships import assign_to_existing_mentors, changing_relationships, save_matches
+from .leaderboard import (
+    adjust_points, attach_missing_entries, award_point_badges, change_claimed_badges, department_snapshot,
+    leaderboard_page, leaderboard_participants, leaderboard_row, quiz_completion_deltas, quiz_deltas,
+    rank_with_neighbours, recalculate_leaderboard, refresh_leaderboard_entries, search_filter, session_deltas,
+    snapshot_page, sync_points,
+)
+from .caching import ACTIVITY_NAMESPACE, MENTOR_FEATURES_NAMESPACE, bump_version_on_commit, versioned_response
+from .proofs import delete_proofs, proof_response, store_proof
+from .thumbnails import read_thumbnail, schedule_thumbnail
 from collections import defaultdict
 from itertools import cycle
 from django.db import transaction
@@ -15,16 +29,48 @@ import datetime
 from django.db import models
 from account.models import Student  # Import Student model for email lookup
 from django.utils import timezone
-from django.http import HttpResponse, Http404
+from django.http import Http404
+from django.urls import reverse
 import base64
 from datetime import timedelta
 from django.db.models.functions import TruncDate
 from django.db.models import Count, Q, Avg
+from django.conf import settings
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "YOUR_GEMINI_API_KEY")  # Use .env or fallback
 
+def get_admin_department(user):
+    """Department a department admin is limited to, None for everyone else"""
+    if hasattr(user, 'is_department_admin') and user.is_department_admin and user.department:
+        return user.department
+    return None
+
+def run_auto_matching(request, participants, response_data, exclude=()):
+    """
+    Optional hook (settings.MATCHING_AUTO_INCREMENTAL) placing participants
+    incrementally after approval/capacity changes. The new matches go into
+    response_data['auto_matches']; a participant whose placement failed stays
+    unmatched and is listed in response_data['auto_matching_errors'].
+    Does nothing when disabled.
+    """
+    if not getattr(settings, 'MATCHING_AUTO_INCREMENTAL', False):
+        return
+    auto_matches = response_data.setdefault('auto_matches', [])
+    department = get_admin_department(request.user)
+    for participant in participants:
+        try:
+            auto_matches += incremental_match(participant, department, exclude=exclude)
+        except Exception as e:
+            logger.exception("Automatic matching failed for %s", participant.registration_no)
+            response_data.setdefault('auto_matching_errors', []).append({
+                'registration_no': participant.registration_no,
+                'details': str(e)
+            })
+
 # Helper function to get email from registration number
 def get_email_by_registration_no(registration_no):
     """Get a student's email by their registration number"""
@@ -57,6 +103,11 @@ def create_participant(request):
         for field_name, field_value in request.data.items():
             if hasattr(field_value, 'read') and callable(field_value.read):
                 files[field_name] = field_value
+        
+        # Proofs over the size limit were dropped while the upload streamed in
+        upload_errors = getattr(request, 'proof_upload_errors', None)
+        if upload_errors:
+            return Response(upload_errors, status=status.HTTP_400_BAD_REQUEST)
                 
         # Create a mutable copy of request data without file objects
         data = {}
@@ -94,22 +145,11 @@ def create_participant(request):
         if serializer.is_valid():
             participant = serializer.save()
             
-            # Handle file uploads
+            # Handle file uploads: each proof is stored as a ProofDocument
             for field_name, file_obj in files.items():
-                if field_name == 'proof_of_research_publications':
-                    participant.proof_of_research_publications = file_obj.read()
-                elif field_name == 'proof_of_hackathon_participation':
-                    participant.proof_of_hackathon_participation = file_obj.read()
-                elif field_name == 'proof_of_coding_competitions':
-                    participant.proof_of_coding_competitions = file_obj.read()
-                elif field_name == 'proof_of_academic_performance':
-                    participant.proof_of_academic_performance = file_obj.read()
-                elif field_name == 'proof_of_internships':
-                    participant.proof_of_internships = file_obj.read()
-                elif field_name == 'proof_of_extracurricular_activities':
-                    participant.proof_of_extracurricular_activities = file_obj.read()
+                if field_name in ProofDocument.UPLOAD_FIELDS:
+                    store_proof(participant, ProofDocument.UPLOAD_FIELDS[field_name], file_obj)
             
-            participant.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -441,253 +481,22 @@ def evaluate_student(student):
     
     return score
 
-def has_common_interests(mentor, mentee):
-    """
-    Check if mentor and mentee share common tech stack or areas of interest.
-    Takes into account interest priorities of both mentor and mentee.
-    Returns tuple of (common_tech, common_interests, preference_score)
-    """
-    # Handle possible nan or empty values
-    mentor_tech = mentor.get('tech_stack', '').split(',') if mentor.get('tech_stack') else []
-    mentee_tech = mentee.get('tech_stack', '').split(',') if mentee.get('tech_stack') else []
-    mentor_interest = mentor.get('areas_of_interest', '').split(',') if mentor.get('areas_of_interest') else []
-    mentee_interest = mentee.get('areas_of_interest', '').split(',') if mentee.get('areas_of_interest') else []
-    
-    # Clean up the lists - strip whitespace and remove empty strings
-    mentor_tech = [tech.strip() for tech in mentor_tech if tech.strip()]
-    mentee_tech = [tech.strip() for tech in mentee_tech if tech.strip()]
-    mentor_interests = [interest.strip() for interest in mentor_interest if interest.strip()]
-    mentee_interests = [interest.strip() for interest in mentee_interest if interest.strip()]
-    
-    # Get prioritized interests
-    mentor_pref1 = mentor.get('interest_preference1', '').strip()
-    mentor_pref2 = mentor.get('interest_preference2', '').strip()
-    mentor_pref3 = mentor.get('interest_preference3', '').strip()
-    mentee_pref1 = mentee.get('interest_preference1', '').strip()
-    mentee_pref2 = mentee.get('interest_preference2', '').strip()
-    mentee_pref3 = mentee.get('interest_preference3', '').strip()
-    
-    # Find common tech stack and interests
-    common_tech = []
-    for m_tech in mentor_tech:
-        for s_tech in mentee_tech:
-            if m_tech.lower() in s_tech.lower() or s_tech.lower() in m_tech.lower():
-                common_tech.append((m_tech, s_tech))
-    
-    common_interests = []
-    for m_int in mentor_interests:
-        for s_int in mentee_interests:
-            if m_int.lower() in s_int.lower() or s_int.lower() in m_int.lower():
-                common_interests.append((m_int, s_int))
-    
-    # Calculate preference match score (higher is better)
-    preference_score = 0
-    
-    # Check if mentor's preferences match mentee's interests/tech
-    if mentor_pref1:
-        if any(mentor_pref1.lower() in interest.lower() for interest in mentee_interests) or \
-           any(mentor_pref1.lower() in tech.lower() for tech in mentee_tech):
-            preference_score += 10  # Highest priority match
-    if mentor_pref2:
-        if any(mentor_pref2.lower() in interest.lower() for interest in mentee_interests) or \
-           any(mentor_pref2.lower() in tech.lower() for tech in mentee_tech):
-            preference_score += 6   # Medium priority match
-    if mentor_pref3:
-        if any(mentor_pref3.lower() in interest.lower() for interest in mentee_interests) or \
-           any(mentor_pref3.lower() in tech.lower() for tech in mentee_tech):
-            preference_score += 3   # Lower priority match
-    
-    # Check if mentee's preferences match mentor's interests/tech
-    if mentee_pref1:
-        if any(mentee_pref1.lower() in interest.lower() for interest in mentor_interests) or \
-           any(mentee_pref1.lower() in tech.lower() for tech in mentor_tech):
-            preference_score += 10  # Highest priority match
-    if mentee_pref2:
-        if any(mentee_pref2.lower() in interest.lower() for interest in mentor_interests) or \
-           any(mentee_pref2.lower() in tech.lower() for tech in mentor_tech):
-            preference_score += 6   # Medium priority match
-    if mentee_pref3:
-        if any(mentee_pref3.lower() in interest.lower() for interest in mentor_interests) or \
-           any(mentee_pref3.lower() in tech.lower() for tech in mentor_tech):
-            preference_score += 3   # Lower priority match
-    
-    return common_tech, common_interests, preference_score
-
-def calculate_match_quality(mentor, mentee):
-    """Calculate the match quality score between a mentor and mentee"""
-    quality_score = 0
-    
-    # Consider mentor's historical performance
-    if mentor.get('historical_data'):
-        mentor_history = mentor['historical_data']
-        if mentor_history['was_mentor'] and mentor_history['mentor_rating']:
-            quality_score += min(mentor_history['mentor_rating'] / 2, 2)  # Max 2 points for good rating
-        if mentor_history['sessions_conducted'] > 0:
-            quality_score += min(mentor_history['sessions_conducted'] / 5, 1)  # Max 1 point for session experience
-    
-    # Consider mentee's historical performance
-    if mentee.get('historical_data'):
-        mentee_history = mentee['historical_data']
-        if mentee_history['was_mentee'] and mentee_history['mentee_rating']:
-            quality_score += min(mentee_history['mentee_rating'] / 2, 2)  # Max 2 points for good rating
-        if mentee_history['sessions_attended'] > 0:
-            quality_score += min(mentee_history['sessions_attended'] / 5, 1)  # Max 1 point for session attendance
-    
-    # Consider badges and super mentor status
-    if mentor.get('badges_earned'):
-        badge_count = int(mentor['badges_earned'])
-        quality_score += min(badge_count * 0.5, 2)  # Max 2 points for badges
-    
-    if mentor.get('is_super_mentor'):
-        quality_score += 2  # Bonus points for super mentors
-    
-    return quality_score
-
-def match_mentors_mentees(students):
-    """Match mentors and mentees based on various criteria"""
-    # Separate mentors and mentees
-    mentors = [s for s in students if s['mentoring_preferences'] == 'mentor']
-    mentees = [s for s in students if s['mentoring_preferences'] == 'mentee']
-    
-    # If no mentors or mentees, return empty matches
-    if not mentors or not mentees:
-        return {
-            "matches": [],
-            "unmatched_mentees": mentees,
-            "unmatched_mentors": mentors,
-            "statistics": {
-                "total_participants": len(students),
-                "total_mentors": len(mentors),
-                "total_mentees": len(mentees),
-                "matches_made": 0
-            }
-        }
-    
-    # Get historical data for all participants
-    registration_nos = [s['registration_no'] for s in students]
-    historical_data = {
-        h.registration_no: h for h in ParticipantHistory.objects.filter(
-            registration_no__in=registration_nos
-        )
-    }
-    
-    # Add historical data to student profiles
-    for student in students:
-        reg_no = student['registration_no']
-        if reg_no in historical_data:
-            history = historical_data[reg_no]
-            student['historical_data'] = {
-                'total_badges': history.total_badges_earned,
-                'total_points': history.total_leaderboard_points,
-                'quizzes_completed': history.total_quizzes_completed,
-                'average_quiz_score': history.average_quiz_score,
-                'was_mentor': history.was_mentor,
-                'was_mentee': history.was_mentee,
-                'mentor_rating': history.mentor_rating,
-                'mentee_rating': history.mentee_rating,
-                'sessions_attended': history.sessions_attended,
-                'sessions_conducted': history.sessions_conducted
-            }
-        else:
-            student['historical_data'] = None
-    
-    # Dictionary to track how many mentees each mentor has
-    mentor_mentee_count = {mentor['registration_no']: 0 for mentor in mentors}
-    MAX_MENTEES_PER_MENTOR = 4
-    
-    # List to store all matches
-    matches = []
-    unmatched_mentees = []
-    
-    # For each mentee, find the best matching mentor
-    for mentee in mentees:
-        best_match = None
-        best_score = -1
-        best_common_tech = []
-        best_common_interests = []
-        best_preference_score = 0
-        
-        for mentor in mentors:
-            # Skip if mentor already has max mentees
-            if mentor_mentee_count[mentor['registration_no']] >= MAX_MENTEES_PER_MENTOR:
-                continue
-                
-            # Skip if mentor and mentee are the same person
-            if mentor['registration_no'] == mentee['registration_no']:
-                continue
-                
-            # Check if they have common interests and calculate match quality
-            common_tech, common_interests, preference_score = has_common_interests(mentor, mentee)
-            
-            # Calculate overall match quality
-            match_quality = calculate_match_quality(mentor, mentee)
-            
-            # Add bonus for common interests
-            if common_tech or common_interests:
-                match_quality += len(common_tech) + len(common_interests)
-            
-            # Add preference score
-            match_quality += preference_score
-            
-            # If this is the best match so far, store it
-            if match_quality > best_score:
-                best_score = match_quality
-                best_match = mentor
-                best_common_tech = common_tech
-                best_common_interests = common_interests
-                best_preference_score = preference_score
-        
-        # If we found a match, add it to our matches list
-        if best_match and best_score > 0:
-            matches.append({
-                "mentor": {
-                    "name": best_match['name'],
-                    "registration_no": best_match['registration_no'],
-                    "semester": best_match['semester'],
-                    "branch": best_match['branch'],
-                    "tech_stack": best_match['tech_stack'],
-                    "department_id": best_match.get('department_id')
-                },
-                "mentee": {
-                    "name": mentee['name'],
-                    "registration_no": mentee['registration_no'],
-                    "semester": mentee['semester'],
-                    "branch": mentee['branch'],
-                    "tech_stack": mentee['tech_stack'],
-                    "department_id": mentee.get('department_id')
-                },
-                "match_quality": best_score,
-                "common_tech": best_common_tech,
-                "common_interests": best_common_interests,
-                "preference_score": best_preference_score
-            })
-            mentor_mentee_count[best_match['registration_no']] += 1
-        else:
-            unmatched_mentees.append(mentee)
-    
-    # Get list of mentors who still have capacity
-    available_mentors = [
-        mentor for mentor in mentors 
-        if mentor_mentee_count[mentor['registration_no']] < MAX_MENTEES_PER_MENTOR
-    ]
-    
-    return {
-        "matches": matches,
-        "unmatched_mentees": unmatched_mentees,
-        "unmatched_mentors": available_mentors,
-        "statistics": {
-            "total_participants": len(students),
-            "total_mentors": len(mentors),
-            "total_mentees": len(mentees),
-            "matches_made": len(matches),
-            "mentees_unmatched": len(unmatched_mentees),
-            "mentors_with_capacity": len(available_mentors)
-        }
-    }
-
 @api_view(['GET'])
 def match_participants(request):
     """Endpoint to trigger mentor-mentee matching for new/unmatched participants only."""
+    # Matching strategy: 'greedy' (default) or 'optimal'
+    strategy = request.query_params.get('strategy', 'greedy')
+    if strategy not in MATCHING_STRATEGIES:
+        return Response({
+            "error": "Invalid matching strategy",
+            "message": f"strategy must be one of: {', '.join(MATCHING_STRATEGIES)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    # sharded=true matches each department separately, in parallel worker processes
+    sharded = request.query_params.get('sharded', 'false').lower() == 'true'
+    # plan=true computes the matches and stores them as a plan without saving relationships
+    plan_mode = request.query_params.get('plan', 'false').lower() == 'true'
+
     # Get the requesting user for department filtering
     user = request.user
     department_filter = None
@@ -744,8 +553,11 @@ def match_participants(request):
         # Get all APPROVED participants
         participants = Participant.objects.filter(approval_status='approved', status='active')
     
-    serializer = ParticipantSerializer(participants, many=True)
-    students = serializer.data
+    # Snapshot of the matching inputs, taken before they are read
+    fingerprint = matching_fingerprint(department_filter) if plan_mode else None
+    
+    # Only the columns the matcher reads, no per-participant serializer queries
+    students = load_match_records(participants)
     
     if not students:
         return Response({
@@ -756,20 +568,12 @@ def match_participants(request):
     # Get participants who are already in relationships
     if department_filter:
         # For department admin, only consider relationships in their department
-        department_participants = Participant.objects.filter(department=department_filter)
-        participant_ids = [p.registration_no for p in department_participants]
-        
-        mentors_in_relationships = MentorMenteeRelationship.objects.filter(
-            mentor__registration_no__in=participant_ids
-        ).values_list('mentor__registration_no', flat=True).distinct()
-        
-        mentees_in_relationships = MentorMenteeRelationship.objects.filter(
-            mentee__registration_no__in=participant_ids
-        ).values_list('mentee__registration_no', flat=True).distinct()
+        scope = Participant.objects.filter(department=department_filter)
     else:
         # For regular admin, consider all relationships
-        mentors_in_relationships = MentorMenteeRelationship.objects.values_list('mentor__registration_no', flat=True).distinct()
-        mentees_in_relationships = MentorMenteeRelationship.objects.values_list('mentee__registration_no', flat=True).distinct()
+        scope = Participant.objects.all()
+    mentors_in_relationships = list(scope.filter(mentee_count__gt=0).values_list('registration_no', flat=True))
+    mentees_in_relationships = list(scope.filter(current_mentor__isnull=False).values_list('registration_no', flat=True))
     
     # Identify participants who already have relationships
     matched_reg_nos = set(mentors_in_relationships) | set(mentees_in_relationships)
@@ -791,164 +595,69 @@ def match_participants(request):
         # Additional check to ensure we're only matching within the same department
         for student in unmatched_students:
             student['department_id'] = department_filter.id
+        sharded = False
     
-    matches = match_mentors_mentees(unmatched_students)
+    if sharded:
+        matches = match_by_department(
+            unmatched_students,
+            strategy=strategy,
+            max_workers=getattr(settings, 'MATCHING_SHARD_WORKERS', None)
+        )
+    else:
+        matches = match_mentors_mentees(unmatched_students, strategy=strategy)
     
     # Check if there was an error in matching
     if isinstance(matches, dict) and 'error' in matches:
         return Response(matches, status=status.HTTP_400_BAD_REQUEST)
     
-    # Save relationships to database
+    # Save relationships to database (or store them as a plan)
     try:
-        with transaction.atomic():
-            # Special case: If we have unmatched mentees but no new mentors,
-            # try to match them with existing mentors in the database
-            if 'unmatched_mentees' in matches and matches['unmatched_mentees']:
-                unmatched_mentees = matches['unmatched_mentees']
-                
-                # Get existing mentors who might be able to take on more mentees
-                if department_filter:
-                    # Only get mentors from this department
-                    existing_mentors_qs = Participant.objects.filter(
-                        registration_no__in=mentors_in_relationships,
-                        department=department_filter
-                    )
-                else:
-                    # Get all existing mentors
-                    existing_mentors_qs = Participant.objects.filter(
-                        registration_no__in=mentors_in_relationships
-                    )
-                
-                existing_mentors = []
-                for mentor in existing_mentors_qs:
-                    # Count how many mentees this mentor already has
-                    mentee_count = MentorMenteeRelationship.objects.filter(
-                        mentor__registration_no=mentor.registration_no
-                    ).count()
-                    
-                    # If they have capacity for more mentees, add them to our list
-                    if mentee_count < 4:  # MAX_MENTEES_PER_MENTOR
-                        existing_mentors.append({
-                            'registration_no': mentor.registration_no,
-                            'name': mentor.name,
-                            'branch': mentor.branch,
-                            'semester': mentor.semester,
-                            'tech_stack': mentor.tech_stack,
-                            'current_mentee_count': mentee_count,
-                            'department_id': mentor.department.id if mentor.department else None
-                        })
-                
-                # If we have existing mentors with capacity, assign the unmatched mentees
-                if existing_mentors:
-                    # Sort mentors by current mentee count (ascending)
-                    existing_mentors.sort(key=lambda m: m['current_mentee_count'])
-                    
-                    # Create matches for unmatched mentees
-                    for mentee_data in unmatched_mentees:
-                        # Filter mentors by department if department_filter is active
-                        if department_filter:
-                            available_mentors = [
-                                m for m in existing_mentors 
-                                if m['department_id'] == department_filter.id
-                            ]
-                        else:
-                            available_mentors = existing_mentors
-                            
-                        if not available_mentors:
-                            continue
-                            
-                        # Get the mentor with the fewest mentees
-                        mentor_data = available_mentors[0]
-                        
-                        # Create the relationship
-                        mentor = Participant.objects.get(registration_no=mentor_data['registration_no'])
-                        mentee = Participant.objects.get(registration_no=mentee_data['registration_no'])
-                        
-                        # Skip if they're from different departments and department_filter is active
-                        if (department_filter and 
-                            ((mentor.department and mentor.department.id != department_filter.id) or
-                             (mentee.department and mentee.department.id != department_filter.id))):
-                            continue
-                        
-                        MentorMenteeRelationship.objects.create(
-                            mentor=mentor,
-                            mentee=mentee,
-                            manually_created=False
-                        )
-                        
-                        # Update the mentor's mentee count
-                        mentor_data['current_mentee_count'] += 1
-                        
-                        # Re-sort the mentors list
-                        existing_mentors.sort(key=lambda m: m['current_mentee_count'])
-                        
-                        # Add to matches for response
-                        matches['matches'].append({
-                            "mentor": {
-                                "name": mentor_data['name'],
-                                "registration_no": mentor_data['registration_no'],
-                                "semester": mentor_data['semester'],
-                                "branch": mentor_data['branch'],
-                                "tech_stack": mentor_data['tech_stack'],
-                                "department_id": mentor_data['department_id']
-                            },
-                            "mentee": {
-                                "name": mentee_data['name'],
-                                "registration_no": mentee_data['registration_no'],
-                                "semester": mentee_data['semester'],
-                                "branch": mentee_data['branch'],
-                                "tech_stack": mentee_data['tech_stack'],
-                                "department_id": mentee_data.get('department_id')
-                            },
-                            "match_quality": "assigned-to-existing",
-                            "common_tech": [],
-                            "common_interests": [],
-                            "preference_score": 0
-                        })
-            
-            # Create new relationships from the algorithm
-            for match in matches['matches']:
-                mentor_reg_no = match['mentor']['registration_no']
-                mentee_reg_no = match['mentee']['registration_no']
-                
-                # Skip if a relationship already exists
-                if MentorMenteeRelationship.objects.filter(
-                    mentor__registration_no=mentor_reg_no, 
-                    mentee__registration_no=mentee_reg_no
-                ).exists():
-                    continue
-                
-                # Skip if mentee already has a relationship
-                if MentorMenteeRelationship.objects.filter(
-                    mentee__registration_no=mentee_reg_no
-                ).exists():
-                    continue
-                
-                try:
-                    mentor = Participant.objects.get(registration_no=mentor_reg_no)
-                    mentee = Participant.objects.get(registration_no=mentee_reg_no)
-                    
-                    # Skip if they're from different departments and department_filter is active
-                    if (department_filter and 
-                        ((mentor.department and mentor.department.id != department_filter.id) or
-                         (mentee.department and mentee.department.id != department_filter.id))):
-                        continue
-                    
-                    # Create the relationship (flag as auto-generated)
-                    MentorMenteeRelationship.objects.create(
-                        mentor=mentor,
-                        mentee=mentee,
-                        manually_created=False
-                    )
-                except Participant.DoesNotExist:
-                    # Skip if either mentor or mentee doesn't exist
-                    continue
+        # Special case: If we have unmatched mentees but no new mentors,
+        # try to match them with existing mentors in the database
+        if 'unmatched_mentees' in matches and matches['unmatched_mentees']:
+            matches['matches'].extend(assign_to_existing_mentors(
+                matches['unmatched_mentees'],
+                mentors_in_relationships,
+                department=department_filter,
+                # Sharded matching never pairs across departments
+                per_department=sharded
+            ))
+        
+        if plan_mode:
+            # Dry run: store the proposal instead of writing relationships
+            match_plan = create_match_plan(department_filter, strategy, matches, fingerprint, sharded=sharded)
+        else:
+            with transaction.atomic():
+                # Create all new relationships (flagged as auto-generated) in one insert
+                newly_created = save_matches(matches['matches'], department=department_filter)
     except Exception as e:
         return Response({
             "error": "Failed to save mentor-mentee relationships",
             "details": str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+    if plan_mode:
+        response_data = {
+            "message": f"Matching plan created with {len(matches['matches'])} proposed matches, nothing has been saved yet",
+            "plan_id": str(match_plan.id),
+            "fingerprint": match_plan.fingerprint,
+            "expires_at": match_plan.expires_at,
+            "proposed_matches": len(matches['matches']),
+            "new_matches": matches['matches'],
+            "statistics": matches.get('statistics', {}),
+            "strategy": strategy
+        }
+        if sharded:
+            response_data["shards"] = matches['shards']
+            response_data["sharding"] = matches['sharding']
+        if department_filter:
+            response_data["department_filter"] = {
+                "id": department_filter.id,
+                "name": department_filter.name,
+                "code": department_filter.code
+            }
+        return Response(response_data)
+    
     # Get all relationships for a complete response
     if department_filter:
         # For department admin, only get relationships in their department
@@ -965,7 +674,6 @@ def match_participants(request):
     total_relationships = all_relationships.count()
     manual_relationships = all_relationships.filter(manually_created=True).count()
     auto_relationships = all_relationships.filter(manually_created=False).count()
-    newly_created = len(matches['matches'])
         
     response_data = {
         "message": f"Successfully matched {newly_created} new participants",
@@ -976,9 +684,14 @@ def match_participants(request):
             "automatic": auto_relationships
         },
         "new_matches": matches['matches'],
-        "statistics": matches.get('statistics', {})
+        "statistics": matches.get('statistics', {}),
+        "strategy": strategy
     }
     
+    if sharded:
+        response_data["shards"] = matches['shards']
+        response_data["sharding"] = matches['sharding']
+    
     # Add department info if filtering was applied
     if department_filter:
         response_data["department_filter"] = {
@@ -989,12 +702,126 @@ def match_participants(request):
         
     return Response(response_data)
 
+@api_view(['POST'])
+def match_participant_incremental(request):
+    """
+    Place a single participant without re-running the full match: a mentee is
+    scored against mentors with spare capacity, a mentor against unmatched mentees.
+    """
+    registration_no = request.data.get('registration_no')
+    if not registration_no:
+        return Response({
+            "error": "Registration number is required"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        participant = Participant.objects.get(registration_no=registration_no)
+    except Participant.DoesNotExist:
+        return Response({
+            "error": f"Participant with registration number {registration_no} not found"
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    # Department admins can only match within their own department
+    department_filter = get_admin_department(request.user)
+    if department_filter and participant.department_id != department_filter.id:
+        return Response({
+            "error": "Participant is not in your department"
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    if participant.approval_status != 'approved' or participant.status != 'active':
+        return Response({
+            "error": "Only approved, active participants can be matched"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        new_matches = incremental_match(participant, department_filter)
+    except Exception as e:
+        return Response({
+            "error": "Failed to match participant",
+            "details": str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    response_data = {
+        "message": f"Created {len(new_matches)} new relationship(s) for {participant.name}",
+        "newly_matched": len(new_matches),
+        "new_matches": new_matches
+    }
+    if department_filter:
+        response_data["department_filter"] = {
+            "id": department_filter.id,
+            "name": department_filter.name,
+            "code": department_filter.code
+        }
+    return Response(response_data, status=status.HTTP_200_OK)
+
+@api_view(['POST'])
+def commit_match_plan(request, plan_id):
+    """
+    Apply a plan stored by match_participants?plan=true with one bulk insert.
+    Rejected when the participants or relationships changed since it was made.
+    """
+    department_filter = get_admin_department(request.user)
+    
+    try:
+        with transaction.atomic():
+            try:
+                plan = MatchPlan.objects.select_for_update().get(id=plan_id)
+            except MatchPlan.DoesNotExist:
+                return Response({
+                    "error": "Matching plan not found"
+                }, status=status.HTTP_404_NOT_FOUND)
+            
+            # Department admins can only commit plans for their own department
+            if department_filter and plan.department_id != department_filter.id:
+                return Response({
+                    "error": "Matching plan belongs to another department"
+                }, status=status.HTTP_403_FORBIDDEN)
+            
+            if plan.committed_at:
+                return Response({
+                    "error": "Matching plan has already been committed",
+                    "committed_at": plan.committed_at
+                }, status=status.HTTP_409_CONFLICT)
+            
+            if plan.expires_at <= timezone.now():
+                return Response({
+                    "error": "Matching plan has expired",
+                    "message": "Run matching with plan=true again to create a new plan"
+                }, status=status.HTTP_410_GONE)
+            
+            if matching_fingerprint(plan.department) != plan.fingerprint:
+                return Response({
+                    "error": "Participants changed since the plan was made",
+                    "message": "Run matching with plan=true again to create a new plan"
+                }, status=status.HTTP_409_CONFLICT)
+            
+            created = save_matches(plan.payload.get('matches', []), department=plan.department)
+            
+            plan.committed_at = timezone.now()
+            plan.save(update_fields=['committed_at'])
+    except Exception as e:
+        return Response({
+            "error": "Failed to commit matching plan",
+            "details": str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    return Response({
+        "message": f"Successfully matched {created} new participants from plan",
+        "plan_id": str(plan.id),
+        "newly_matched": created,
+        "committed_at": plan.committed_at,
+        "strategy": plan.strategy
+    }, status=status.HTTP_200_OK)
+
 @api_view(['DELETE'])
 def delete_all_participants(request):
     """Endpoint to delete all participants from the database."""
     try:
         count = Participant.objects.count()
+        delete_proofs(ProofDocument.objects.all())
         Participant.objects.all().delete()
+        bump_version_on_commit(ACTIVITY_NAMESPACE)
+        DepartmentLeaderboardSnapshot.mark_stale()
         return Response({
             "message": f"Successfully deleted all {count} participants",
             "count": count
@@ -1053,8 +880,12 @@ def create_session(request):
         serializer = SessionSerializer(data=request.data)
         
         if serializer.is_valid():
-            # Save session with mentor
-            session = serializer.save(mentor=mentor)
+            # Save session with mentor; its points go in with it or not at all
+            with transaction.atomic():
+                session = serializer.save(mentor=mentor)
+                deltas = session_deltas(session)
+                adjust_points(deltas)
+                refresh_leaderboard_entries(deltas)
             
             # Send email notifications
             from account.utils import Util
@@ -1175,8 +1006,12 @@ def delete_session(request, session_id):
                 "error": "Only the session creator can delete this session"
             }, status=status.HTTP_403_FORBIDDEN)
         
-        # Delete the session
-        session.delete()
+        # Delete the session and take back its leaderboard points together
+        with transaction.atomic():
+            deltas = session_deltas(session)
+            session.delete()
+            adjust_points(deltas, sign=-1)
+            refresh_leaderboard_entries(deltas)
         
         return Response({
             "message": "Session deleted successfully"
@@ -1406,15 +1241,15 @@ def create_relationship(request):
             }, status=status.HTTP_400_BAD_REQUEST)
             
         # Check if the mentee already has a mentor
-        if MentorMenteeRelationship.objects.filter(mentee=mentee).exists():
-            existing_mentor = MentorMenteeRelationship.objects.get(mentee=mentee).mentor
+        if mentee.current_mentor_id:
+            existing_mentor = mentee.current_mentor
             return Response({
                 "error": f"Mentee already has a mentor: {existing_mentor.name} ({existing_mentor.registration_no})",
                 "suggestion": "You can delete the existing relationship first if you want to reassign the mentee"
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Check if mentor has reached maximum mentees (e.g., 5)
-        mentee_count = MentorMenteeRelationship.objects.filter(mentor=mentor).count()
+        mentee_count = mentor.mentee_count
         if mentee_count >= 5:  # Maximum mentees per mentor
             return Response({
                 "error": f"Mentor already has {mentee_count} mentees (maximum allowed)",
@@ -1422,11 +1257,12 @@ def create_relationship(request):
             }, status=status.HTTP_400_BAD_REQUEST)
             
         # Create the relationship
-        relationship = MentorMenteeRelationship.objects.create(
-            mentor=mentor,
-            mentee=mentee,
-            manually_created=True  # Flag as manually created
-        )
+        with changing_relationships([mentor.registration_no, mentee.registration_no]):
+            relationship = MentorMenteeRelationship.objects.create(
+                mentor=mentor,
+                mentee=mentee,
+                manually_created=True  # Flag as manually created
+            )
         
         # Return success response with relationship details
         return Response({
@@ -1462,6 +1298,8 @@ def update_relationship(request, relationship_id):
             return Response({
                 "error": "Relationship not found"
             }, status=status.HTTP_404_NOT_FOUND)
+        previous_mentor_id = relationship.mentor_id
+        previous_mentee_id = relationship.mentee_id
             
         mentor_reg_no = request.data.get('mentor_registration_no')
         mentee_reg_no = request.data.get('mentee_registration_no')
@@ -1508,7 +1346,8 @@ def update_relationship(request, relationship_id):
                 "error": "This mentor-mentee relationship already exists"
             }, status=status.HTTP_400_BAD_REQUEST)
                 
-        relationship.save()
+        with changing_relationships([previous_mentor_id, relationship.mentor_id, previous_mentee_id, relationship.mentee_id]):
+            relationship.save()
         
         return Response({
             "message": "Relationship updated successfully",
@@ -1543,15 +1382,23 @@ def delete_relationship(request, relationship_id):
             }, status=status.HTTP_404_NOT_FOUND)
             
         # Save details for response
-        mentor_name = relationship.mentor.name
-        mentee_name = relationship.mentee.name
+        mentor = relationship.mentor
+        mentee = relationship.mentee
+        mentor_name = mentor.name
+        mentee_name = mentee.name
         
         # Delete the relationship
-        relationship.delete()
+        with changing_relationships([mentor.registration_no, mentee.registration_no]):
+            relationship.delete()
         
-        return Response({
+        response_data = {
             "message": f"Relationship between mentor '{mentor_name}' and mentee '{mentee_name}' deleted successfully"
-        }, status=status.HTTP_200_OK)
+        }
+        
+        # The mentor has a free slot now; don't hand the same mentee straight back
+        run_auto_matching(request, [mentor], response_data, exclude=[mentee.registration_no])
+        
+        return Response(response_data, status=status.HTTP_200_OK)
         
     except Exception as e:
         return Response({
@@ -1581,28 +1428,8 @@ def list_unmatched_participants(request):
             # Regular admin or non-logged in user gets all approved participants
             all_participants = Participant.objects.filter(approval_status='approved')
         
-        # Get all participants who are mentors or mentees in a relationship
-        if department_filter:
-            # For department admin, only consider relationships in their department
-            department_participants = all_participants.values_list('registration_no', flat=True)
-            
-            mentors_in_relationships = MentorMenteeRelationship.objects.filter(
-                mentor__registration_no__in=department_participants
-            ).values_list('mentor', flat=True).distinct()
-            
-            mentees_in_relationships = MentorMenteeRelationship.objects.filter(
-                mentee__registration_no__in=department_participants
-            ).values_list('mentee', flat=True).distinct()
-        else:
-            # For regular admin, consider all relationships
-            mentors_in_relationships = MentorMenteeRelationship.objects.values_list('mentor', flat=True).distinct()
-            mentees_in_relationships = MentorMenteeRelationship.objects.values_list('mentee', flat=True).distinct()
-        
-        # Combine the two lists to get all participants in relationships
-        matched_reg_nos = set(mentors_in_relationships) | set(mentees_in_relationships)
-        
         # Filter for participants who are not in any relationship
-        unmatched_participants = all_participants.exclude(registration_no__in=matched_reg_nos)
+        unmatched_participants = all_participants.filter(mentee_count=0, current_mentor__isnull=True)
         
         # Serialize the unmatched participants
         serializer = ParticipantSerializer(unmatched_participants, many=True)
@@ -1751,19 +1578,22 @@ def generate_quiz(request):
         
         # If mentee_id is provided, create a pending quiz for them
         if mentee and mentor and relationship_validated:
-            # Create a pending quiz result with score of 0
-            pending_quiz = QuizResult(
-                participant=mentee,
-                mentor=mentor,  # Store the mentor who created the quiz
-                quiz_topic=prompt,
-                score=0,
-                total_questions=len(quiz),
-                percentage=0,
-                quiz_data=quiz,
-                quiz_answers={},  # Empty until the mentee submits answers
-                result_details=[]  # Empty until the mentee submits answers
-            )
-            pending_quiz.save()
+            # Create a pending quiz result with score of 0, with the assignment points
+            with transaction.atomic():
+                pending_quiz = QuizResult(
+                    participant=mentee,
+                    mentor=mentor,  # Store the mentor who created the quiz
+                    quiz_topic=prompt,
+                    score=0,
+                    total_questions=len(quiz),
+                    percentage=0,
+                    quiz_data=quiz,
+                    quiz_answers={},  # Empty until the mentee submits answers
+                    result_details=[]  # Empty until the mentee submits answers
+                )
+                pending_quiz.save()
+                adjust_points(quiz_deltas(pending_quiz))
+                refresh_leaderboard_entries([pending_quiz.participant_id, pending_quiz.mentor_id])
             
             # Send email notification to the mentee
             from account.utils import Util
@@ -1799,20 +1629,23 @@ def generate_quiz(request):
         # If mentor is provided but no mentee, also track that the mentor generated a quiz
         # but mark it as not assigned to anyone specific
         elif mentor and not mentee:
-            # Create a placeholder "mentor quiz" that isn't assigned to a mentee
-            mentor_quiz = QuizResult(
-                participant=mentor,  # The mentor is the participant
-                mentor=mentor,       # The mentor is also the creator
-                quiz_topic=prompt,
-                score=0,
-                total_questions=len(quiz),
-                percentage=0,
-                quiz_data=quiz,
-                quiz_answers={},
-                result_details=[],
-                status='unassigned'  # Special status for tracking mentor-generated quizzes
-            )
-            mentor_quiz.save()
+            # Create a placeholder "mentor quiz" that isn't assigned to a mentee, with the assignment points
+            with transaction.atomic():
+                mentor_quiz = QuizResult(
+                    participant=mentor,  # The mentor is the participant
+                    mentor=mentor,       # The mentor is also the creator
+                    quiz_topic=prompt,
+                    score=0,
+                    total_questions=len(quiz),
+                    percentage=0,
+                    quiz_data=quiz,
+                    quiz_answers={},
+                    result_details=[],
+                    status='unassigned'  # Special status for tracking mentor-generated quizzes
+                )
+                mentor_quiz.save()
+                adjust_points(quiz_deltas(mentor_quiz))
+                refresh_leaderboard_entries([mentor_quiz.participant_id, mentor_quiz.mentor_id])
             
             return Response({
                 'quiz': quiz,
@@ -1914,31 +1747,37 @@ def submit_quiz_answers(request):
     total_questions = len(quiz_data)
     percentage = round((score / total_questions) * 100, 2) if total_questions > 0 else 0
     
-    # Update existing or create new quiz result
-    if quiz_id:
-        # Update existing quiz
-        quiz_result.score = score
-        quiz_result.percentage = percentage
-        quiz_result.quiz_answers = quiz_answers
-        quiz_result.result_details = results
-        quiz_result.status = 'completed'
-        quiz_result.completed_date = datetime.datetime.now()
-        quiz_result.save()
-    else:
-        # Create new quiz result
-        quiz_result = QuizResult(
-            participant=participant,
-            quiz_topic=quiz_topic,
-            score=score,
-            total_questions=total_questions,
-            percentage=percentage,
-            quiz_data=quiz_data,
-            quiz_answers=quiz_answers,
-            result_details=results,
-            status='completed',
-            completed_date=datetime.datetime.now()
-        )
-        quiz_result.save()
+    # Update existing or create new quiz result, with the completion points
+    # in the same transaction
+    with transaction.atomic():
+        if quiz_id:
+            # Update existing quiz
+            quiz_result.score = score
+            quiz_result.percentage = percentage
+            quiz_result.quiz_answers = quiz_answers
+            quiz_result.result_details = results
+            quiz_result.status = 'completed'
+            quiz_result.completed_date = datetime.datetime.now()
+            quiz_result.save()
+        else:
+            # Create new quiz result
+            quiz_result = QuizResult(
+                participant=participant,
+                quiz_topic=quiz_topic,
+                score=score,
+                total_questions=total_questions,
+                percentage=percentage,
+                quiz_data=quiz_data,
+                quiz_answers=quiz_answers,
+                result_details=results,
+                status='completed',
+                completed_date=datetime.datetime.now()
+            )
+            quiz_result.save()
+        
+        # The quiz just moved to completed
+        adjust_points(quiz_completion_deltas(quiz_result))
+        refresh_leaderboard_entries([quiz_result.participant_id, quiz_result.mentor_id])
     
     serializer = QuizResultSerializer(quiz_result)
     response_data = serializer.data
@@ -2031,8 +1870,13 @@ def delete_quiz(request, quiz_id):
         'status': quiz_result.status,
     }
     
-    # Delete the quiz
-    quiz_result.delete()
+    # Delete the quiz and take back its leaderboard points together
+    with transaction.atomic():
+        deltas = quiz_deltas(quiz_result)
+        affected = [quiz_result.participant_id, quiz_result.mentor_id]
+        quiz_result.delete()
+        adjust_points(deltas, sign=-1)
+        refresh_leaderboard_entries(affected)
     
     return Response({
         'message': 'Quiz deleted successfully',
@@ -2104,10 +1948,15 @@ def update_participant_approval(request):
             }
             Util.send_email(data)
         
-        return Response({
+        response_data = {
             'message': f'Participant approval status updated to {new_status}',
             'participant': ParticipantSerializer(participant).data
-        }, status=status.HTTP_200_OK)
+        }
+        
+        if new_status == 'approved':
+            run_auto_matching(request, [participant], response_data)
+        
+        return Response(response_data, status=status.HTTP_200_OK)
         
     except Participant.DoesNotExist:
         return Response({
@@ -2125,6 +1974,63 @@ def list_pending_approvals(request):
         'participants': serializer.data
     }, status=status.HTTP_200_OK)
 
+@api_view(['GET'])
+def pending_proof_thumbnails(request):
+    """
+    Thumbnails of the proofs of a page of pending applicants (admin only).
+    ?registration_nos=A,B picks the applicants instead; ?limit and ?offset
+    page through the queue. Thumbnails not rendered yet are queued and
+    reported as pending.
+    """
+    try:
+        limit = min(int(request.query_params.get('limit', 20)), 50)
+        offset = int(request.query_params.get('offset', 0))
+    except ValueError:
+        return Response({
+            'error': 'limit and offset must be integers'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if limit < 0 or offset < 0:
+        return Response({
+            'error': 'limit and offset must not be negative'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    participants = Participant.objects.filter(approval_status='pending').order_by('registration_no')
+    registration_nos = request.query_params.get('registration_nos')
+    if registration_nos:
+        participants = participants.filter(registration_no__in=[r.strip() for r in registration_nos.split(',') if r.strip()])
+    participants = list(participants.values('registration_no', 'name')[offset:offset + limit])
+    
+    documents = defaultdict(list)
+    for document in ProofDocument.objects.filter(
+        participant_id__in=[p['registration_no'] for p in participants]
+    ).only('participant_id', 'proof_type', 'file', 'sha256', 'content_type').order_by('id'):
+        documents[document.participant_id].append(document)
+    
+    results = []
+    for participant in participants:
+        proofs = []
+        for document in documents[participant['registration_no']]:
+            thumbnail = read_thumbnail(document.sha256)
+            if thumbnail is None:
+                schedule_thumbnail(document)
+            proofs.append({
+                'proof_type': document.proof_type,
+                'content_type': document.content_type,
+                'sha256': document.sha256,
+                'url': request.build_absolute_uri(
+                    reverse('view_proof', args=[participant['registration_no'], document.proof_type])
+                ),
+                'status': 'pending' if thumbnail is None else 'ready',
+                'thumbnail': base64.b64encode(thumbnail).decode('utf-8') if thumbnail else None,
+            })
+        results.append({**participant, 'proofs': proofs})
+    
+    return Response({
+        'count': len(results),
+        'offset': offset,
+        'results': results
+    }, status=status.HTTP_200_OK)
+
 @api_view(['GET'])
 def get_approval_status(request, registration_no):
     """Get the approval status of a specific participant"""
@@ -2175,23 +2081,35 @@ def update_participant_status(request):
         participant.save()
         
         # Handle relationships when deactivating a mentor
-        if new_status == 'deactivated' and MentorMenteeRelationship.objects.filter(mentor=participant).exists():
+        if new_status == 'deactivated' and participant.mentee_count > 0:
             # Get all mentees for this mentor
             mentees = [rel.mentee for rel in MentorMenteeRelationship.objects.filter(mentor=participant)]
             
             # Delete the relationships
-            MentorMenteeRelationship.objects.filter(mentor=participant).delete()
+            with changing_relationships([participant.registration_no] + [m.registration_no for m in mentees]):
+                MentorMenteeRelationship.objects.filter(mentor=participant).delete()
             
-            return Response({
+            response_data = {
                 'message': f'Participant status updated from {old_status} to {new_status}',
                 'participant': ParticipantSerializer(participant).data,
                 'note': f'{len(mentees)} mentee relationships have been removed'
-            }, status=status.HTTP_200_OK)
+            }
+            
+            # Try to place the orphaned mentees with other mentors
+            run_auto_matching(request, mentees, response_data)
+            
+            return Response(response_data, status=status.HTTP_200_OK)
         
-        return Response({
+        response_data = {
             'message': f'Participant status updated from {old_status} to {new_status}',
             'participant': ParticipantSerializer(participant).data
-        }, status=status.HTTP_200_OK)
+        }
+        
+        # A re-activated participant can be placed right away
+        if new_status == 'active' and old_status != 'active':
+            run_auto_matching(request, [participant], response_data)
+        
+        return Response(response_data, status=status.HTTP_200_OK)
         
     except Participant.DoesNotExist:
         return Response({
@@ -2291,7 +2209,7 @@ def claim_badge(request):
         }, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        participant = Participant.objects.get(registration_no=participant_id)
+        participant = Participant.objects.only('registration_no', 'name').get(registration_no=participant_id)
         badge = Badge.objects.get(id=badge_id)
         
         try:
@@ -2305,25 +2223,28 @@ def claim_badge(request):
                 'error': 'This badge is either not awarded to you or already claimed'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Mark the badge as claimed
-        participant_badge.is_claimed = True
-        participant_badge.claimed_date = datetime.datetime.now()
-        participant_badge.save()
-        
-        # Update participant's badges count
-        participant.badges_earned += 1
-        
-        # Check if participant should be promoted to super mentor
-        if participant.badges_earned >= 5:
-            participant.is_super_mentor = True
-        
-        participant.save()
+        with transaction.atomic():
+            # Mark the badge as claimed, unless a concurrent request already did
+            participant_badge.is_claimed = True
+            participant_badge.claimed_date = datetime.datetime.now()
+            claimed = ParticipantBadge.objects.filter(pk=participant_badge.pk, is_claimed=False).update(
+                is_claimed=True, claimed_date=participant_badge.claimed_date
+            )
+            if not claimed:
+                return Response({
+                    'error': 'This badge is either not awarded to you or already claimed'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            # Count the badge, promote to super mentor and add the points in one UPDATE
+            badges_earned, is_super_mentor = change_claimed_badges(
+                [participant.registration_no], 1
+            )[participant.registration_no]
         
         return Response({
             'message': f'Badge "{badge.name}" claimed successfully',
             'participant_badge': ParticipantBadgeSerializer(participant_badge).data,
-            'badges_earned': participant.badges_earned,
-            'is_super_mentor': participant.is_super_mentor
+            'badges_earned': badges_earned,
+            'is_super_mentor': is_super_mentor
         }, status=status.HTTP_200_OK)
         
     except Participant.DoesNotExist:
@@ -2375,22 +2296,10 @@ def update_leaderboard_points(request):
         participant.leaderboard_points = int(points)
         participant.save()
         
-        # Check if participant qualifies for any badges based on points
-        eligible_badges = Badge.objects.filter(points_required__lte=participant.leaderboard_points)
-        
-        # Get badges participant already has
-        existing_badge_ids = ParticipantBadge.objects.filter(participant=participant).values_list('badge_id', flat=True)
-        
-        # Award new eligible badges
-        newly_awarded = []
-        for badge in eligible_badges:
-            if badge.id not in existing_badge_ids:
-                ParticipantBadge.objects.create(
-                    participant=participant,
-                    badge=badge,
-                    is_claimed=False
-                )
-                newly_awarded.append(badge.name)
+        # Award any badges the new points qualify for
+        newly_awarded = award_point_badges({
+            participant.registration_no: participant.leaderboard_points
+        }).get(participant.registration_no)
         
         response_data = {
             'message': f'Leaderboard points updated from {old_points} to {points}',
@@ -2415,7 +2324,10 @@ def update_leaderboard_points(request):
 
 @api_view(['POST'])
 def sync_leaderboard_points(request):
-    """Sync the leaderboard points from the frontend to store in the database"""
+    """
+    Sync the leaderboard points from the frontend to store in the database.
+    All entries are written in one transaction; unknown IDs are reported back.
+    """
     try:
         leaderboard_data = request.data.get('leaderboard_data', [])
         
@@ -2424,58 +2336,52 @@ def sync_leaderboard_points(request):
                 'error': 'No leaderboard data provided'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        updated_participants = []
-        
+        # Validate everything before writing anything
+        scores = {}
+        invalid_entries = []
+        if not isinstance(leaderboard_data, list) or not all(isinstance(entry, dict) for entry in leaderboard_data):
+            return Response({
+                'error': 'leaderboard_data must be a list of {"id", "score"} objects'
+            }, status=status.HTTP_400_BAD_REQUEST)
         for entry in leaderboard_data:
             participant_id = entry.get('id')
-            score = entry.get('score', 0)
-            
             if not participant_id:
                 continue
-                
             try:
-                participant = Participant.objects.get(registration_no=participant_id)
-                participant.leaderboard_points = score
-                participant.save()
-                
-                # Check if participant qualifies for any badges based on points
-                eligible_badges = Badge.objects.filter(points_required__lte=score)
-                
-                # Get badges participant already has
-                existing_badge_ids = ParticipantBadge.objects.filter(participant=participant).values_list('badge_id', flat=True)
-                
-                # Award new eligible badges
-                newly_awarded = []
-                for badge in eligible_badges:
-                    if badge.id not in existing_badge_ids:
-                        ParticipantBadge.objects.create(
-                            participant=participant,
-                            badge=badge,
-                            is_claimed=False
-                        )
-                        newly_awarded.append(badge.name)
-                
-                participant_data = {
-                    'registration_no': participant.registration_no,
-                    'name': participant.name,
-                    'leaderboard_points': participant.leaderboard_points,
-                    'badges_earned': participant.badges_earned,
-                    'is_super_mentor': participant.is_super_mentor
-                }
-                
-                if newly_awarded:
-                    participant_data['newly_awarded_badges'] = newly_awarded
-                    
-                updated_participants.append(participant_data)
-                
-            except Participant.DoesNotExist:
-                # Skip participants that don't exist in the database
-                continue
+                scores[participant_id] = int(entry.get('score', 0))
+            except (TypeError, ValueError):
+                invalid_entries.append(participant_id)
         
-        return Response({
+        if invalid_entries:
+            return Response({
+                'error': 'Scores must be integers',
+                'invalid_ids': invalid_entries
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        with transaction.atomic():
+            participants, awarded, unknown_ids = sync_points(scores, chunk_size=settings.LEADERBOARD_SYNC_CHUNK_SIZE)
+        
+        updated_participants = []
+        for participant in participants:
+            participant_data = {
+                'registration_no': participant.registration_no,
+                'name': participant.name,
+                'leaderboard_points': participant.leaderboard_points,
+                'badges_earned': participant.badges_earned,
+                'is_super_mentor': participant.is_super_mentor
+            }
+            if participant.registration_no in awarded:
+                participant_data['newly_awarded_badges'] = awarded[participant.registration_no]
+            updated_participants.append(participant_data)
+        
+        response_data = {
             'message': f'Successfully updated leaderboard points for {len(updated_participants)} participants',
             'updated_participants': updated_participants
-        }, status=status.HTTP_200_OK)
+        }
+        if unknown_ids:
+            response_data['unknown_ids'] = unknown_ids
+        
+        return Response(response_data, status=status.HTTP_200_OK)
         
     except Exception as e:
         return Response({
@@ -2488,127 +2394,12 @@ def calculate_leaderboard_points(request):
     """
     Calculate leaderboard points for all participants based on activities and store in the database.
     This is a server-side calculation that can be used as an alternative to frontend calculation.
+    Every score component comes from one aggregated query (see leaderboard.py).
     """
     try:
-        # Get all approved and active participants
-        participants = Participant.objects.filter(
-            approval_status='approved',
-            status='active'
-        )
-        
-        updated_participants = []
-        
-        for participant in participants:
-            # Initialize score components
-            sessions_score = 0
-            quiz_score = 0
-            mentee_score = 0
-            quiz_assignment_score = 0
-            
-            # Calculate score based on sessions 
-            # Each session is worth 20 points (further reduced)
-            sessions = Session.objects.filter(mentor=participant).count()
-            sessions_as_participant = Session.objects.filter(participants=participant).count()
-            sessions_score = (sessions * 20) + (sessions_as_participant * 10)  # Further reduced
-            
-            # Check if participant is a mentor (has mentees)
-            mentor_relationships = MentorMenteeRelationship.objects.filter(mentor=participant)
-            is_mentor = mentor_relationships.exists()
-            
-            # Points for quizzes assigned by mentor
-            # Each quiz assigned is worth 5 points (further reduced)
-            assigned_quizzes = QuizResult.objects.filter(mentor=participant)
-            assigned_quiz_count = assigned_quizzes.count()
-            quiz_assignment_score = assigned_quiz_count * 5  # Further reduced
-            
-            # Add points for completed quizzes with direct score
-            completed_assigned_quizzes = assigned_quizzes.filter(status='completed')
-            if completed_assigned_quizzes.exists():
-                # Add points based on direct score (e.g., 4/5 = 4 points)
-                for quiz in completed_assigned_quizzes:
-                    quiz_assignment_score += quiz.score
-            
-            if is_mentor:
-                # For mentors: Add points for each mentee and their quiz performance
-                mentees = [rel.mentee for rel in mentor_relationships]
-                mentee_count = len(mentees)
-                mentee_score = mentee_count * 40  # Further reduced
-                
-                # Add score for mentee quiz performance
-                for mentee in mentees:
-                    # Get completed quizzes for this mentee
-                    quizzes = QuizResult.objects.filter(
-                        participant=mentee,
-                        status='completed'
-                    )
-                    
-                    if quizzes.exists():
-                        # Add direct score from each quiz (e.g., 4/5 = 4 points)
-                        for quiz in quizzes:
-                            quiz_score += quiz.score
-            else:
-                # For mentees: Calculate scores based on their own quizzes
-                quizzes = QuizResult.objects.filter(
-                    participant=participant,
-                    status='completed'
-                )
-                
-                if quizzes.exists():
-                    # Add direct score from each quiz (e.g., 4/5 = 4 points)
-                    for quiz in quizzes:
-                        quiz_score += quiz.score
-            
-            # Calculate total score - include quiz assignment points
-            total_score = sessions_score + quiz_score + mentee_score + quiz_assignment_score
-            
-            # Add bonus for badges and super mentor status (further reduced)
-            if participant.badges_earned > 0:
-                total_score += participant.badges_earned * 20  # Further reduced
-                
-            if participant.is_super_mentor:
-                total_score += 100  # Further reduced
-            
-            # Update participant's leaderboard points
-            participant.leaderboard_points = total_score
-            participant.save()
-            
-            # Check for badge eligibility based on new score
-            eligible_badges = Badge.objects.filter(points_required__lte=total_score)
-            existing_badge_ids = ParticipantBadge.objects.filter(participant=participant).values_list('badge_id', flat=True)
-            
-            # Award new eligible badges
-            newly_awarded = []
-            for badge in eligible_badges:
-                if badge.id not in existing_badge_ids:
-                    ParticipantBadge.objects.create(
-                        participant=participant,
-                        badge=badge,
-                        is_claimed=False
-                    )
-                    newly_awarded.append(badge.name)
-            
-            # Add to results
-            participant_data = {
-                'registration_no': participant.registration_no,
-                'name': participant.name,
-                'role': 'mentor' if is_mentor else 'mentee',
-                'sessions_score': sessions_score,
-                'quiz_score': quiz_score,
-                'mentee_score': mentee_score,
-                'quiz_assignment_score': quiz_assignment_score,
-                'total_score': total_score,
-                'badges_earned': participant.badges_earned,
-                'is_super_mentor': participant.is_super_mentor,
-                'assigned_quizzes': assigned_quiz_count
-            }
-            
-            if newly_awarded:
-                participant_data['newly_awarded_badges'] = newly_awarded
-                
-            updated_participants.append(participant_data)
-        
-        # Sort by total score (highest first)
-        updated_participants.sort(key=lambda p: p['total_score'], reverse=True)
+        with transaction.atomic():
+            updated_participants = recalculate_leaderboard()
+            refresh_leaderboard_entries()
         
         return Response({
             'message': f'Successfully calculated leaderboard points for {len(updated_participants)} participants',
@@ -2622,105 +2413,105 @@ def calculate_leaderboard_points(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @api_view(['GET'])
+@versioned_response(ACTIVITY_NAMESPACE)
 def get_leaderboard(request):
-    """Get the current leaderboard with participants sorted by leaderboard points"""
+    """
+    Get the current leaderboard with participants sorted by leaderboard points.
+    Pass limit (and the returned next_cursor as cursor) to page through it,
+    and department_id for one department's board.
+    """
     try:
         # Get filter parameters
         role = request.query_params.get('role', 'all')  # 'mentor', 'mentee', or 'all'
         search = request.query_params.get('search', '')
+        department_id = request.query_params.get('department_id')
+        cursor = request.query_params.get('cursor')
+        limit = request.query_params.get('limit')
+        paginated = bool(cursor or limit)
+        if paginated:
+            try:
+                limit = min(max(int(limit or 50), 1), 500)
+            except ValueError:
+                return Response({
+                    'error': 'limit must be an integer'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        if department_id:
+            try:
+                department_id = int(department_id)
+            except ValueError:
+                return Response({
+                    'error': 'department_id must be an integer'
+                }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get approved and active participants
-        participants = Participant.objects.filter(
-            approval_status='approved',
-            status='active'
-        ).order_by('-leaderboard_points')
+        # A department's board is served from its snapshot; searches still query live
+        if department_id and not search:
+            snapshot = department_snapshot(department_id)
+            if snapshot is None:
+                return Response({
+                    'error': 'Department not found'
+                }, status=status.HTTP_404_NOT_FOUND)
+            leaderboard_data = snapshot.rows
+            if role == 'mentor':
+                leaderboard_data = [row for row in leaderboard_data if row['role'] == 'mentor']
+            elif role == 'mentee':
+                leaderboard_data = [row for row in leaderboard_data if row['mentorId'] is not None]
+            if paginated:
+                try:
+                    leaderboard_data, next_cursor = snapshot_page(leaderboard_data, cursor, limit)
+                except ValueError as e:
+                    return Response({
+                        'error': str(e)
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                return Response({
+                    'results': leaderboard_data,
+                    'next_cursor': next_cursor,
+                    'computed_at': snapshot.computed_at
+                }, status=status.HTTP_200_OK)
+            return Response(leaderboard_data, status=status.HTTP_200_OK)
+        
+        # Get approved and active participants with their materialized statistics
+        participants = leaderboard_participants()
+        if department_id:
+            participants = participants.filter(department_id=department_id)
         
-        # Apply role filter if specified
+        # Apply role filter if specified. Participants without an entry yet
+        # are filtered on the relationship columns the entry would be built from
         if role == 'mentor':
-            # Get registration numbers of all mentors
-            mentor_reg_nos = MentorMenteeRelationship.objects.values_list('mentor__registration_no', flat=True).distinct()
-            participants = participants.filter(registration_no__in=mentor_reg_nos)
+            participants = participants.filter(
+                Q(leaderboard_entry__role='mentor') | Q(leaderboard_entry__isnull=True, mentee_count__gt=0)
+            )
         elif role == 'mentee':
-            # Get registration numbers of all mentees
-            mentee_reg_nos = MentorMenteeRelationship.objects.values_list('mentee__registration_no', flat=True).distinct()
-            participants = participants.filter(registration_no__in=mentee_reg_nos)
+            # Anyone with a mentor, including mentees who mentor others themselves
+            participants = participants.filter(
+                Q(leaderboard_entry__mentor_registration_no__isnull=False)
+                | Q(leaderboard_entry__isnull=True, current_mentor__isnull=False)
+            )
         
-        # Apply search filter if provided
+        # Apply search filter if provided: name, tech stack or areas of interest
         if search:
-            participants = participants.filter(name__icontains=search)
+            participants = participants.filter(search_filter(search))
         
-        # Serialize the data
-        leaderboard_data = []
+        next_cursor = None
+        if paginated:
+            try:
+                participants, next_cursor = leaderboard_page(participants, cursor, limit)
+            except ValueError as e:
+                return Response({
+                    'error': str(e)
+                }, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            participants = list(participants)
         
-        for participant in participants:
-            # Determine role
-            is_mentor = MentorMenteeRelationship.objects.filter(mentor=participant).exists()
-            is_mentee = MentorMenteeRelationship.objects.filter(mentee=participant).exists()
-            
-            role = 'mentor' if is_mentor else 'mentee' if is_mentee else 'unknown'
-            
-            # Get mentor info for mentees
-            mentor_name = 'Not assigned'
-            mentor_id = None
-            if is_mentee:
-                relationship = MentorMenteeRelationship.objects.filter(mentee=participant).first()
-                if relationship:
-                    mentor_name = relationship.mentor.name
-                    mentor_id = relationship.mentor.registration_no
-            
-            # Get mentee count for mentors
-            mentees_count = 0
-            if is_mentor:
-                mentees_count = MentorMenteeRelationship.objects.filter(mentor=participant).count()
-            
-            # Get sessions
-            sessions_attended = Session.objects.filter(
-                models.Q(mentor=participant) | models.Q(participants=participant)
-            ).distinct().count()
-            
-            # Get quizzes completed by the participant
-            completed_quizzes = QuizResult.objects.filter(
-                participant=participant, 
-                status='completed'
-            )
-            quiz_count = completed_quizzes.count()
-            avg_score = completed_quizzes.aggregate(models.Avg('percentage'))['percentage__avg'] or 0
-            
-            # Get quizzes assigned by the participant (if they're a mentor)
-            assigned_quizzes = QuizResult.objects.filter(mentor=participant)
-            assigned_quiz_count = assigned_quizzes.count()
-            completed_assigned_count = assigned_quizzes.filter(status='completed').count()
-            
-            # Calculate average performance of assigned quizzes
-            avg_assigned_score = 0
-            if completed_assigned_count > 0:
-                avg_assigned_score = assigned_quizzes.filter(status='completed').aggregate(
-                    models.Avg('percentage')
-                )['percentage__avg'] or 0
-            
-            # Add to leaderboard
-            leaderboard_data.append({
-                'id': participant.registration_no,
-                'name': participant.name,
-                'role': role,
-                'mentorName': mentor_name,
-                'mentorId': mentor_id,
-                'menteesCount': mentees_count,
-                'branch': participant.branch,
-                'semester': participant.semester,
-                'techStack': participant.tech_stack,
-                'score': participant.leaderboard_points,
-                'sessionsAttended': sessions_attended,
-                'tasksCompleted': quiz_count,
-                'averageScore': round(avg_score, 2),
-                'feedbackGiven': calculate_feedback_level(avg_score),
-                'badges_earned': participant.badges_earned,
-                'is_super_mentor': participant.is_super_mentor,
-                # New fields for assigned quizzes
-                'assignedQuizzes': assigned_quiz_count,
-                'completedAssignedQuizzes': completed_assigned_count,
-                'averageAssignedScore': round(avg_assigned_score, 2)
-            })
+        # Participants without an entry yet (e.g. before the first bulk refresh)
+        attach_missing_entries(participants)
+        
+        # Serialize the data
+        leaderboard_data = [leaderboard_row(participant) for participant in participants]
+        if paginated:
+            return Response({
+                'results': leaderboard_data,
+                'next_cursor': next_cursor
+            }, status=status.HTTP_200_OK)
         
         return Response(leaderboard_data, status=status.HTTP_200_OK)
         
@@ -2730,17 +2521,62 @@ def get_leaderboard(request):
             'details': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-def calculate_feedback_level(average_score):
-    """Calculate feedback level based on average score"""
-    if average_score >= 90:
-        return "Excellent"
-    if average_score >= 80:
-        return "Very Good"
-    if average_score >= 70:
-        return "Good"
-    if average_score >= 60:
-        return "Satisfactory"
-    return "Needs Improvement"
+@api_view(['GET'])
+def get_leaderboard_rank(request, registration_no):
+    """
+    Rank of a participant on the leaderboard and the entries around them.
+    Pass department_id for the rank within a department and window for how
+    many entries to show above and below.
+    """
+    try:
+        department_id = request.query_params.get('department_id')
+        try:
+            window = min(max(int(request.query_params.get('window', 5)), 0), 50)
+        except ValueError:
+            return Response({
+                'error': 'window must be an integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if department_id:
+            try:
+                department_id = int(department_id)
+            except ValueError:
+                return Response({
+                    'error': 'department_id must be an integer'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        
+        participants = Participant.objects.filter(approval_status='approved', status='active')
+        if department_id:
+            participants = participants.filter(department_id=department_id)
+        
+        current, nearby = rank_with_neighbours(participants, registration_no, window)
+        if current is None:
+            return Response({
+                'error': f'Participant {registration_no} is not on this leaderboard'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'id': current['registration_no'],
+            'name': current['name'],
+            'score': current['leaderboard_points'],
+            'rank': current['rank'],
+            'position': current['position'],
+            'total': current['total'],
+            'department_id': department_id,
+            'nearby': [{
+                'id': entry['registration_no'],
+                'name': entry['name'],
+                'score': entry['leaderboard_points'],
+                'rank': entry['rank'],
+                'position': entry['position'],
+                'is_current': entry['registration_no'] == current['registration_no']
+            } for entry in nearby]
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'error': 'Failed to fetch leaderboard rank',
+            'details': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @api_view(['POST'])
 def unclaim_badge(request):
@@ -2755,7 +2591,9 @@ def unclaim_badge(request):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            participant = Participant.objects.get(registration_no=participant_id)
+            participant = Participant.objects.only(
+                'registration_no', 'name', 'badges_earned', 'is_super_mentor'
+            ).get(registration_no=participant_id)
             badge = Badge.objects.get(id=badge_id)
         except Participant.DoesNotExist:
             return Response({
@@ -2766,32 +2604,31 @@ def unclaim_badge(request):
                 'error': f'Badge with ID {badge_id} not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        # Check if the participant has this badge
-        try:
-            participant_badge = ParticipantBadge.objects.get(
-                participant=participant,
-                badge=badge
-            )
-        except ParticipantBadge.DoesNotExist:
-            return Response({
-                'error': f'Participant does not have this badge'
-            }, status=status.HTTP_404_NOT_FOUND)
-        
-        # Check if the badge was claimed
-        was_claimed = participant_badge.is_claimed
-        
-        # Delete the participant badge
-        participant_badge.delete()
-        
-        # If the badge was claimed, decrease the participant's claimed badge count
-        if was_claimed:
-            participant.badges_earned = max(0, participant.badges_earned - 1)
+        with transaction.atomic():
+            # Check if the participant has this badge; the row stays locked so
+            # a concurrent claim can't change is_claimed before it is deleted
+            try:
+                participant_badge = ParticipantBadge.objects.select_for_update().get(
+                    participant=participant,
+                    badge=badge
+                )
+            except ParticipantBadge.DoesNotExist:
+                return Response({
+                    'error': f'Participant does not have this badge'
+                }, status=status.HTTP_404_NOT_FOUND)
             
-            # If the participant falls below 5 badges, they lose super mentor status
-            if participant.badges_earned < 5 and participant.is_super_mentor:
-                participant.is_super_mentor = False
-                
-            participant.save()
+            # Check if the badge was claimed
+            was_claimed = participant_badge.is_claimed
+            
+            # Delete the participant badge
+            participant_badge.delete()
+            
+            # If the badge was claimed, decrease the participant's claimed badge count;
+            # below 5 badges they lose super mentor status
+            if was_claimed:
+                participant.badges_earned, participant.is_super_mentor = change_claimed_badges(
+                    [participant.registration_no], -1
+                )[participant.registration_no]
         
         return Response({
             'message': f'Badge "{badge.name}" has been removed from {participant.name}',
@@ -2823,7 +2660,9 @@ def delete_participant_badge(request):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            participant = Participant.objects.get(registration_no=participant_id)
+            participant = Participant.objects.only(
+                'registration_no', 'name', 'badges_earned', 'is_super_mentor'
+            ).get(registration_no=participant_id)
             badge = Badge.objects.get(id=badge_id)
         except Participant.DoesNotExist:
             return Response({
@@ -2834,39 +2673,37 @@ def delete_participant_badge(request):
                 'error': f'Badge with ID {badge_id} not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        # Check if the participant has this badge
-        try:
-            participant_badge = ParticipantBadge.objects.get(
-                participant=participant,
-                badge=badge
-            )
-        except ParticipantBadge.DoesNotExist:
-            return Response({
-                'error': f'Participant does not have this badge'
-            }, status=status.HTTP_404_NOT_FOUND)
-        
-        # If the badge is claimed and force is not True, prevent deletion
-        if participant_badge.is_claimed and not force:
-            return Response({
-                'error': 'Cannot delete a claimed badge. Unclaim it first or use force=true.',
-                'claimed': True
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Check if the badge was claimed
-        was_claimed = participant_badge.is_claimed
-        
-        # Delete the participant badge
-        participant_badge.delete()
-        
-        # If the badge was claimed, decrease the participant's claimed badge count
-        if was_claimed:
-            participant.badges_earned = max(0, participant.badges_earned - 1)
+        with transaction.atomic():
+            # Check if the participant has this badge, locking it against a concurrent claim
+            try:
+                participant_badge = ParticipantBadge.objects.select_for_update().get(
+                    participant=participant,
+                    badge=badge
+                )
+            except ParticipantBadge.DoesNotExist:
+                return Response({
+                    'error': f'Participant does not have this badge'
+                }, status=status.HTTP_404_NOT_FOUND)
             
-            # If the participant falls below 5 badges, they lose super mentor status
-            if participant.badges_earned < 5 and participant.is_super_mentor:
-                participant.is_super_mentor = False
-                
-            participant.save()
+            # If the badge is claimed and force is not True, prevent deletion
+            if participant_badge.is_claimed and not force:
+                return Response({
+                    'error': 'Cannot delete a claimed badge. Unclaim it first or use force=true.',
+                    'claimed': True
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            # Check if the badge was claimed
+            was_claimed = participant_badge.is_claimed
+            
+            # Delete the participant badge
+            participant_badge.delete()
+            
+            # If the badge was claimed, decrease the participant's claimed badge count;
+            # below 5 badges they lose super mentor status
+            if was_claimed:
+                participant.badges_earned, participant.is_super_mentor = change_claimed_badges(
+                    [participant.registration_no], -1
+                )[participant.registration_no]
         
         return Response({
             'message': f'Badge "{badge.name}" has been deleted from {participant.name}',
@@ -2929,39 +2766,29 @@ def delete_badge_type(request, badge_id):
             'points_required': badge.points_required
         }
         
-        # If we're force deleting, we need to update participant badges_earned counts
-        if claimed_instances > 0:
-            # Get all participants who claimed this badge
-            affected_participants = []
-            claimed_badges = ParticipantBadge.objects.filter(
-                badge=badge,
-                is_claimed=True
-            )
-            
-            for claimed_badge in claimed_badges:
-                participant = claimed_badge.participant
-                
-                # Decrement badge count
-                participant.badges_earned = max(0, participant.badges_earned - 1)
-                
-                # Update super mentor status if needed
-                if participant.badges_earned < 5 and participant.is_super_mentor:
-                    participant.is_super_mentor = False
-                
-                participant.save()
+        with transaction.atomic():
+            # If we're force deleting, we need to update participant badges_earned counts
+            if claimed_instances > 0:
+                # Get all participants who claimed this badge, locking their badges
+                claimed_by = dict(ParticipantBadge.objects.select_for_update().filter(
+                    badge=badge,
+                    is_claimed=True
+                ).values_list('participant_id', 'participant__name'))
                 
-                affected_participants.append({
-                    'registration_no': participant.registration_no,
-                    'name': participant.name,
-                    'new_badge_count': participant.badges_earned,
-                    'is_super_mentor': participant.is_super_mentor
-                })
-        
-        # First, delete all ParticipantBadge instances
-        deleted_instances = ParticipantBadge.objects.filter(badge=badge).delete()[0]
-        
-        # Then, delete the badge type itself
-        badge.delete()
+                # Decrement every badge count (and super mentor status if needed) in one UPDATE
+                counts = change_claimed_badges(claimed_by, -1)
+                affected_participants = [{
+                    'registration_no': registration_no,
+                    'name': claimed_by[registration_no],
+                    'new_badge_count': counts[registration_no][0],
+                    'is_super_mentor': counts[registration_no][1]
+                } for registration_no in sorted(counts)]
+            
+            # First, delete all ParticipantBadge instances
+            deleted_instances = ParticipantBadge.objects.filter(badge=badge).delete()[0]
+            
+            # Then, delete the badge type itself
+            badge.delete()
         
         response_data = {
             'message': f'Badge type "{badge_info["name"]}" has been deleted',
@@ -3234,7 +3061,7 @@ def check_feedback_eligibility(request, registration_no):
             })
             
         # For mentor feedback, check if participant is a mentee
-        is_mentee = MentorMenteeRelationship.objects.filter(mentee=participant).exists()
+        is_mentee = participant.current_mentor_id is not None
         
         # Check if mentee has already submitted feedback for their mentor
         already_submitted_mentor_feedback = False
@@ -3504,6 +3331,7 @@ def submit_app_feedback(request):
             additional_comments=additional_comments,
             anonymous=anonymous
         )
+        bump_version_on_commit(ACTIVITY_NAMESPACE)
         
         # Return the created feedback
         serializer = ApplicationFeedbackSerializer(feedback)
@@ -3668,6 +3496,7 @@ def delete_feedback(request):
             
             # Delete the feedback
             feedback.delete()
+            bump_version_on_commit(ACTIVITY_NAMESPACE)
             
             return Response({
                 'message': f'Application feedback from {participant_name} deleted successfully'
@@ -3863,44 +3692,20 @@ def send_feedback_reminders(request):
 
 def view_proof(request, registration_no, proof_type):
     """
-    Django view to serve proof files (stored as BLOB) for a participant.
-    Supports dynamic content type based on optional 'filetype' GET parameter.
-    Usage: /participant/<registration_no>/proof/<proof_type>/?filetype=pdf|png|jpeg
+    Django view to serve proof files for a participant.
+    Streams the file with the content type sniffed at upload, answers Range
+    requests and returns 304 when the browser's copy is current.
+    Usage: /participant/<registration_no>/proof/<proof_type>/
     """
-    from .models import Participant
-    # Get the participant or return 404
-    try:
-        participant = Participant.objects.get(registration_no=registration_no)
-    except Participant.DoesNotExist:
-        raise Http404("Participant not found.")
-
-    # Map proof_type to the correct field
-    proof_field = {
-        'research': participant.proof_of_research_publications,
-        'hackathon': participant.proof_of_hackathon_participation,
-        'coding': participant.proof_of_coding_competitions,
-        'academic': participant.proof_of_academic_performance,
-        'internship': participant.proof_of_internships,
-        'extracurricular': participant.proof_of_extracurricular_activities,
-    }.get(proof_type)
-
-    if not proof_field:
+    document = ProofDocument.objects.filter(participant_id=registration_no, proof_type=proof_type).first()
+    if document is None:
+        # Get the participant or return 404
+        if not Participant.objects.filter(registration_no=registration_no).exists():
+            raise Http404("Participant not found.")
         raise Http404("Proof not found.")
 
-    # Determine content type from GET param or default to PDF
-    filetype = request.GET.get('filetype', 'pdf').lower()
-    content_types = {
-        'pdf': 'application/pdf',
-        'png': 'image/png',
-        'jpg': 'image/jpeg',
-        'jpeg': 'image/jpeg',
-    }
-    content_type = content_types.get(filetype, 'application/pdf')
-
-    # Optionally, set Content-Disposition for inline display
-    response = HttpResponse(proof_field, content_type=content_type)
-    response['Content-Disposition'] = f'inline; filename="{proof_type}_proof_{registration_no}.{filetype}"'
-    return response
+    extension = os.path.splitext(document.file.name)[1] or '.bin'
+    return proof_response(request, document, f'{proof_type}_proof_{registration_no}{extension}')
 
 @api_view(['POST'])
 def generate_linkedin_preview(request):
@@ -3964,47 +3769,56 @@ def generate_linkedin_preview(request):
 
 @api_view(['GET'])
 def get_participant_proofs(request, registration_no):
-    """Get a participant's proof documents."""
+    """
+    Get a manifest of a participant's proof documents: type, size, content
+    type, hash and download URL of each. ?inline=<type> returns that one
+    proof base64-encoded instead, for older clients.
+    """
     try:
-        participant = Participant.objects.get(registration_no=registration_no)
-        
-        # Create a dictionary of proofs with base64 encoding
-        proofs = {}
-        
-        # Helper function to encode binary data
-        def encode_proof(binary_data):
-            if binary_data:
-                try:
-                    return base64.b64encode(binary_data).decode('utf-8')
-                except:
-                    return None
-            return None
-        
-        # Add each proof with proper encoding
-        if participant.proof_of_research_publications:
-            proofs['research_publications'] = encode_proof(participant.proof_of_research_publications)
-            
-        if participant.proof_of_hackathon_participation:
-            proofs['hackathon_participation'] = encode_proof(participant.proof_of_hackathon_participation)
-            
-        if participant.proof_of_coding_competitions:
-            proofs['coding_competitions'] = encode_proof(participant.proof_of_coding_competitions)
-            
-        if participant.proof_of_academic_performance:
-            proofs['academic_performance'] = encode_proof(participant.proof_of_academic_performance)
-            
-        if participant.proof_of_internships:
-            proofs['internships'] = encode_proof(participant.proof_of_internships)
-            
-        if participant.proof_of_extracurricular_activities:
-            proofs['extracurricular_activities'] = encode_proof(participant.proof_of_extracurricular_activities)
+        # Proofs are keyed like the upload fields, e.g. research_publications
+        proof_keys = {proof_type: field_name[len('proof_of_'):]
+                      for field_name, proof_type in ProofDocument.UPLOAD_FIELDS.items()}
+        documents = ProofDocument.objects.filter(participant_id=registration_no).order_by('id')
+        
+        inline = request.query_params.get('inline')
+        if inline:
+            proof_type = {key: proof_type for proof_type, key in proof_keys.items()}.get(inline, inline)
+            if proof_type not in proof_keys:
+                return Response({
+                    "error": "Invalid proof type",
+                    "details": f"Expected one of: {', '.join(proof_keys)}"
+                }, status=status.HTTP_400_BAD_REQUEST)
+            documents = documents.filter(proof_type=proof_type)
+        documents = list(documents)
         
-        if not proofs:
+        if not documents:
+            if not Participant.objects.filter(registration_no=registration_no).exists():
+                raise Participant.DoesNotExist
             return Response({
-                "message": "No proofs found for this participant"
+                "message": f"No {inline} proof found for this participant" if inline else "No proofs found for this participant"
             }, status=status.HTTP_404_NOT_FOUND)
-            
-        return Response(proofs)
+        
+        if inline:
+            document = documents[0]
+            with document.file.open('rb') as proof_file:
+                return Response({
+                    proof_keys[document.proof_type]: base64.b64encode(proof_file.read()).decode('utf-8')
+                })
+        
+        return Response({
+            'registration_no': registration_no,
+            'proofs': [{
+                'type': proof_keys[document.proof_type],
+                'proof_type': document.proof_type,
+                'size': document.size,
+                'content_type': document.content_type,
+                'sha256': document.sha256,
+                'uploaded_at': document.uploaded_at,
+                'url': request.build_absolute_uri(
+                    reverse('view_proof', args=[registration_no, document.proof_type])
+                ),
+            } for document in documents]
+        })
         
     except Participant.DoesNotExist:
         return Response({
@@ -4160,8 +3974,8 @@ def archive_semester_data(request):
             avg_quiz_score = quiz_results.aggregate(Avg('percentage'))['percentage__avg'] or 0.0
             
             # Get mentoring history
-            was_mentor = MentorMenteeRelationship.objects.filter(mentor=participant).exists()
-            was_mentee = MentorMenteeRelationship.objects.filter(mentee=participant).exists()
+            was_mentor = participant.mentee_count > 0
+            was_mentee = participant.current_mentor_id is not None
             
             # Calculate mentor/mentee ratings
             mentor_feedback = MentorFeedback.objects.filter(relationship__mentor=participant)
@@ -4197,10 +4011,16 @@ def archive_semester_data(request):
             archived_count += 1
         
         # 3. Delete all current relationships for the department
-        current_relationships.delete()
-        
-        # 4. Reset participant status and profile data
-        active_participants.update(
+        ended_participants = set()
+        for mentor_id, mentee_id in current_relationships.values_list('mentor_id', 'mentee_id'):
+            ended_participants.update((mentor_id, mentee_id))
+        with changing_relationships(ended_participants):
+            current_relationships.delete()
+        
+        # 4. Reset participant status and profile data. Take the ids first so
+        # the proofs below go with exactly the participants reset here
+        reset_participants = list(active_participants.values_list('registration_no', flat=True))
+        Participant.objects.filter(registration_no__in=reset_participants).update(
             # Clear mentoring preferences and status
             mentoring_preferences='',
             approval_status='pending',
@@ -4216,30 +4036,29 @@ def archive_semester_data(request):
             interest_preference1='',
             interest_preference2='',
             interest_preference3='',
+            tech_stack_tokens=[],
+            interest_tokens=[],
+            preference_tokens=[],
             previous_mentoring_experience='',
             
             # Reset research data
             published_research_papers='None',
-            proof_of_research_publications=None,
             
             # Reset hackathon data
             hackathon_participation='None',
             number_of_wins=0,
             number_of_participations=0,
             hackathon_role=None,
-            proof_of_hackathon_participation=None,
             
             # Reset coding competitions data
             coding_competitions_participate='no',
             level_of_competition='None',
             number_of_coding_competitions=0,
-            proof_of_coding_competitions=None,
             
             # Reset internship data
             internship_experience='no',
             number_of_internships=0,
             internship_description='',
-            proof_of_internships=None,
             
             # Reset seminars & workshops data
             seminars_or_workshops_attended='no',
@@ -4247,10 +4066,17 @@ def archive_semester_data(request):
             
             # Reset extracurricular data
             extracurricular_activities='no',
-            describe_extracurricular_activities='',
-            proof_of_extracurricular_activities=None
+            describe_extracurricular_activities=''
         )
         
+        # Remove the proofs of the reset sections (academic performance proofs are kept)
+        delete_proofs(ProofDocument.objects.filter(participant__in=reset_participants).exclude(proof_type='academic'))
+        # The bulk update bypasses Participant.save(); drop cached mentor features
+        # and the department leaderboards
+        bump_version_on_commit(MENTOR_FEATURES_NAMESPACE)
+        bump_version_on_commit(ACTIVITY_NAMESPACE)
+        DepartmentLeaderboardSnapshot.mark_stale([department_id] if department_id else None)
+        
         # Get department name for response
         department_name = "All Departments"
         if department_id:
@@ -4265,7 +4091,7 @@ def archive_semester_data(request):
                 'relationships_archived': len(archived_relationships),
                 'participants_archived': archived_count,
                 'relationships_ended': current_relationships.count(),
-                'participants_reset': active_participants.count()
+                'participants_reset': len(reset_participants)
             }
         })
         
@@ -239,14 +239,40 @@ CSRF_TRUSTED_ORIGINS = [
     "https://vidyasangam.duckdns.org",
 ]
 
+# Cache shared by every gunicorn worker: versioned responses are invalidated by
+# bumping a counter, which only works if all workers read the same counter
+# (LocMemCache would give each process its own). The table is created by
+# `manage.py createcachetable` (see Procfile).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+    }
+}
+
 # Media files (Uploads)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Proof uploads are streamed to disk and size-checked as they arrive
+FILE_UPLOAD_HANDLERS = [
+    'mentor_mentee.proofs.ProofUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
 # Gemini AI API key for resume text enhancement
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
 
 # Twilio Configuration
 TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN')
-TWILIO_VERIFY_SID = os.environ.get('TWILIO_VERIFY_SID')
\ No newline at end of file
+TWILIO_VERIFY_SID = os.environ.get('TWILIO_VERIFY_SID')
+
+# Mentor matching: place participants incrementally on approval/status changes
+MATCHING_AUTO_INCREMENTAL = os.environ.get('MATCHING_AUTO_INCREMENTAL', 'false').lower() == 'true'
+# Worker processes for ?sharded=true matching (defaults to the CPU count)
+MATCHING_SHARD_WORKERS = int(os.environ['MATCHING_SHARD_WORKERS']) if os.environ.get('MATCHING_SHARD_WORKERS') else None
+
+# Participants written per bulk_update when syncing leaderboard points from the frontend
+LEADERBOARD_SYNC_CHUNK_SIZE = int(os.environ.get('LEADERBOARD_SYNC_CHUNK_SIZE', 500))